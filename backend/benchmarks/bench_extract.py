@@ -0,0 +1,115 @@
+"""Compare the single-pass extraction engine with the BeautifulSoup path.
+
+Builds synthetic pages of 2, 5 and 10 MB and reports, for each path, the CPU
+time to run every HTML check and the peak Python memory allocated while doing
+so. Run from the repository root:
+
+    python -m backend.benchmarks.bench_extract [--sizes 2 5 10] [--repeat 3]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from backend.seo_tools import (
+    favicon_apple,
+    headings,
+    images_alt,
+    lang_charset,
+    links,
+    open_graph_twitter,
+    robots_canonical,
+    structured_data,
+    title_meta,
+    wordcount_keywords,
+)
+from backend.seo_tools.extract import EXTRACTORS, extract
+from backend.seo_tools.page import PageSnapshot
+
+SOUP_CHECKS = [
+    title_meta.get_title_meta,
+    robots_canonical.get_robots_canonical,
+    headings.get_headings,
+    images_alt.get_images_alt,
+    links.get_links,
+    structured_data.get_structured_data,
+    open_graph_twitter.get_open_graph_twitter,
+    wordcount_keywords.get_wordcount_keywords,
+    favicon_apple.get_favicon_apple,
+    lang_charset.get_lang_charset,
+]
+
+WORDS = "fence gate vinyl wood aluminum install repair quote estimate yard privacy chain link".split()
+
+HEAD = """<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>Benchmark page</title>
+<meta name="description" content="Synthetic page"><meta name="robots" content="index,follow">
+<meta property="og:title" content="Benchmark"><meta name="twitter:card" content="summary">
+<link rel="canonical" href="https://example.com/"><link rel="icon" href="/favicon.ico">
+<link rel="apple-touch-icon" href="/apple.png">
+<script type="application/ld+json">{"@type": "Organization", "name": "Example"}</script>
+<style>body { font-family: sans-serif; }</style>
+</head><body>
+"""
+
+
+def make_page(size_mb, seed=0):
+    rng = random.Random(seed)
+    target = size_mb * 1024 * 1024
+    parts = [HEAD]
+    length = len(HEAD)
+    section = 0
+    while length < target:
+        section += 1
+        text = " ".join(rng.choice(WORDS) for _ in range(60))
+        chunk = (
+            f'<section id="s{section}"><h2>Section {section}</h2>'
+            f'<div class="row"><p>{text} &amp; more</p>'
+            f'<img src="/img/{section}.jpg" alt="Image {section}">'
+            f'<a href="/page/{section}">Read more</a></div>'
+            f'<script>var s{section} = {section};</script></section>\n'
+        )
+        parts.append(chunk)
+        length += len(chunk)
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def run_soup(html):
+    page = PageSnapshot("https://example.com/", 200, {}, b"", html)
+    return [check("https://example.com/", page=page) for check in SOUP_CHECKS]
+
+
+def run_engine(html):
+    return extract(html, list(EXTRACTORS))
+
+
+def measure(func, html, repeat):
+    cpu = []
+    for _ in range(repeat):
+        start = time.process_time()
+        func(html)
+        cpu.append(time.process_time() - start)
+    tracemalloc.start()
+    func(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(cpu), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2, 5, 10], help="Page sizes in MB")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'size':>6} {'path':>8} {'cpu s':>8} {'peak MB':>9}")
+    for size in args.sizes:
+        html = make_page(size)
+        for name, func in (("soup", run_soup), ("engine", run_engine)):
+            cpu, peak = measure(func, html, args.repeat)
+            print(f"{size:>4}MB {name:>8} {cpu:>8.2f} {peak / 1024 / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Report extraction throughput against the number of pool workers.
+
+As many threads as the deployment runs requests keep extracting the same
+synthetic page, first in-process (the GIL serialises them) and then through
+an :class:`~backend.seo_tools.extract_pool.ExtractPool` of each given size.
+On a multi-core machine pages/sec should grow with the number of workers
+up to the core count. Run from the repository root:
+
+    python -m backend.benchmarks.bench_extract_pool [--kb 500] [--workers 1 2 4 8] [--threads 8] [--seconds 5]
+"""
+import argparse
+import os
+import threading
+import time
+
+from backend.benchmarks.bench_extract import make_page
+from backend.seo_tools import extract_pool
+from backend.seo_tools.extract import EXTRACTORS
+from backend.seo_tools.extract_pool import ExtractPool
+from backend.seo_tools.page import PageSnapshot
+
+
+def pages_per_second(content, threads, seconds):
+    checks = list(EXTRACTORS)
+    done = [0] * threads
+    stop = time.perf_counter() + seconds
+
+    def run(slot):
+        while time.perf_counter() < stop:
+            # A fresh snapshot per page, as every analysis builds its own.
+            page = PageSnapshot("https://example.com/", 200, {"Content-Type": "text/html"}, content, content.decode())
+            page.extract(checks)
+            done[slot] += 1
+
+    workers = [threading.Thread(target=run, args=(slot,)) for slot in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(done) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--kb", type=int, default=500, help="Page size in KB")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent extractions")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Time budget per measurement")
+    args = parser.parse_args()
+
+    content = make_page(args.kb / 1024).encode()
+    print(f"page size: {len(content) / 1024:.0f} KB, cores: {os.cpu_count()}, threads: {args.threads}")
+    print(f"{'workers':>10} {'pages/s':>9} {'speedup':>8}")
+    baseline = pages_per_second(content, args.threads, args.seconds)
+    print(f"{'in-process':>10} {baseline:>9.1f} {1:>7.2f}x")
+    for workers in args.workers:
+        pool = ExtractPool(workers=workers)
+        extract_pool._pool = pool
+        try:
+            rate = pages_per_second(content, args.threads, args.seconds)
+        finally:
+            extract_pool._pool = None
+            pool.close()
+        print(f"{workers:>10} {rate:>9.1f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
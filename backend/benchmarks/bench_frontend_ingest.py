@@ -0,0 +1,61 @@
+"""Report frontend log ingestion throughput and commit latency.
+
+Producer threads, standing in for ingest requests, queue batches of events
+in a :class:`~backend.mcp_server.frontend_logs.FrontendLogStore`. The run is
+repeated with a group size of 1, which commits every event in its own
+transaction as ingestion used to, and with the given group sizes. Run from
+the repository root:
+
+    python -m backend.benchmarks.bench_frontend_ingest [--events 20000] [--per-request 50] [--producers 4] [--batch 1 100 1000]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from backend.mcp_server.frontend_logs import FrontendLogStore
+
+
+def ingest(path, batch, events, per_request, producers):
+    store = FrontendLogStore(path, batch_size=batch, flush_interval=0.05)
+    entries = [("info", f"route changed to /page/{i}", "web", {"i": i}) for i in range(per_request)]
+    requests = events // per_request // producers
+
+    def produce():
+        for _ in range(requests):
+            store.add_many(entries)
+
+    threads = [threading.Thread(target=produce) for _ in range(producers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    store.flush()
+    elapsed = time.perf_counter() - start
+    stats = store.stats()
+    store.close()
+    return stats["committed"] / elapsed, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--per-request", type=int, default=50, help="Events per ingest request")
+    parser.add_argument("--producers", type=int, default=4, help="Concurrent ingest requests")
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 100, 1000], help="Rows per commit")
+    args = parser.parse_args()
+
+    print(f"{'batch':>6} {'events/s':>10} {'commits':>8} {'commit p50 ms':>14} {'commit p99 ms':>14} {'wait p99 ms':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for batch in args.batch:
+            rate, stats = ingest(os.path.join(tmp, f"frontend-{batch}.db"), batch, args.events, args.per_request, args.producers)
+            print(
+                f"{batch:>6} {rate:>10,.0f} {stats['commits']:>8} {stats['commit_ms']['p50']:>14.2f} "
+                f"{stats['commit_ms']['p99']:>14.2f} {stats['wait_ms']['p99']:>12.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
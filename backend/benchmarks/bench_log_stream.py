@@ -0,0 +1,98 @@
+"""Report live log stream fan-out to many concurrent subscribers.
+
+A thread logs entries as fast as it can while every subscriber, all on one
+event loop, consumes ``/logs/stream`` frames until it has seen every entry.
+The :class:`~backend.mcp_server.logs.Broadcaster` is compared with one queue
+per subscriber, fed through ``call_soon_threadsafe`` and serialising each
+entry per subscriber, which is how streams were fed before. Run from the
+repository root:
+
+    python -m backend.benchmarks.bench_log_stream [--subscribers 500] [--entries 5000]
+"""
+import argparse
+import asyncio
+import threading
+import time
+from datetime import datetime
+
+from backend.mcp_server.logs import Broadcaster, LogEntry, LogLevel, LogStore
+
+
+def entry(i):
+    return LogEntry(id=i, ts=datetime.utcnow(), level=LogLevel.INFO, msg=f"fetched page for request {i}", source="api")
+
+
+async def broadcaster(subscribers, entries):
+    store = LogStore(maxlen=entries)
+    hub = Broadcaster(store)
+
+    async def client():
+        sent = 0
+        async for frame in hub.stream(0):
+            sent += frame.count("\n\n") - frame.startswith(":")
+            if sent >= entries:
+                return
+
+    tasks = [asyncio.create_task(client()) for _ in range(subscribers)]
+    await asyncio.sleep(0.1)
+
+    def produce():
+        for i in range(1, entries + 1):
+            store.append(entry(i))
+            hub.notify()
+
+    start = time.perf_counter()
+    producer = threading.Thread(target=produce)
+    producer.start()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    producer.join()
+    return elapsed, hub.stats()
+
+
+async def queues(subscribers, entries):
+    loop = asyncio.get_running_loop()
+    clients = [asyncio.Queue() for _ in range(subscribers)]
+
+    async def client(queue):
+        for _ in range(entries):
+            item = await queue.get()
+            f"data: {item.model_dump_json()}\n\n"
+
+    tasks = [asyncio.create_task(client(queue)) for queue in clients]
+    await asyncio.sleep(0.1)
+
+    def produce():
+        for i in range(1, entries + 1):
+            item = entry(i)
+            for queue in clients:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+
+    start = time.perf_counter()
+    producer = threading.Thread(target=produce)
+    producer.start()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    producer.join()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=500)
+    parser.add_argument("--entries", type=int, default=5000)
+    args = parser.parse_args()
+
+    delivered = args.subscribers * args.entries
+    print(f"{args.subscribers} subscribers, {args.entries} entries, {delivered} deliveries")
+    elapsed, stats = asyncio.run(broadcaster(args.subscribers, args.entries))
+    print(
+        f"broadcaster: {elapsed:.2f} s, {delivered / elapsed:,.0f} events/s, "
+        f"{stats['wakeups']} wakeups, {stats['events'] / stats['frames']:.1f} events/frame"
+    )
+    elapsed = asyncio.run(queues(args.subscribers, args.entries))
+    print(f"queue per subscriber: {elapsed:.2f} s, {delivered / elapsed:,.0f} events/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Report /logs query latency as the log ring buffer fills.
+
+Fills a :class:`~backend.mcp_server.logs.LogStore` to each size and times
+typical queries: the latest page, a source, a rare level, ``after=`` cursor
+polling, a ``before=`` page from the middle of the buffer and an export of
+the 100 entries of a time window (``window``). With the indexes, each should
+take about the same time at every fill level. Run from the repository root:
+
+    python -m backend.benchmarks.bench_logs [--sizes 1000 10000 50000] [--repeat 200]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from backend.mcp_server.frontend_logs import FrontendLogStore
+from backend.mcp_server.logs import LogEntry, LogLevel, LogStore
+
+SOURCES = ["api", "mcp", "crawler", "fetch", "robots", "frontend"]
+# Mostly INFO and DEBUG, as in production; ERROR is the rare level.
+LEVELS = [LogLevel.DEBUG] * 40 + [LogLevel.INFO] * 55 + [LogLevel.WARNING] * 4 + [LogLevel.ERROR]
+VERBS = ["fetched", "parsed", "saved", "skipped", "retried"] * 10 + ["throttled"]
+OBJECTS = ["page", "sitemap", "robots.txt", "result", "image"]
+SEARCHES = {"word": "throttled", "prefix": "throt*", "phrase": '"throttled sitemap"'}
+
+
+def message(rng, i):
+    return f"{rng.choice(VERBS)} {rng.choice(OBJECTS)} for request {i}"
+
+
+def fill(size, seed=0):
+    rng = random.Random(seed)
+    store = LogStore(maxlen=size)
+    start = datetime.utcnow()
+    for i in range(1, size + 1):
+        store.append(LogEntry(id=i, ts=start + timedelta(milliseconds=i), level=rng.choice(LEVELS), msg=message(rng, i), source=rng.choice(SOURCES)))
+    return store, start
+
+
+def export(store, start, end):
+    return sum(len(batch) for batch in store.window(start, end))
+
+
+def fill_frontend(path, size, seed=0):
+    rng = random.Random(seed)
+    store = FrontendLogStore(path)
+    conn = store._db()
+    conn.execute("BEGIN")
+    for i in range(1, size + 1):
+        store.add(rng.choice(LEVELS).value, message(rng, i), rng.choice(SOURCES))
+    conn.execute("COMMIT")
+    return store
+
+
+def latency_us(search, repeat, **query):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        search(**query)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    queries = {
+        "latest": lambda size: {},
+        "source": lambda size: {"source": "robots"},
+        "error": lambda size: {"level": LogLevel.ERROR},
+        "after": lambda size: {"after": size - 10},
+        "before": lambda size: {"before": size // 2},
+        **{name: (lambda q: lambda size: {"q": q})(q) for name, q in SEARCHES.items()},
+    }
+    print(f"{'entries':>8} " + " ".join(f"{name + ' us':>10}" for name in [*queries, "window"]))
+    for size in args.sizes:
+        store, start = fill(size)
+        cells = [latency_us(store.query, args.repeat, **query(size)) for query in queries.values()]
+        middle = start + timedelta(milliseconds=size // 2)
+        cells.append(latency_us(export, args.repeat, store=store, start=middle, end=middle + timedelta(milliseconds=99)))
+        print(f"{size:>8} " + " ".join(f"{cell:>10.1f}" for cell in cells))
+
+    size = max(args.sizes)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = fill_frontend(os.path.join(tmp, "frontend.db"), size)
+        cells = [f"{name} {latency_us(store.search, args.repeat, q=q):.1f} us" for name, q in SEARCHES.items()]
+        print(f"frontend_logs FTS5, {size} rows: " + ", ".join(cells))
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Report pages/sec for every installed HTML parser backend.
+
+Each backend parses the same synthetic page repeatedly and runs every HTML
+check, through the single-pass engine and (where the backend has a
+BeautifulSoup tree builder) through the per-check functions. Run from the
+repository root:
+
+    python -m backend.benchmarks.bench_parsers [--kb 200] [--seconds 3]
+"""
+import argparse
+import time
+
+from backend.benchmarks.bench_extract import SOUP_CHECKS, make_page
+from backend.seo_tools.extract import EXTRACTORS
+from backend.seo_tools.page import PageSnapshot
+from backend.seo_tools.parsers import PARSERS
+
+
+def pages_per_second(func, seconds):
+    done = 0
+    start = time.perf_counter()
+    while True:
+        func()
+        done += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return done / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--kb", type=int, default=200, help="Page size in KB")
+    parser.add_argument("--seconds", type=float, default=3.0, help="Time budget per measurement")
+    args = parser.parse_args()
+
+    html = make_page(args.kb / 1024)
+    checks = list(EXTRACTORS)
+
+    def engine(name):
+        return lambda: PageSnapshot("https://example.com/", 200, {}, b"", html, name).extract(checks)
+
+    def soup(name):
+        def run():
+            page = PageSnapshot("https://example.com/", 200, {}, b"", html, name)
+            for check in SOUP_CHECKS:
+                check(page.url, page=page)
+        return run
+
+    print(f"page size: {len(html) / 1024:.0f} KB")
+    print(f"{'backend':>12} {'engine p/s':>11} {'soup p/s':>9}")
+    for name, backend in PARSERS.items():
+        if not backend.available():
+            print(f"{name:>12} {'not installed':>21}")
+            continue
+        engine_rate = pages_per_second(engine(name), args.seconds)
+        soup_rate = f"{pages_per_second(soup(name), args.seconds):>9.1f}" if backend.features else f"{'-':>9}"
+        print(f"{name:>12} {engine_rate:>11.1f} {soup_rate}")
+
+
+if __name__ == "__main__":
+    main()
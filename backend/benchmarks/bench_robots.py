@@ -0,0 +1,47 @@
+"""Time robots.txt rule matching.
+
+Compiles a robots.txt with ``--rules`` rules (a mix of plain prefixes and
+wildcards) and reports the mean time of ``RobotsRules.allowed`` over a set of
+paths. Run from the repository root:
+
+    python -m backend.benchmarks.bench_robots [--rules 200] [--lookups 200000]
+"""
+import argparse
+import random
+import time
+
+from backend.seo_tools.robots import RobotsRules
+
+
+def make_robots(rules, seed=0):
+    rng = random.Random(seed)
+    lines = ["User-agent: *", "Crawl-delay: 1"]
+    for i in range(rules):
+        kind = rng.choice(["Disallow", "Disallow", "Allow"])
+        if i % 5 == 0:
+            lines.append(f"{kind}: /*/section-{i}/*.html$")
+        else:
+            lines.append(f"{kind}: /category-{i}/")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rules", type=int, default=200)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    args = parser.parse_args()
+
+    rules = RobotsRules(make_robots(args.rules))
+    rng = random.Random(1)
+    paths = [
+        f"/category-{rng.randrange(args.rules * 2)}/item-{i}.html" for i in range(1000)
+    ]
+    start = time.perf_counter()
+    for i in range(args.lookups):
+        rules.allowed(paths[i % len(paths)])
+    elapsed = time.perf_counter() - start
+    print(f"{args.rules} rules: {elapsed / args.lookups * 1e6:.2f} µs per lookup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Measure event-loop latency while /api/analyze is under load.
+
+Starts a local origin that serves a synthetic page after a fixed delay, fires
+concurrent /api/analyze requests at the FastAPI app in-process, and samples
+how late a 10 ms timer on the same event loop fires. Two modes are compared:
+
+- ``inline`` – the analysis runs synchronously on the loop, as before
+- ``async``  – fetches are awaited and parsing runs in worker threads
+
+With the loop kept free, the lag percentiles stay flat as concurrency grows.
+Run from the repository root:
+
+    python -m backend.benchmarks.load_event_loop [--requests 40] [--concurrency 1 10 20]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from backend.benchmarks.bench_extract import make_page
+from backend.mcp_server import api_server
+from backend.mcp_server.seo_astro_analyzer_server import run_analysis, run_analysis_async
+
+TOOLS = ["title_meta", "headings", "links", "images_alt", "wordcount_keywords", "sitemap_robots"]
+PROBE_INTERVAL = 0.01
+
+
+def start_origin(body, delay):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(delay)
+            payload = body if self.path == "/" else b""
+            self.send_response(200 if payload else 404)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def probe(samples, stop):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(PROBE_INTERVAL)
+        samples.append(loop.time() - start - PROBE_INTERVAL)
+
+
+async def load(url, requests, concurrency):
+    api_server._req_counts.clear()
+    samples = []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(samples, stop))
+    gate = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=api_server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+        async def one():
+            async with gate:
+                resp = await client.post("/api/analyze", json={"url": url, "tools": TOOLS})
+                resp.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+    stop.set()
+    await probe_task
+    return elapsed, samples
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 20])
+    parser.add_argument("--kb", type=int, default=300, help="Page size in KB")
+    parser.add_argument("--delay", type=float, default=0.1, help="Origin response delay in seconds")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    os.chdir(tempfile.mkdtemp(prefix="seo-load-"))
+    api_server.RATE_LIMIT = 10**9
+    origin = start_origin(make_page(args.kb / 1024).encode(), args.delay)
+    url = f"http://127.0.0.1:{origin.server_port}/"
+
+    async def inline(url, tools, parser=None):
+        return run_analysis(url, tools, parser=parser)
+
+    modes = {"inline": inline, "async": run_analysis_async}
+    print(f"page {args.kb} KB, origin delay {args.delay * 1000:.0f} ms, {args.requests} requests")
+    print(f"{'mode':>7} {'conc':>5} {'req/s':>7} {'lag p50 ms':>11} {'lag p99 ms':>11} {'lag max ms':>11}")
+    for name, impl in modes.items():
+        api_server.run_analysis_async = impl
+        for concurrency in args.concurrency:
+            elapsed, lag = asyncio.run(load(url, args.requests, concurrency))
+            lag = lag or [0.0]
+            print(
+                f"{name:>7} {concurrency:>5} {args.requests / elapsed:>7.1f} "
+                f"{statistics.median(lag) * 1000:>11.1f} {percentile(lag, 99) * 1000:>11.1f} "
+                f"{max(lag) * 1000:>11.1f}"
+            )
+    api_server.run_analysis_async = run_analysis_async
+    origin.shutdown()
+
+
+if __name__ == "__main__":
+    main()
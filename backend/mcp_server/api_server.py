@@ -2,46 +2,62 @@ import asyncio
 import json
 import logging
 import os
-import sqlite3
 import time
-from datetime import datetime
-from typing import Optional
+import zlib
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, Optional
 
 from fastapi import FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, StreamingResponse
 
+from backend.seo_tools.extract_pool import get_extract_pool
+from backend.seo_tools.fetch import get_async_client, get_client
+from backend.seo_tools.http_cache import get_http_cache
+from backend.seo_tools.page import head_fetch_stats
+from backend.seo_tools.parsers import get_parser
+from backend.seo_tools.result_cache import get_result_cache
+from backend.seo_tools.robots import get_robots_cache
+from backend.seo_tools.sitemaps import sitemap_url_page
+
 from .logs import (
     LogLevel,
     LogPage,
+    broadcaster,
     get_page,
     log_buffer,
     redact_metadata,
-    subscribe,
-    unsubscribe,
-    frontend_last_ingest,
 )
 from .seo_astro_analyzer_server import (
-    get_favicon_apple,
-    get_headings,
-    get_images_alt,
-    get_lang_charset,
-    get_links,
-    get_open_graph_twitter,
-    get_robots_canonical,
-    get_sitemap_robots,
-    get_structured_data,
-    get_title_meta,
-    get_wordcount_keywords,
-    url_to_slug,
+    CRAWL_MAX_DEPTH,
+    CRAWL_MAX_PAGES,
+    CRAWL_MAX_WORKERS,
+    MAX_BATCH_URLS,
+    analyze_url_async,
+    coalescing_stats,
+    iter_batch_async,
+    iter_crawl_async,
+    parse_deadline,
 )
+from .frontend_logs import get_frontend_log_store, ndjson_line, normalize_level
+from .result_store import get_result_store
 
 APP_ORIGIN = os.environ.get("APP_ORIGIN", "*")
 RATE_LIMIT = int(os.environ.get("RATE_LIMIT", "100"))
 RATE_WINDOW = int(os.environ.get("RATE_WINDOW", "60"))
 HEARTBEAT = 15
+EXPORT_CHUNK_BYTES = int(os.environ.get("LOG_EXPORT_CHUNK_BYTES", str(64 * 1024)))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Commit results and frontend logs still queued before the process exits.
+    await asyncio.to_thread(get_result_store().close)
+    await asyncio.to_thread(get_frontend_log_store().close)
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[APP_ORIGIN],
@@ -69,21 +85,6 @@ async def rate_limiter(request: Request, call_next):
 
 # --- SEO analyzer endpoint ---------------------------------------------------
 
-TOOL_MAP = {
-    "title_meta": get_title_meta,
-    "robots_canonical": get_robots_canonical,
-    "headings": get_headings,
-    "images_alt": get_images_alt,
-    "links": get_links,
-    "structured_data": get_structured_data,
-    "open_graph_twitter": get_open_graph_twitter,
-    "wordcount_keywords": get_wordcount_keywords,
-    "favicon_apple": get_favicon_apple,
-    "lang_charset": get_lang_charset,
-    "sitemap_robots": get_sitemap_robots,
-}
-
-
 @app.post("/api/analyze")
 async def analyze(request: Request):
     try:
@@ -91,30 +92,140 @@ async def analyze(request: Request):
         url = data.get("url")
         tools = data.get("tools", [])
         engines = data.get("engines", [])
+        parser = data.get("parser")
         logging.info(
-            f"/api/analyze called: url={url}, tools={tools}, engines={engines}"
+            f"/api/analyze called: url={url}, tools={tools}, engines={engines}, parser={parser}"
         )
         if not url or not tools:
             return JSONResponse({"error": "Missing url or tools"}, status_code=400)
-        results = []
-        for tool in tools:
-            func = TOOL_MAP.get(tool)
-            if not func:
-                results.append({"tool": tool, "error": "Tool not found"})
-                continue
-            try:
-                result = func(url)
-                results.append({"tool": tool, "result": result})
-            except Exception as e:  # pragma: no cover - defensive
-                logging.exception(f"Error running tool {tool} on {url}: {e}")
-                results.append({"tool": tool, "error": str(e)})
-        run_id = url_to_slug(url)
-        return {"run_id": run_id, "results": results}
+        try:
+            get_parser(parser)
+            deadline = parse_deadline(data.get("deadline"))
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        return await analyze_url_async(url, tools, parser=parser, deadline=deadline)
     except Exception as e:  # pragma: no cover - defensive
         logging.exception(f"/api/analyze failed: {e}")
         return JSONResponse({"error": str(e)}, status_code=500)
 
 
+@app.post("/api/analyze/batch")
+async def analyze_batch(request: Request):
+    """Analyse a list of URLs, streaming one NDJSON line per URL as it completes."""
+    data = await request.json()
+    urls = data.get("urls", [])
+    tools = data.get("tools", [])
+    parser = data.get("parser")
+    if not isinstance(urls, list) or not urls or not tools:
+        return JSONResponse({"error": "Missing urls or tools"}, status_code=400)
+    logging.info(f"/api/analyze/batch called: urls={len(urls)}, tools={tools}, parser={parser}")
+    if not all(isinstance(url, str) and url for url in urls):
+        return JSONResponse({"error": "urls must be non-empty strings"}, status_code=400)
+    if len(urls) > MAX_BATCH_URLS:
+        return JSONResponse(
+            {"error": f"At most {MAX_BATCH_URLS} URLs per batch"}, status_code=400
+        )
+    try:
+        get_parser(parser)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    async def iter_lines():
+        async for entry in iter_batch_async(urls, tools, parser=parser):
+            yield json.dumps(entry, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(iter_lines(), media_type="application/x-ndjson")
+
+
+@app.get("/api/sitemap/urls")
+async def sitemap_urls(
+    url: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """Page through the URLs listed in a site's sitemaps."""
+    return await sitemap_url_page(url, offset=offset, limit=limit)
+
+
+@app.get("/api/results")
+async def list_results(
+    url: Optional[str] = None,
+    run_id: Optional[str] = None,
+    check: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    evidence: bool = True,
+):
+    """Stored check results, newest first."""
+    return await asyncio.to_thread(
+        get_result_store().results,
+        url=url,
+        run_id=run_id,
+        check=check,
+        since=since.timestamp() if since else None,
+        until=until.timestamp() if until else None,
+        limit=limit,
+        offset=offset,
+        evidence=evidence,
+    )
+
+
+@app.get("/api/runs/{run_id}")
+async def get_run(run_id: str, evidence: bool = True):
+    """A stored run with its pages and results."""
+    run = await asyncio.to_thread(get_result_store().run, run_id, evidence)
+    if run is None:
+        raise HTTPException(status_code=404, detail="unknown run")
+    return run
+
+
+@app.post("/api/crawl")
+async def crawl(request: Request):
+    """Crawl a site from a seed URL, streaming one NDJSON line per page and a final summary."""
+    data = await request.json()
+    url = data.get("url")
+    tools = data.get("tools", [])
+    parser = data.get("parser")
+    logging.info(f"/api/crawl called: url={url}, tools={tools}")
+    if not url or not tools:
+        return JSONResponse({"error": "Missing url or tools"}, status_code=400)
+    try:
+        max_pages = int(data.get("max_pages", 100))
+        max_depth = int(data.get("max_depth", 3))
+        workers = data.get("workers") and int(data["workers"])
+        get_parser(parser)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    if not 0 < max_pages <= CRAWL_MAX_PAGES:
+        return JSONResponse(
+            {"error": f"max_pages must be between 1 and {CRAWL_MAX_PAGES}"}, status_code=400
+        )
+    if not 0 <= max_depth <= CRAWL_MAX_DEPTH:
+        return JSONResponse(
+            {"error": f"max_depth must be between 0 and {CRAWL_MAX_DEPTH}"}, status_code=400
+        )
+    if workers is not None and not 0 < workers <= CRAWL_MAX_WORKERS:
+        return JSONResponse(
+            {"error": f"workers must be between 1 and {CRAWL_MAX_WORKERS}"}, status_code=400
+        )
+
+    async def iter_lines():
+        async for entry in iter_crawl_async(
+            url,
+            tools,
+            max_pages=max_pages,
+            max_depth=max_depth,
+            workers=workers,
+            parser=parser,
+            use_sitemap=data.get("use_sitemap", True),
+        ):
+            yield json.dumps(entry, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(iter_lines(), media_type="application/x-ndjson")
+
+
 # --- log querying ------------------------------------------------------------
 
 @app.get("/logs", response_model=LogPage)
@@ -124,71 +235,136 @@ def read_logs(
     q: Optional[str] = None,
     limit: int = 100,
     after: Optional[int] = None,
+    before: Optional[int] = None,
 ):
-    return get_page(source=source, level=level, q=q, limit=limit, after=after)
+    return get_page(source=source, level=level, q=q, limit=limit, after=after, before=before)
 
 
 @app.get("/logs/stream")
-async def stream_logs(after: Optional[int] = None):
-    async def event_generator():
-        q = subscribe()
-        try:
-            if after:
-                page = get_page(after=after)
-                for entry in page.items:
-                    yield f"data: {entry.model_dump_json()}\n\n"
-            yield ":heartbeat\n\n"
-            while True:
-                try:
-                    item = await asyncio.wait_for(q.get(), timeout=HEARTBEAT)
-                except asyncio.TimeoutError:
-                    yield ":heartbeat\n\n"
-                    continue
-                if isinstance(item, dict) and item.get("warning"):
-                    yield "event: warning\ndata: queue full\n\n"
-                else:
-                    yield f"data: {item.model_dump_json()}\n\n"
-        finally:
-            unsubscribe(q)
-
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+async def stream_logs(
+    after: Optional[int] = None,
+    source: Optional[str] = None,
+    last_event_id: Optional[int] = Header(None, alias="Last-Event-ID"),
+):
+    # Live entries, or everything after a cursor first: ``after``, or the id
+    # of the last event a reconnecting EventSource received.
+    cursor = after if after is not None else last_event_id
+    frames = broadcaster.stream(cursor, source=source, heartbeat=HEARTBEAT)
+    return StreamingResponse(frames, media_type="text/event-stream")
+
+
+def _naive(value: datetime, tz: Optional[timezone] = None) -> datetime:
+    # Log timestamps are naive: local time in the ring buffer, UTC in the
+    # frontend store. Naive bounds are taken as already in that zone.
+    return value if value.tzinfo is None else value.astimezone(tz).replace(tzinfo=None)
+
+
+def _chunked(lines: Iterable[str]) -> Iterator[bytes]:
+    # NDJSON in chunks of about EXPORT_CHUNK_BYTES, not one write per line.
+    chunk, size = [], 0
+    for line in lines:
+        chunk.append(line)
+        size += len(line) + 1
+        if size >= EXPORT_CHUNK_BYTES:
+            yield ("\n".join(chunk) + "\n").encode()
+            chunk, size = [], 0
+    if chunk:
+        yield ("\n".join(chunk) + "\n").encode()
+
+
+def _gzipped(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
 
 
 @app.get("/logs/download")
-async def download_logs(
+def download_logs(
     source: Optional[str] = None,
     level: Optional[LogLevel] = None,
     q: Optional[str] = None,
     from_: datetime = Query(..., alias="from"),
     to: datetime = Query(..., alias="to"),
+    frontend: bool = True,
+    gzip: bool = False,
 ):
+    # Entries of the ring buffer, then persisted frontend rows, in the window.
+    # The ring buffer holds a copy of recent frontend entries; with the
+    # persisted rows included, those copies are left out.
     def iter_lines():
-        page = get_page(source=source, level=level, q=q, limit=0)
-        for entry in page.items:
-            if from_ <= entry.ts <= to:
-                yield entry.model_dump_json() + "\n"
+        skip = FRONTEND_LOGGER if frontend else None
+        for batch in log_buffer.window(_naive(from_), _naive(to), source=source, level=level, q=q, skip_source=skip):
+            for entry in batch:
+                yield entry.model_dump_json()
+        if frontend:
+            store = get_frontend_log_store()
+            utc = timezone.utc
+            for rows in store.window(_naive(from_, utc), _naive(to, utc), source=source, level=level, q=q):
+                for row in rows:
+                    yield ndjson_line(row)
 
-    return StreamingResponse(iter_lines(), media_type="application/x-ndjson")
+    if gzip:
+        return StreamingResponse(
+            _gzipped(_chunked(iter_lines())),
+            media_type="application/gzip",
+            headers={"Content-Disposition": 'attachment; filename="logs.ndjson.gz"'},
+        )
+    return StreamingResponse(_chunked(iter_lines()), media_type="application/x-ndjson")
 
 
 # --- ingestion from frontend -------------------------------------------------
 
 FRONTEND_API_KEY = os.environ.get("FRONTEND_LOG_API_KEY")
-_db_path = os.environ.get("FRONTEND_LOG_DB", "frontend_logs.db")
-_conn = sqlite3.connect(_db_path, check_same_thread=False)
-_conn.execute(
-    """
-    CREATE TABLE IF NOT EXISTS frontend_logs (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        ts TEXT,
-        level TEXT,
-        source TEXT,
-        msg TEXT,
-        metadata TEXT
-    )
-    """
-)
-_conn.commit()
+FRONTEND_MAX_EVENTS = int(os.environ.get("FRONTEND_LOG_MAX_EVENTS", "10000"))
+# Ingested entries are also logged under this name, so they reach the ring
+# buffer and live streams with it as their source.
+FRONTEND_LOGGER = "frontend"
+
+
+def _frontend_events(body: bytes, content_type: str) -> list:
+    # One event object, a JSON array of them, or NDJSON, one per line.
+    try:
+        if "ndjson" in content_type:
+            events = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            events = json.loads(body)
+            if not isinstance(events, list):
+                events = [events]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid JSON")
+    if not all(isinstance(event, dict) for event in events):
+        raise HTTPException(status_code=400, detail="events must be objects")
+    for event in events:
+        if not isinstance(event.get("msg", ""), str):
+            raise HTTPException(status_code=400, detail="msg must be a string")
+        for field in ("level", "source"):
+            if not isinstance(event.get(field), (str, type(None))):
+                raise HTTPException(status_code=400, detail=f"{field} must be a string")
+        if not isinstance(event.get("metadata"), (dict, type(None))):
+            raise HTTPException(status_code=400, detail="metadata must be an object")
+    if len(events) > FRONTEND_MAX_EVENTS:
+        raise HTTPException(status_code=413, detail=f"at most {FRONTEND_MAX_EVENTS} events per request")
+    return events
+
+
+def _ingest_frontend(body: bytes, content_type: str) -> int:
+    # Off the event loop: parsing, queueing for the store (which blocks only
+    # while its queue is full) and logging each event to the ring buffer.
+    entries = [
+        (normalize_level(event.get("level")), event.get("msg", ""), event.get("source"), redact_metadata(event.get("metadata")))
+        for event in _frontend_events(body, content_type)
+    ]
+    get_frontend_log_store().add_many(entries)
+    from . import logs as _logs
+
+    _logs.frontend_last_ingest = datetime.utcnow()
+    logger = logging.getLogger(FRONTEND_LOGGER)
+    for level, msg, source, metadata in entries:
+        logger.log(getattr(logging, level), msg, extra={"metadata": metadata, "source": source})
+    return len(entries)
 
 
 @app.post("/logs/ingest/frontend")
@@ -198,33 +374,84 @@ async def ingest_frontend(
 ):
     if FRONTEND_API_KEY and api_key != FRONTEND_API_KEY:
         raise HTTPException(status_code=401, detail="invalid api key")
-    data = await request.json()
-    level = data.get("level", "INFO").upper()
-    msg = data.get("msg", "")
-    source = data.get("source")
-    metadata = redact_metadata(data.get("metadata"))
-    ts = datetime.utcnow().isoformat()
-    _conn.execute(
-        "INSERT INTO frontend_logs (ts, level, source, msg, metadata) VALUES (?,?,?,?,?)",
-        (ts, level, source, msg, json.dumps(metadata)),
-    )
-    _conn.commit()
-    from . import logs as _logs
+    body = await request.body()
+    accepted = await asyncio.to_thread(_ingest_frontend, body, request.headers.get("content-type", ""))
+    return {"status": "ok", "accepted": accepted}
 
-    _logs.frontend_last_ingest = datetime.utcnow()
-    logging.log(
-        getattr(logging, level, logging.INFO),
-        msg,
-        extra={"metadata": metadata, "source": source},
+
+@app.get("/logs/frontend", response_model=LogPage)
+def read_frontend_logs(
+    source: Optional[str] = None,
+    level: Optional[LogLevel] = None,
+    q: Optional[str] = None,
+    limit: int = 100,
+    after: Optional[int] = None,
+    before: Optional[int] = None,
+):
+    # Persisted frontend logs, searched through their FTS5 index.
+    items = get_frontend_log_store().search(source=source, level=level, q=q, limit=limit, after=after, before=before)
+    return LogPage(
+        items=items,
+        next=items[-1].id if items else after,
+        prev=items[0].id if items else before,
     )
-    return {"status": "ok"}
 
 
 # --- health ------------------------------------------------------------------
 
 @app.get("/healthz/logs")
 def health_logs():
+    from . import logs as _logs
+
     lag = None
-    if frontend_last_ingest:
-        lag = (datetime.utcnow() - frontend_last_ingest).total_seconds()
-    return {"ring_buffer": len(log_buffer), "ingest_lag": lag}
+    if _logs.frontend_last_ingest:
+        lag = (datetime.utcnow() - _logs.frontend_last_ingest).total_seconds()
+    return {
+        "ring_buffer": len(log_buffer),
+        "index": log_buffer.stats(),
+        "frontend": get_frontend_log_store().stats(),
+        "stream": broadcaster.stats(),
+        "ingest_lag": lag,
+    }
+
+
+@app.get("/healthz/fetch")
+async def health_fetch():
+    # Top level: the threaded client used by the MCP tools; "async": the
+    # event-loop client used by /api/analyze; "cache": the shared on-disk
+    # HTTP cache; "head_only": totals of head-only page fetches.
+    cache = get_http_cache()
+    return {
+        **get_client().stats(),
+        "async": get_async_client().stats(),
+        "cache": cache.stats() if cache is not None else {"enabled": False},
+        "head_only": head_fetch_stats(),
+    }
+
+
+@app.get("/healthz/extract")
+def health_extract():
+    # Pages extracted by worker processes, and how their bodies were shipped.
+    pool = get_extract_pool()
+    return pool.stats() if pool is not None else {"enabled": False}
+
+
+@app.get("/healthz/robots")
+def health_robots():
+    return get_robots_cache().stats()
+
+
+@app.get("/healthz/results")
+def health_results():
+    # "memo": memoized check results; "store": the write-behind result store.
+    cache = get_result_cache()
+    return {
+        "memo": cache.stats() if cache is not None else {"enabled": False},
+        "store": get_result_store().stats(),
+    }
+
+
+@app.get("/healthz/coalescing")
+def health_coalescing():
+    # Analyses of the same URL and tools that overlapped and shared one run.
+    return coalescing_stats()
@@ -0,0 +1,307 @@
+"""SQLite store of the logs sent by the frontend, with a full-text index.
+
+Rows of ``frontend_logs`` are indexed by an FTS5 table,
+``frontend_logs_fts``. It uses external content: it stores only the index,
+not a second copy of each message, and triggers keep it in step with the
+table. A database created before the index existed is indexed when first
+opened. Searches take the syntax of :func:`~.logs.parse_search` and match
+the same entries as a search of the log ring buffer. An index on ``ts`` lets
+exports read a time window without scanning the table.
+
+Writes go through a :class:`~.write_behind.WriteBehind` writer, as in
+:mod:`.result_store`: :meth:`FrontendLogStore.add_many` puts the rows on a
+queue of ``FRONTEND_LOG_QUEUE`` rows and returns, blocking only while the
+queue is full. The writer commits them in groups of up to
+``FRONTEND_LOG_BATCH`` rows, gathered over at most
+``FRONTEND_LOG_FLUSH_INTERVAL`` seconds, one transaction each. Reads first
+wait for the rows queued before them. :meth:`FrontendLogStore.stats` reports
+the committed rows per second and the commit latencies.
+"""
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .logs import LogEntry, LogLevel, SEVERITY, fts_query, parse_search
+from .write_behind import WriteBehind
+
+FRONTEND_LOG_DB = os.environ.get("FRONTEND_LOG_DB", "frontend_logs.db")
+FRONTEND_LOG_BATCH = int(os.environ.get("FRONTEND_LOG_BATCH", "1000"))
+FRONTEND_LOG_FLUSH_INTERVAL = float(os.environ.get("FRONTEND_LOG_FLUSH_INTERVAL", "0.1"))
+FRONTEND_LOG_QUEUE = int(os.environ.get("FRONTEND_LOG_QUEUE", "50000"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS frontend_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts TEXT,
+    level TEXT,
+    source TEXT,
+    msg TEXT,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS frontend_logs_ts ON frontend_logs (ts, id);
+CREATE VIRTUAL TABLE IF NOT EXISTS frontend_logs_fts USING fts5(
+    msg, content='frontend_logs', content_rowid='id', tokenize='unicode61 remove_diacritics 0'
+);
+CREATE TRIGGER IF NOT EXISTS frontend_logs_ai AFTER INSERT ON frontend_logs BEGIN
+    INSERT INTO frontend_logs_fts (rowid, msg) VALUES (new.id, new.msg);
+END;
+CREATE TRIGGER IF NOT EXISTS frontend_logs_ad AFTER DELETE ON frontend_logs BEGIN
+    INSERT INTO frontend_logs_fts (frontend_logs_fts, rowid, msg) VALUES ('delete', old.id, old.msg);
+END;
+CREATE TRIGGER IF NOT EXISTS frontend_logs_au AFTER UPDATE OF msg ON frontend_logs BEGIN
+    INSERT INTO frontend_logs_fts (frontend_logs_fts, rowid, msg) VALUES ('delete', old.id, old.msg);
+    INSERT INTO frontend_logs_fts (rowid, msg) VALUES (new.id, new.msg);
+END;
+"""
+
+
+def normalize_level(level: Optional[str]) -> str:
+    """The :class:`LogLevel` name for a level sent by the frontend (INFO if unknown)."""
+    number = getattr(logging, (level or "INFO").upper(), logging.INFO)
+    name = logging.getLevelName(number) if isinstance(number, int) else "INFO"
+    return name if name in LogLevel.__members__ else "INFO"
+
+
+class FrontendLogStore:
+    def __init__(
+        self,
+        path: str = FRONTEND_LOG_DB,
+        batch_size: int = FRONTEND_LOG_BATCH,
+        flush_interval: float = FRONTEND_LOG_FLUSH_INTERVAL,
+        queue_size: int = FRONTEND_LOG_QUEUE,
+    ):
+        self.path = os.path.abspath(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writer = WriteBehind(
+            "frontend-logs", self._connect, self._write, self._written, batch_size, flush_interval, queue_size
+        )
+        self.counters = {"ingested": 0, "committed": 0, "failed": 0, "searches": 0}
+        # Counted once here and kept up to date, as COUNT(*) scans the table.
+        with self._lock:
+            (self._rows,) = self._db().execute("SELECT COUNT(*) FROM frontend_logs").fetchone()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        indexed = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'frontend_logs_fts'").fetchone()
+        conn.executescript(_SCHEMA)
+        if not indexed:
+            # Rows written before the index existed.
+            conn.execute("INSERT INTO frontend_logs_fts (frontend_logs_fts) VALUES ('rebuild')")
+        return conn
+
+    def _db(self) -> sqlite3.Connection:
+        # Readers' connection, used under ``_lock``.
+        if self._conn is None:
+            self._conn = self._connect()
+        return self._conn
+
+    # --- writes ----------------------------------------------------------------
+
+    def add(self, level: Optional[str], msg: str, source: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None) -> None:
+        """Queue one entry."""
+        self.add_many([(level, msg, source, metadata)])
+
+    def add_many(self, entries: Iterable[Tuple[Optional[str], str, Optional[str], Optional[Dict[str, Any]]]]) -> int:
+        """Queue ``(level, msg, source, metadata)`` entries and return how many.
+
+        Blocks only while the queue is full.
+        """
+        ts = datetime.utcnow().isoformat()
+        rows = [(ts, normalize_level(level), source, msg, json.dumps(metadata)) for level, msg, source, metadata in entries]
+        with self._lock:
+            self.counters["ingested"] += len(rows)
+        for row in rows:
+            self._writer.put(row)
+        return len(rows)
+
+    def flush(self) -> None:
+        """Wait until everything queued so far is committed."""
+        self._writer.flush()
+
+    def _write(self, conn: sqlite3.Connection, rows) -> None:
+        conn.executemany("INSERT INTO frontend_logs (ts, level, source, msg, metadata) VALUES (?,?,?,?,?)", rows)
+
+    def _written(self, rows, error: Optional[Exception]) -> None:
+        with self._lock:
+            if error is not None:
+                self.counters["failed"] += len(rows)
+            else:
+                self.counters["committed"] += len(rows)
+                self._rows += len(rows)
+
+    # --- queries ---------------------------------------------------------------
+
+    def _filters(self, source: Optional[str], level: Optional[LogLevel], q: Optional[str]) -> Optional[Tuple[str, List[str], List[Any]]]:
+        # (join, clauses, params) for the filters shared by searches and
+        # exports, or None when ``q`` has no terms and so matches nothing.
+        join, clauses, params = "", [], []
+        if q:
+            terms = parse_search(q)
+            if not terms:
+                return None
+            join = " JOIN frontend_logs_fts f ON f.rowid = l.id"
+            clauses.append("frontend_logs_fts MATCH ?")
+            params.append(fts_query(terms))
+        if source:
+            clauses.append("l.source = ?")
+            params.append(source)
+        if level:
+            names = [lvl.value for lvl in LogLevel if SEVERITY[lvl] >= SEVERITY[level]]
+            clauses.append(f"l.level IN ({','.join('?' * len(names))})")
+            params.extend(names)
+        return join, clauses, params
+
+    def search(
+        self,
+        *,
+        source: Optional[str] = None,
+        level: Optional[LogLevel] = None,
+        q: Optional[str] = None,
+        limit: int = 100,
+        after: Optional[int] = None,
+        before: Optional[int] = None,
+    ) -> List[LogEntry]:
+        """:meth:`~.logs.LogStore.query` over the stored entries."""
+        filters = self._filters(source, level, q)
+        if filters is None:
+            return []
+        join, clauses, params = filters
+        sql = "SELECT l.id, l.ts, l.level, l.source, l.msg, l.metadata FROM frontend_logs l" + join
+        # With a search, driven by the index, read newest first, so LIMIT
+        # ends the scan.
+        order = "f.rowid" if q else "l.id"
+        if after is not None:
+            clauses.append(f"{order} > ?")
+            params.append(after)
+        if before is not None:
+            clauses.append(f"{order} < ?")
+            params.append(before)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {order} DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        self.flush()
+        with self._lock:
+            rows = self._db().execute(sql, params).fetchall()
+            self.counters["searches"] += 1
+        return [_entry(row) for row in reversed(rows)]
+
+    def window(
+        self,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        *,
+        source: Optional[str] = None,
+        level: Optional[LogLevel] = None,
+        q: Optional[str] = None,
+        batch: int = 1000,
+    ) -> Iterator[List[tuple]]:
+        """Raw rows stored from ``start`` to ``end`` (naive UTC, inclusive), oldest first, in batches.
+
+        Pages through the ``ts`` index by (ts, id), so each batch is a fresh
+        range read and the lock is not held between batches.
+        """
+        filters = self._filters(source, level, q)
+        if filters is None:
+            return
+        join, clauses, params = filters
+        if start is not None:
+            clauses.append("l.ts >= ?")
+            params.append(start.isoformat())
+        if end is not None:
+            clauses.append("l.ts <= ?")
+            params.append(end.isoformat())
+        sql = "SELECT l.id, l.ts, l.level, l.source, l.msg, l.metadata FROM frontend_logs l" + join
+        self.flush()
+        cursor: Optional[Tuple[str, int]] = None
+        while True:
+            where = list(clauses)
+            args = list(params)
+            if cursor is not None:
+                where.append("(l.ts, l.id) > (?, ?)")
+                args.extend(cursor)
+            query = sql + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY l.ts, l.id LIMIT ?"
+            with self._lock:
+                rows = self._db().execute(query, [*args, batch]).fetchall()
+            if rows:
+                yield rows
+            if len(rows) < batch:
+                return
+            cursor = (rows[-1][1], rows[-1][0])
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters and row count, with the writer's throughput and commit
+        latency (see :meth:`~.write_behind.WriteBehind.stats`)."""
+        with self._lock:
+            counters = dict(self.counters)
+            rows = self._rows
+        return {**counters, "rows": rows, **self._writer.stats()}
+
+    def clear(self) -> None:
+        self.flush()
+        with self._lock:
+            deleted = self._db().execute("DELETE FROM frontend_logs").rowcount
+            self._rows -= deleted
+
+    def close(self) -> None:
+        """Commit everything queued, stop the writer and close the database."""
+        self._writer.close()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_LEVELS = {level.value: level for level in LogLevel}
+
+
+def _entry(row) -> LogEntry:
+    id_, ts, level, source, msg, metadata = row
+    return LogEntry(
+        id=id_,
+        ts=datetime.fromisoformat(ts),
+        # Levels are stored normalized, except in rows older than that.
+        level=_LEVELS.get(level) or LogLevel(normalize_level(level)),
+        msg=msg or "",
+        source=source,
+        metadata=json.loads(metadata) if metadata and metadata != "null" else None,
+    )
+
+
+def ndjson_line(row) -> str:
+    """A row from :meth:`FrontendLogStore.window` as one line of a log export.
+
+    The line has the fields of a :class:`LogEntry`, plus ``"origin":
+    "frontend"``, since the ids of stored rows are not those of the ring
+    buffer. It is built from the row as stored, without a LogEntry between.
+    """
+    id_, ts, level, source, msg, metadata = row
+    level = level if level in _LEVELS else normalize_level(level)
+    head = json.dumps({"id": id_, "ts": ts, "level": level, "msg": msg or "", "source": source}, separators=(",", ":"))
+    return f'{head[:-1]},"metadata":{metadata or "null"},"origin":"frontend"}}'
+
+
+_store: Optional[FrontendLogStore] = None
+_store_lock = threading.Lock()
+
+
+def get_frontend_log_store() -> FrontendLogStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = FrontendLogStore()
+                atexit.register(_store.close)
+    return _store
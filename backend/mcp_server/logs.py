@@ -1,10 +1,15 @@
 import asyncio
+import heapq
+import json
 import logging
-from collections import deque
+import re
+import threading
+from bisect import bisect_left, bisect_right, insort
 from datetime import datetime
 from enum import Enum
 from itertools import count
-from typing import Any, Deque, Dict, Iterable, List, Optional, Set
+from operator import attrgetter
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 
 from pydantic import BaseModel
 
@@ -29,18 +34,433 @@ class LogEntry(BaseModel):
 
 class LogPage(BaseModel):
     items: List[LogEntry]
+    # Pass as ``after`` for newer entries, or ``prev`` as ``before`` for older ones.
     next: Optional[int] = None
+    prev: Optional[int] = None
+
+
+# --- Full-text search --------------------------------------------------------
+
+# Letters and digits, as FTS5's unicode61 tokenizer splits them.
+_TOKEN = re.compile(r"[^\W_]+")
+_TERM = re.compile(r'"([^"]*)"?(\*?)|(\S+)')
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+class SearchTerm(NamedTuple):
+    #: Consecutive tokens; a single word is a one-token phrase.
+    tokens: Tuple[str, ...]
+    #: Whether the last token only has to start a word.
+    prefix: bool
+
+    def matches(self, words: List[str]) -> bool:
+        """Whether the term occurs in ``words``, a tokenized message."""
+        first, *rest = self.tokens
+        if not rest:
+            return any(word.startswith(first) for word in words) if self.prefix else first in words
+        *middle, last = rest
+        n = len(self.tokens)
+        i = -1
+        while True:
+            try:
+                i = words.index(first, i + 1)
+            except ValueError:
+                return False
+            if i + n > len(words):
+                return False
+            if words[i + 1 : i + n - 1] == middle and (words[i + n - 1].startswith(last) if self.prefix else words[i + n - 1] == last):
+                return True
+
+
+def parse_search(q: str) -> List[SearchTerm]:
+    """The terms of a ``q`` search, all of which an entry must match.
+
+    The syntax is FTS5's: ``word`` matches the word, ``word*`` any word
+    starting with it, and ``"two words"`` the words in sequence (``"two
+    wo"*`` ending with a prefix). Case is ignored and punctuation separates
+    words, so ``foo-bar`` is the phrase ``"foo bar"``.
+    """
+    terms = []
+    for phrase, star, word in _TERM.findall(q):
+        text = phrase if phrase or star else word
+        tokens = tuple(tokenize(text))
+        if tokens:
+            terms.append(SearchTerm(tokens, bool(star) or (not phrase and text.endswith("*"))))
+    return terms
+
+
+def fts_query(terms: List[SearchTerm]) -> str:
+    """``terms`` as an FTS5 ``MATCH`` expression."""
+    # Every term quoted, so FTS5 never reads a word as an operator.
+    return " AND ".join('"' + " ".join(term.tokens) + '"' + (" *" if term.prefix else "") for term in terms)
 
 
 # --- Ring buffer -------------------------------------------------------------
 
 BUFFER_SIZE = 50_000
-_stream_queue_size = int(__import__("os").environ.get("LOG_STREAM_QUEUE", "100"))
+# Most entries sent in one frame of a live stream.
+STREAM_BATCH = int(__import__("os").environ.get("LOG_STREAM_BATCH", "200"))
+
+# Numeric severity of each level, for ``level=`` filters.
+SEVERITY = {level: logging.getLevelName(level.value) for level in LogLevel}
+_entry_id = attrgetter("id")
+
+
+class _Ring:
+    """Entries in ascending id order; the oldest leave from the front in O(1).
+
+    Lists with a moving start rather than a deque, so that a position can be
+    found by bisecting on the ids, kept in a list of their own. The dead
+    front is trimmed once it is as long as the live part.
+    """
+
+    __slots__ = ("items", "ids", "start")
+
+    def __init__(self):
+        self.items: List[LogEntry] = []
+        self.ids: List[int] = []
+        self.start = 0
+
+    def __len__(self) -> int:
+        return len(self.items) - self.start
+
+    def __iter__(self) -> Iterator[LogEntry]:
+        return iter(self.items[self.start:])
+
+    def append(self, entry: LogEntry) -> None:
+        self.items.append(entry)
+        self.ids.append(entry.id)
+
+    def popleft(self) -> LogEntry:
+        entry = self.items[self.start]
+        self.start += 1
+        if self.start >= 1024 and self.start * 2 >= len(self.items):
+            del self.items[: self.start]
+            del self.ids[: self.start]
+            self.start = 0
+        return entry
+
+    def newest_first(self, before: Optional[int] = None) -> Iterator[LogEntry]:
+        """Entries with an id below ``before`` (all when None), newest first."""
+        items, start = self.items, self.start
+        stop = len(items) if before is None else bisect_left(self.ids, before, start)
+        return (items[i] for i in range(stop - 1, start - 1, -1))
+
+
+class _TimedRing(_Ring):
+    """A :class:`_Ring` that can also be searched by time.
+
+    ``times`` holds the running maximum of the timestamps rather than the
+    timestamps themselves. Threads can log a hair out of order, and the
+    maximum keeps the list sorted for bisection regardless.
+    """
+
+    __slots__ = ("times",)
+
+    def __init__(self):
+        super().__init__()
+        self.times: List[datetime] = []
+
+    def append(self, entry: LogEntry) -> None:
+        super().append(entry)
+        self.times.append(max(entry.ts, self.times[-1]) if self.times else entry.ts)
+
+    def popleft(self) -> LogEntry:
+        start = self.start
+        entry = super().popleft()
+        if self.start < start:
+            del self.times[: start + 1]
+        return entry
+
+
+class _EventRing(_TimedRing):
+    """A :class:`_TimedRing` that also keeps each entry's server-sent event.
+
+    Events are serialised when a live stream first reads the entry, and the
+    same string then goes to every other stream.
+    """
+
+    __slots__ = ("events",)
+
+    def __init__(self):
+        super().__init__()
+        self.events: List[Optional[str]] = []
+
+    def append(self, entry: LogEntry) -> None:
+        super().append(entry)
+        self.events.append(None)
+
+    def popleft(self) -> LogEntry:
+        start = self.start
+        entry = super().popleft()
+        if self.start < start:
+            del self.events[: start + 1]
+        return entry
+
+
+def _union(rings: List[_Ring], before: Optional[int]) -> Iterator[LogEntry]:
+    """Entries of any of ``rings`` below ``before``, newest first, each once."""
+    if len(rings) == 1:
+        return rings[0].newest_first(before)
+    return _distinct(heapq.merge(*(ring.newest_first(before) for ring in rings), key=_entry_id, reverse=True))
+
+
+def _distinct(entries: Iterator[LogEntry]) -> Iterator[LogEntry]:
+    last = None
+    for entry in entries:
+        if entry.id != last:
+            last = entry.id
+            yield entry
+
+
+class LogStore:
+    """The ring buffer of log entries, indexed by id, source, level and word.
+
+    Holds the newest ``maxlen`` entries. Alongside them it keeps one
+    :class:`_Ring` per source, per level, per word of the messages (an
+    inverted index) and per pair of adjacent words, holding the same
+    entries. All of them are updated as
+    entries arrive and leave. A query bisects to its ``before`` cursor and
+    reads the most selective ring backwards from there. It stops at its
+    ``after`` cursor or after ``limit`` matches, so a page costs about
+    ``limit`` entries however full the buffer is.
+    """
+
+    def __init__(self, maxlen: int = BUFFER_SIZE):
+        self.maxlen = maxlen
+        self._lock = threading.RLock()
+        self._entries = _EventRing()
+        self._by_source: Dict[Optional[str], _Ring] = {}
+        self._by_level: Dict[LogLevel, _Ring] = {}
+        self._postings: Dict[str, _Ring] = {}
+        # Pairs of adjacent words, so phrases read only entries that have them.
+        self._pairs: Dict[Tuple[str, str], _Ring] = {}
+        # Sorted words of ``_postings``, to find the words a prefix starts.
+        self._vocabulary: List[str] = []
 
-log_buffer: Deque[LogEntry] = deque(maxlen=BUFFER_SIZE)
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[LogEntry]:
+        with self._lock:
+            return iter(list(self._entries))
+
+    def append(self, entry: LogEntry) -> None:
+        with self._lock:
+            if len(self._entries) >= self.maxlen:
+                self._evict()
+            self._entries.append(entry)
+            self._by_source.setdefault(entry.source, _Ring()).append(entry)
+            self._by_level.setdefault(entry.level, _Ring()).append(entry)
+            words = tokenize(entry.msg)
+            for word in set(words):
+                ring = self._postings.get(word)
+                if ring is None:
+                    ring = self._postings[word] = _Ring()
+                    insort(self._vocabulary, word)
+                ring.append(entry)
+            for pair in set(zip(words, words[1:])):
+                self._pairs.setdefault(pair, _Ring()).append(entry)
+
+    def _evict(self) -> None:
+        # The oldest entry overall is also the oldest of its source, level
+        # and words.
+        oldest = self._entries.popleft()
+        for index, key in ((self._by_source, oldest.source), (self._by_level, oldest.level)):
+            ring = index[key]
+            ring.popleft()
+            if not ring:
+                del index[key]
+        words = tokenize(oldest.msg)
+        for word in set(words):
+            ring = self._postings[word]
+            ring.popleft()
+            if not ring:
+                del self._postings[word]
+                del self._vocabulary[bisect_left(self._vocabulary, word)]
+        for pair in set(zip(words, words[1:])):
+            ring = self._pairs[pair]
+            ring.popleft()
+            if not ring:
+                del self._pairs[pair]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries = _EventRing()
+            self._by_source.clear()
+            self._by_level.clear()
+            self._postings.clear()
+            self._pairs.clear()
+            self._vocabulary.clear()
+
+    def _word_rings(self, term: SearchTerm) -> List[_Ring]:
+        # The rarest word, or pair of adjacent words, of the term stands for
+        # it; the rest of the term is checked on the entries.
+        *head, last = term.tokens
+        whole = head if term.prefix else term.tokens
+        choices = [[self._postings[word]] if word in self._postings else [] for word in head]
+        choices.extend([self._pairs[pair]] if pair in self._pairs else [] for pair in zip(whole, whole[1:]))
+        if term.prefix:
+            start = bisect_left(self._vocabulary, last)
+            stop = bisect_left(self._vocabulary, last + "\U0010ffff", start)
+            choices.append([self._postings[word] for word in self._vocabulary[start:stop]])
+        else:
+            choices.append([self._postings[last]] if last in self._postings else [])
+        return min(choices, key=lambda rings: sum(map(len, rings)))
+
+    def _candidates(
+        self, source: Optional[str], level: Optional[LogLevel], terms: List[SearchTerm], before: Optional[int]
+    ) -> Tuple[Iterator[LogEntry], Optional[SearchTerm]]:
+        """Entries that may match, newest first, and the term they all match, if any."""
+        # Every filter names a set of rings holding all its matches; read
+        # the smallest set. The other filters are checked on each entry.
+        options: List[Tuple[List[_Ring], Optional[SearchTerm]]] = [([self._entries], None)]
+        if source:
+            options.append(([self._by_source[source]] if source in self._by_source else [], None))
+        if level:
+            options.append(([ring for lvl, ring in self._by_level.items() if SEVERITY[lvl] >= SEVERITY[level]], None))
+        options.extend((self._word_rings(term), term) for term in terms)
+        rings, term = min(options, key=lambda option: sum(map(len, option[0])))
+        if not rings:
+            return iter(()), None
+        # A one-word term is matched by every entry of its rings.
+        return _union(rings, before), term if term is not None and len(term.tokens) == 1 else None
+
+    def _matcher(self, source: Optional[str], level: Optional[LogLevel], terms: List[SearchTerm]) -> Callable[[LogEntry], bool]:
+        floor = SEVERITY[level] if level else None
+
+        def matches(entry: LogEntry) -> bool:
+            if source and entry.source != source:
+                return False
+            if floor is not None and SEVERITY[entry.level] < floor:
+                return False
+            if terms:
+                words = tokenize(entry.msg)
+                return all(term.matches(words) for term in terms)
+            return True
+
+        return matches
+
+    def query(
+        self,
+        *,
+        source: Optional[str] = None,
+        level: Optional[LogLevel] = None,
+        q: Optional[str] = None,
+        limit: int = 100,
+        after: Optional[int] = None,
+        before: Optional[int] = None,
+    ) -> List[LogEntry]:
+        """The newest ``limit`` (0: all) matching entries with ``after < id < before``, oldest first.
+
+        ``q`` is a search in the syntax of :func:`parse_search`.
+        """
+        terms = parse_search(q) if q else []
+        if q and not terms:
+            # Nothing searchable, e.g. only punctuation.
+            return []
+        items: List[LogEntry] = []
+        with self._lock:
+            candidates, covered = self._candidates(source, level, terms, before)
+            matches = self._matcher(source, level, [term for term in terms if term != covered])
+            for entry in candidates:
+                if after is not None and entry.id <= after:
+                    break
+                if not matches(entry):
+                    continue
+                items.append(entry)
+                if limit and len(items) >= limit:
+                    break
+        items.reverse()
+        return items
+
+    def window(
+        self,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        *,
+        source: Optional[str] = None,
+        level: Optional[LogLevel] = None,
+        q: Optional[str] = None,
+        skip_source: Optional[str] = None,
+        batch: int = 1000,
+    ) -> Iterator[List[LogEntry]]:
+        """Matching entries logged from ``start`` to ``end`` (inclusive), oldest first, in batches.
+
+        Seeks to ``start`` by bisection, so only the window is read, and
+        holds the lock one batch at a time, so logging carries on during a
+        long export. Entries logged after the export started, and entries
+        evicted before their batch was read, are left out.
+        """
+        terms = parse_search(q) if q else []
+        if q and not terms:
+            return
+        matches = self._matcher(source, level, terms)
+        cursor = last = None
+        while True:
+            items = []
+            with self._lock:
+                ring = self._entries
+                if not ring:
+                    return
+                if cursor is None:
+                    last = ring.ids[-1]
+                    i = ring.start if start is None else bisect_left(ring.times, start, ring.start)
+                else:
+                    i = bisect_right(ring.ids, cursor, ring.start)
+                stop = bisect_right(ring.ids, last, i)
+                if end is not None:
+                    stop = bisect_right(ring.times, end, i, stop)
+                j = min(stop, i + batch)
+                for entry in ring.items[i:j]:
+                    if start is not None and entry.ts < start or end is not None and entry.ts > end:
+                        continue  # logged out of order, just outside the window
+                    if skip_source is not None and entry.source == skip_source:
+                        continue
+                    if matches(entry):
+                        items.append(entry)
+                if j > i:
+                    cursor = ring.ids[j - 1]
+            if items:
+                yield items
+            if j >= stop:
+                return
+
+    def last_id(self) -> int:
+        """Id of the newest entry, 0 when empty."""
+        with self._lock:
+            ring = self._entries
+            return ring.ids[-1] if ring else 0
+
+    def events_after(self, cursor: int, limit: int) -> Tuple[List[LogEntry], List[str], int]:
+        """Up to ``limit`` entries logged after id ``cursor``, with their SSE events.
+
+        Also returns how many entries after ``cursor`` have been evicted
+        since, and so will not be read.
+        """
+        with self._lock:
+            ring = self._entries
+            i = bisect_right(ring.ids, cursor, ring.start)
+            j = min(len(ring.items), i + limit)
+            missed = max(0, ring.ids[i] - cursor - 1) if i == ring.start and i < j else 0
+            events = ring.events
+            for k in range(i, j):
+                if events[k] is None:
+                    entry = ring.items[k]
+                    events[k] = f"id: {entry.id}\ndata: {entry.model_dump_json()}\n\n"
+            return ring.items[i:j], events[i:j], missed
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "words": len(self._postings), "word_pairs": len(self._pairs)}
+
+
+log_buffer = LogStore(BUFFER_SIZE)
 log_id = count(1)
 
-subscribers: Set[asyncio.Queue] = set()
 frontend_last_ingest: Optional[datetime] = None
 
 SENSITIVE_KEYS = {
@@ -67,6 +487,137 @@ def redact_metadata(metadata: Optional[Dict[str, Any]]) -> Optional[Dict[str, An
     return redacted
 
 
+# --- Live streams ------------------------------------------------------------
+
+class _LoopWaiters:
+    # The streams of one event loop wait on ``wake``, which a wakeup
+    # resolves and replaces.
+    __slots__ = ("loop", "wake", "streams", "pending")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.wake = loop.create_future()
+        self.streams = 0
+        self.pending = False
+
+
+class Broadcaster:
+    """Live streams of the entries of a :class:`LogStore`.
+
+    Entries are not pushed to the streams. Each stream keeps a cursor, the id
+    of the last entry it sent, and reads on from the store when woken. A slow
+    client therefore falls behind rather than losing entries, unless they
+    leave the buffer first. Entries are serialised once for all streams, and
+    a stream sends everything it has to catch up on, up to ``STREAM_BATCH``
+    entries, in one frame.
+
+    :meth:`notify` may be called from any thread. It wakes the streams of each
+    event loop through ``call_soon_threadsafe``, with at most one wakeup
+    pending per loop, so a burst of entries costs a single wakeup.
+    """
+
+    def __init__(self, store: LogStore):
+        self.store = store
+        self._lock = threading.Lock()
+        self._loops: Dict[asyncio.AbstractEventLoop, _LoopWaiters] = {}
+        self.counters = {"wakeups": 0, "frames": 0, "events": 0, "missed": 0}
+
+    def notify(self) -> None:
+        """Wake the streams: entries were added to the store."""
+        if not self._loops:
+            return
+        with self._lock:
+            for loop, waiters in list(self._loops.items()):
+                if waiters.pending:
+                    continue
+                try:
+                    loop.call_soon_threadsafe(self._wake, waiters)
+                except RuntimeError:
+                    # Closed without its streams ending.
+                    del self._loops[loop]
+                    continue
+                waiters.pending = True
+                self.counters["wakeups"] += 1
+
+    def _wake(self, waiters: _LoopWaiters) -> None:
+        with self._lock:
+            waiters.pending = False
+        wake, waiters.wake = waiters.wake, waiters.loop.create_future()
+        wake.set_result(None)
+
+    def _join(self) -> _LoopWaiters:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            waiters = self._loops.get(loop)
+            if waiters is None:
+                waiters = self._loops[loop] = _LoopWaiters(loop)
+            waiters.streams += 1
+            return waiters
+
+    def _leave(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            waiters = self._loops[loop]
+            waiters.streams -= 1
+            if not waiters.streams:
+                del self._loops[loop]
+
+    async def stream(
+        self,
+        cursor: Optional[int] = None,
+        *,
+        source: Optional[str] = None,
+        heartbeat: float = 15,
+        batch: Optional[int] = None,
+    ) -> AsyncIterator[str]:
+        """SSE frames of the entries logged after id ``cursor``, or from now when None.
+
+        Each entry is an event with its id, so a reconnecting EventSource
+        resumes from ``Last-Event-ID``. Entries evicted before they were
+        sent are reported in a ``warning`` event. Runs until cancelled.
+        """
+        batch = batch or STREAM_BATCH
+        waiters = self._join()
+        try:
+            if cursor is None:
+                cursor = self.store.last_id()
+            yield ":heartbeat\n\n"
+            while True:
+                entries, events, missed = self.store.events_after(cursor, batch)
+                if missed:
+                    with self._lock:
+                        self.counters["missed"] += missed
+                    yield f"event: warning\ndata: {json.dumps({'missed': missed})}\n\n"
+                if entries:
+                    cursor = entries[-1].id
+                    if source:
+                        events = [event for entry, event in zip(entries, events) if entry.source == source]
+                    if events:
+                        with self._lock:
+                            self.counters["frames"] += 1
+                            self.counters["events"] += len(events)
+                        yield "".join(events)
+                    else:
+                        await asyncio.sleep(0)
+                    continue
+                # Taken in the same step as the read above, so an entry logged
+                # after the read resolves it, even if its wakeup was already
+                # pending. Awaited without cancelling it, as it is shared.
+                done, _ = await asyncio.wait((waiters.wake,), timeout=heartbeat)
+                if not done:
+                    yield ":heartbeat\n\n"
+        finally:
+            self._leave()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            streams = sum(waiters.streams for waiters in self._loops.values())
+            return {"streams": streams, "loops": len(self._loops), **self.counters}
+
+
+broadcaster = Broadcaster(log_buffer)
+
+
 class RingBufferHandler(logging.Handler):
     """Logging handler that stores records in a ring buffer and mirrors output."""
 
@@ -86,19 +637,7 @@ class RingBufferHandler(logging.Handler):
                 metadata=redact_metadata(metadata),
             )
             log_buffer.append(entry)
-            for q in list(subscribers):
-                try:
-                    q.put_nowait(entry)
-                except asyncio.QueueFull:
-                    while not q.empty():
-                        try:
-                            q.get_nowait()
-                        except asyncio.QueueEmpty:
-                            break
-                    try:
-                        q.put_nowait({"warning": "queue full"})
-                    except asyncio.QueueFull:
-                        pass
+            broadcaster.notify()
             for h in self.mirror_handlers:
                 h.handle(record)
         except Exception:
@@ -123,32 +662,9 @@ def get_page(
     q: Optional[str] = None,
     limit: int = 100,
     after: Optional[int] = None,
+    before: Optional[int] = None,
 ) -> LogPage:
-    items = []
-    for entry in log_buffer:
-        if after is not None and entry.id <= after:
-            continue
-        if source and entry.source != source:
-            continue
-        if level and logging.getLevelName(entry.level.value) < logging.getLevelName(level.value):
-            continue
-        if q and q.lower() not in entry.msg.lower():
-            continue
-        items.append(entry)
-    if limit:
-        items = items[-limit:]
+    items = log_buffer.query(source=source, level=level, q=q, limit=limit, after=after, before=before)
     next_id = items[-1].id if items else after
-    return LogPage(items=items, next=next_id)
-
-
-# --- Subscription helpers ----------------------------------------------------
-
-
-def subscribe() -> asyncio.Queue:
-    q: asyncio.Queue = asyncio.Queue(maxsize=_stream_queue_size)
-    subscribers.add(q)
-    return q
-
-
-def unsubscribe(q: asyncio.Queue) -> None:
-    subscribers.discard(q)
+    prev_id = items[0].id if items else before
+    return LogPage(items=items, next=next_id, prev=prev_id)
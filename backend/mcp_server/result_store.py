@@ -0,0 +1,341 @@
+"""SQLite store of analysis runs, the pages they fetched and their check results.
+
+Replaces the ``seo_<check>_<slug>.json`` files that used to be written into
+the working directory for every check. The store has three tables:
+
+- ``runs``: one row per analysis, batch, crawl or single MCP check;
+- ``pages``: one row per page a run fetched, with its status and content hash;
+- ``results``: one row per check result. Summary and metrics are JSON, and the
+  evidence is a zlib-compressed JSON blob.
+
+Results are indexed by URL, run, check and time. Writes go through a
+:class:`~.write_behind.WriteBehind` writer: ``add_result`` and friends only
+put the row on a queue of ``RESULT_STORE_QUEUE`` rows and return. A
+background thread commits the queue in groups of up to ``RESULT_STORE_BATCH``
+rows, gathered over at most ``RESULT_STORE_FLUSH_INTERVAL`` seconds, one
+transaction each. When the queue is full, producers block until the writer
+catches up. Queries first wait for everything queued before them, and
+:meth:`ResultStore.close` (at exit, or on API shutdown) commits what is left.
+:meth:`ResultStore.persistence` tells whether a result is still ``queued``,
+``committed`` or ``failed``. :meth:`ResultStore.export_json` writes the old
+file layout for tools that still read it::
+
+    python -m backend.mcp_server.result_store export OUT_DIR [--url URL] [--run RUN_ID]
+"""
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+from urllib.parse import urlparse
+
+from .write_behind import WriteBehind
+
+RESULT_STORE_PATH = os.environ.get("RESULT_STORE_PATH", "results.sqlite")
+RESULT_STORE_BATCH = int(os.environ.get("RESULT_STORE_BATCH", "200"))
+RESULT_STORE_FLUSH_INTERVAL = float(os.environ.get("RESULT_STORE_FLUSH_INTERVAL", "1.0"))
+RESULT_STORE_QUEUE = int(os.environ.get("RESULT_STORE_QUEUE", "10000"))
+# Failed result ids remembered for persistence reporting.
+MAX_FAILED = 10_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    url TEXT,
+    tools TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS runs_started_at ON runs (started_at);
+CREATE TABLE IF NOT EXISTS pages (
+    run_id TEXT NOT NULL,
+    url TEXT NOT NULL,
+    status_code INTEGER,
+    content_hash TEXT,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (run_id, url)
+);
+CREATE INDEX IF NOT EXISTS pages_url ON pages (url, fetched_at);
+CREATE TABLE IF NOT EXISTS results (
+    id TEXT PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    url TEXT NOT NULL,
+    check_name TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    summary TEXT NOT NULL,
+    metrics TEXT NOT NULL,
+    details TEXT NOT NULL,
+    evidence BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_url ON results (url, created_at);
+CREATE INDEX IF NOT EXISTS results_run ON results (run_id);
+CREATE INDEX IF NOT EXISTS results_check ON results (check_name, created_at);
+CREATE INDEX IF NOT EXISTS results_created_at ON results (created_at);
+"""
+
+
+def url_to_slug(url: str) -> str:
+    h = hashlib.sha1(url.encode()).hexdigest()[:8]
+    netloc = urlparse(url).netloc.replace('.', '_')
+    return f"{netloc}_{h}"
+
+
+def _pack(value: Any) -> bytes:
+    return zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+
+def _unpack(blob: bytes) -> Any:
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class ResultStore:
+    def __init__(
+        self,
+        path: str = RESULT_STORE_PATH,
+        batch_size: int = RESULT_STORE_BATCH,
+        flush_interval: float = RESULT_STORE_FLUSH_INTERVAL,
+        queue_size: int = RESULT_STORE_QUEUE,
+    ):
+        self.path = os.path.abspath(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writer = WriteBehind(
+            "result-store", self._connect, self._write, self._written, batch_size, flush_interval, queue_size
+        )
+        # Results accepted but not committed yet, and the latest that failed.
+        self._queued: set = set()
+        self._failed: "OrderedDict[str, str]" = OrderedDict()
+        self.counters = {"runs": 0, "results": 0, "committed": 0, "failed": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def _db(self) -> sqlite3.Connection:
+        # Readers' connection, used under ``_lock``.
+        if self._conn is None:
+            self._conn = self._connect()
+        return self._conn
+
+    # --- writes ----------------------------------------------------------------
+
+    def start_run(self, kind: str, url: Optional[str] = None, tools: Sequence[str] = ()) -> str:
+        """Record a new run and return its id."""
+        run_id = uuid.uuid4().hex
+        with self._lock:
+            self.counters["runs"] += 1
+        self._writer.put(("runs", (run_id, kind, url, json.dumps(list(tools)), time.time())))
+        return run_id
+
+    def finish_run(self, run_id: str) -> None:
+        self._writer.put(("finished", (time.time(), run_id)))
+
+    def add_page(self, run_id: str, url: str, status_code: Optional[int] = None, content_hash: Optional[str] = None) -> None:
+        self._writer.put(("pages", (run_id, url, status_code, content_hash, time.time())))
+
+    def add_result(self, run_id: str, url: str, check_name: str, result: Dict[str, Any]) -> str:
+        """Queue the composed ``result`` of ``check_name`` and return its id.
+
+        Blocks only while the queue is full.
+        """
+        result_id = uuid.uuid4().hex
+        row = (
+            result_id,
+            run_id,
+            url,
+            check_name,
+            time.time(),
+            json.dumps(result.get("summary", {}), ensure_ascii=False),
+            json.dumps(result.get("metrics", {}), ensure_ascii=False),
+            json.dumps(result.get("details", []), ensure_ascii=False),
+            _pack(result.get("evidence")),
+        )
+        with self._lock:
+            self.counters["results"] += 1
+            self._queued.add(result_id)
+        self._writer.put(("results", row))
+        return result_id
+
+    def persistence(self, result_id: str) -> str:
+        """``queued``, ``committed`` or ``failed``."""
+        with self._lock:
+            if result_id in self._queued:
+                return "queued"
+            if result_id in self._failed:
+                return "failed"
+            return "committed"
+
+    def flush(self) -> None:
+        """Wait until everything queued so far is committed."""
+        self._writer.flush()
+
+    def _write(self, conn: sqlite3.Connection, items) -> None:
+        # On the writer's connection, in its transaction, without ``_lock``.
+        rows: Dict[str, List[tuple]] = {"runs": [], "pages": [], "results": [], "finished": []}
+        for table, row in items:
+            rows[table].append(row)
+        conn.executemany(
+            "INSERT OR IGNORE INTO runs (id, kind, url, tools, started_at) VALUES (?, ?, ?, ?, ?)", rows["runs"]
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO pages (run_id, url, status_code, content_hash, fetched_at) VALUES (?, ?, ?, ?, ?)",
+            rows["pages"],
+        )
+        conn.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows["results"])
+        conn.executemany("UPDATE runs SET finished_at = ? WHERE id = ?", rows["finished"])
+
+    def _written(self, items, error: Optional[Exception]) -> None:
+        result_ids = [row[0] for table, row in items if table == "results"]
+        with self._lock:
+            if error is not None:
+                self.counters["failed"] += len(result_ids)
+                for result_id in result_ids:
+                    self._failed[result_id] = str(error)
+                while len(self._failed) > MAX_FAILED:
+                    self._failed.popitem(last=False)
+            else:
+                self.counters["committed"] += len(result_ids)
+            self._queued.difference_update(result_ids)
+
+    # --- queries ---------------------------------------------------------------
+
+    def results(
+        self,
+        url: Optional[str] = None,
+        run_id: Optional[str] = None,
+        check: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 100,
+        offset: int = 0,
+        evidence: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """Stored results, newest first, filtered by URL, run, check and time (epoch seconds)."""
+        clauses, params = [], []
+        for column, value in (("url", url), ("run_id", run_id), ("check_name", check)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at <= ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        query = (
+            "SELECT id, run_id, url, check_name, created_at, summary, metrics, details, evidence "
+            f"FROM results {where} ORDER BY created_at DESC, rowid DESC LIMIT ? OFFSET ?"
+        )
+        self.flush()
+        with self._lock:
+            rows = self._db().execute(query, (*params, limit, offset)).fetchall()
+        out = []
+        for row in rows:
+            item = {
+                "id": row[0],
+                "run_id": row[1],
+                "url": row[2],
+                "check": row[3],
+                "created_at": row[4],
+                "result": {"summary": json.loads(row[5]), "metrics": json.loads(row[6]), "details": json.loads(row[7])},
+            }
+            if evidence:
+                item["result"]["evidence"] = _unpack(row[8])
+            out.append(item)
+        return out
+
+    def run(self, run_id: str, evidence: bool = True) -> Optional[Dict[str, Any]]:
+        """A run with its pages and results, or None if unknown."""
+        self.flush()
+        with self._lock:
+            conn = self._db()
+            row = conn.execute("SELECT id, kind, url, tools, started_at, finished_at FROM runs WHERE id = ?", (run_id,)).fetchone()
+            if row is None:
+                return None
+            pages = conn.execute(
+                "SELECT url, status_code, content_hash, fetched_at FROM pages WHERE run_id = ? ORDER BY fetched_at", (run_id,)
+            ).fetchall()
+        return {
+            "id": row[0],
+            "kind": row[1],
+            "url": row[2],
+            "tools": json.loads(row[3]),
+            "started_at": row[4],
+            "finished_at": row[5],
+            "pages": [dict(zip(("url", "status_code", "content_hash", "fetched_at"), page)) for page in pages],
+            "results": self.results(run_id=run_id, limit=-1, evidence=evidence),
+        }
+
+    def export_json(self, directory: str = ".", url: Optional[str] = None, run_id: Optional[str] = None) -> List[str]:
+        """Write the latest result per URL and check as ``seo_<check>_<slug>.json`` files; return their paths."""
+        os.makedirs(directory, exist_ok=True)
+        written = {}
+        for item in self.results(url=url, run_id=run_id, limit=-1):
+            filename = os.path.join(directory, f"seo_{item['check']}_{url_to_slug(item['url'])}.json")
+            if filename in written:
+                continue  # Newest first: an older result of the same check and URL.
+            with open(filename, "w", encoding="utf-8") as f:
+                json.dump(item["result"], f, indent=2, ensure_ascii=False)
+            written[filename] = True
+        return list(written)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+            uncommitted = len(self._queued)
+        return {"path": self.path, **self._writer.stats(), "uncommitted_results": uncommitted, **counters}
+
+    def close(self) -> None:
+        """Commit everything queued, stop the writer and close the database."""
+        self._writer.close()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_store: Optional[ResultStore] = None
+_store_lock = threading.Lock()
+
+
+def get_result_store() -> ResultStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ResultStore()
+                atexit.register(_store.close)
+    return _store
+
+
+def main(argv=None) -> None:
+    cli = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    commands = cli.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="write results in the seo_<check>_<slug>.json layout")
+    export.add_argument("directory")
+    export.add_argument("--url")
+    export.add_argument("--run", dest="run_id")
+    export.add_argument("--db", default=RESULT_STORE_PATH)
+    args = cli.parse_args(argv)
+    store = ResultStore(args.db)
+    paths = store.export_json(args.directory, url=args.url, run_id=args.run_id)
+    print(f"Exported {len(paths)} results to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
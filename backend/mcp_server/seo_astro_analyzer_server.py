@@ -1,23 +1,44 @@
 from fastmcp import FastMCP
 from backend.seo_tools import title_meta, robots_canonical, headings, images_alt, links, structured_data, open_graph_twitter, wordcount_keywords, favicon_apple, lang_charset, sitemap_robots
-import hashlib
-import json
+from backend.seo_tools import resilience, singleflight
+from backend.seo_tools.frontier import Frontier, normalize_url, same_site
+from backend.seo_tools.page import fetch_head, fetch_head_async, fetch_page, fetch_page_async
+from backend.seo_tools.parsers import get_parser
+from backend.seo_tools.result_cache import MISS, get_result_cache
+from backend.seo_tools.robots import get_robots_cache
+from backend.seo_tools.sitemaps import aiter_site_urls, sitemap_url_page
+from backend.mcp_server.result_store import get_result_store
+import asyncio
+from contextlib import aclosing
+import copy
 import logging
+import math
+import os
 import sys
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, NamedTuple, Optional
+from urllib.parse import urlsplit
 
-def url_to_slug(url: str) -> str:
-    h = hashlib.sha1(url.encode()).hexdigest()[:8]
-    from urllib.parse import urlparse
-    netloc = urlparse(url).netloc.replace('.', '_')
-    return f"{netloc}_{h}"
+def save_result(result, url, check_name, run_id):
+    # Queued for the store's background writer; "persistence" tells whether
+    # it has been committed yet.
+    store = get_result_store()
+    result_id = store.add_result(run_id, url, check_name, result)
+    logging.info(f"Queued result for {check_name} on {url} in run {run_id}")
+    return {
+        "result": result,
+        "saved_to": store.path,
+        "run_id": run_id,
+        "result_id": result_id,
+        "persistence": store.persistence(result_id),
+    }
 
-def save_result(result, url, check_name):
-    slug = url_to_slug(url)
-    filename = f"seo_{check_name}_{slug}.json"
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(result, f, indent=2, ensure_ascii=False)
-    logging.info(f"Saved result for {check_name} on {url} to {filename}")
-    return {"result": result, "saved_to": filename}
+def _report_persistence(entries):
+    store = get_result_store()
+    for entry in entries:
+        if "result" in entry:
+            entry["result"]["persistence"] = store.persistence(entry["result"]["result_id"])
+    return entries
 
 def log_request(tool_name, url, extra=None):
     msg = f"Tool called: {tool_name} for URL: {url}"
@@ -25,6 +46,28 @@ def log_request(tool_name, url, extra=None):
         msg += f" | Extra: {extra}"
     logging.info(msg)
 
+# "stream" runs page checks through the single-pass extraction engine,
+# "soup" through the per-check BeautifulSoup functions.
+ENGINE = os.environ.get("ANALYZER_ENGINE", "stream")
+# Upper bound on tools of one analysis running at the same time.
+ANALYZE_CONCURRENCY = int(os.environ.get("ANALYZE_CONCURRENCY", "4"))
+# Upper bounds on URLs of one batch analysed at the same time, overall and per host.
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "8"))
+BATCH_PER_HOST = int(os.environ.get("BATCH_PER_HOST", "2"))
+MAX_BATCH_URLS = int(os.environ.get("MAX_BATCH_URLS", "500"))
+# Site crawls: upper bound on pages per crawl and default worker count, and
+# upper bounds on the workers and link depth a caller may ask for.
+CRAWL_MAX_PAGES = int(os.environ.get("CRAWL_MAX_PAGES", "1000"))
+CRAWL_WORKERS = int(os.environ.get("CRAWL_WORKERS", "4"))
+CRAWL_MAX_WORKERS = int(os.environ.get("CRAWL_MAX_WORKERS", "16"))
+CRAWL_MAX_DEPTH = int(os.environ.get("CRAWL_MAX_DEPTH", "10"))
+# Longest robots.txt Crawl-delay honoured by batches and crawls, in seconds.
+MAX_CRAWL_DELAY = float(os.environ.get("MAX_CRAWL_DELAY", "10"))
+# Fetch only the <head> when every requested page check reads nothing else.
+HEAD_FETCH = os.environ.get("HEAD_FETCH", "1") == "1"
+# End-to-end deadline of one analysis (one page of a crawl), in seconds.
+ANALYZE_DEADLINE = float(os.environ.get("ANALYZE_DEADLINE", "30"))
+
 logging.basicConfig(
     level=logging.DEBUG,
     format="%(asctime)s %(levelname)s %(message)s",
@@ -36,6 +79,676 @@ logging.basicConfig(
 mcp = FastMCP("SEO Astro Analyzer 🚀")
 logging.info("=== Backend server starting with deep logging ===")
 
+# --- Check registry ----------------------------------------------------------
+
+class Check(NamedTuple):
+    run: Callable[..., Any]
+    metrics: Callable[[Any], Dict[str, Any]]
+    uses_page: bool = True
+    # Event-loop variant of ``run`` for checks that do their own fetching.
+    run_async: Optional[Callable[..., Awaitable[Any]]] = None
+    # Bump when the check's output changes for the same page: memoized
+    # results of older versions are then discarded.
+    version: int = 1
+    # Reads only <html> attributes and <head> contents.
+    head_only: bool = False
+
+
+CHECKS: Dict[str, Check] = {
+    "title_meta": Check(
+        title_meta.get_title_meta,
+        lambda raw: {"title_length": len(raw.get("title", "")), "meta_count": len(raw.get("meta", {}))},
+        head_only=True,
+    ),
+    "robots_canonical": Check(
+        robots_canonical.get_robots_canonical,
+        lambda raw: {"robots_count": len(raw.get("robots", [])), "has_canonical": bool(raw.get("canonical"))},
+        head_only=True,
+    ),
+    "headings": Check(
+        headings.get_headings,
+        lambda raw: {k: len(v) for k, v in raw.items()},
+    ),
+    "images_alt": Check(
+        images_alt.get_images_alt,
+        lambda raw: {"image_count": len(raw)},
+    ),
+    "links": Check(
+        links.get_links,
+        lambda raw: {"link_count": len(raw)},
+    ),
+    "structured_data": Check(
+        structured_data.get_structured_data,
+        lambda raw: {"structured_data_count": len(raw)},
+    ),
+    "open_graph_twitter": Check(
+        open_graph_twitter.get_open_graph_twitter,
+        lambda raw: {"og_count": len(raw.get("open_graph", {})), "twitter_count": len(raw.get("twitter", {}))},
+        head_only=True,
+    ),
+    "wordcount_keywords": Check(
+        wordcount_keywords.get_wordcount_keywords,
+        lambda raw: {"wordcount": raw.get("wordcount", 0), "keywords_count": len(raw.get("keywords", []))},
+    ),
+    "favicon_apple": Check(
+        favicon_apple.get_favicon_apple,
+        lambda raw: {"favicon_found": bool(raw.get("favicon")), "apple_icons_count": len(raw.get("apple_touch_icons", []))},
+        head_only=True,
+    ),
+    "lang_charset": Check(
+        lang_charset.get_lang_charset,
+        lambda raw: {"lang_found": bool(raw.get("lang")), "charset": raw.get("charset", "")},
+        version=2,
+        head_only=True,
+    ),
+    "sitemap_robots": Check(
+        sitemap_robots.get_sitemap_robots,
+        lambda raw: {
+            "has_sitemap": bool(raw["sitemap"]["sitemaps"]),
+            "sitemap_url_count": raw["sitemap"]["url_count"],
+            "has_robots": bool(raw.get("robots")),
+        },
+        uses_page=False,
+        run_async=sitemap_robots.get_sitemap_robots_async,
+    ),
+}
+
+
+def _check_name(check):
+    return f"{check.run.__module__.rsplit('.', 1)[-1]}.{check.run.__name__}"
+
+
+def _compose_result(check_name, url, raw, run_id):
+    check = CHECKS[check_name]
+    logging.debug(f"Result from {_check_name(check)}: {raw}")
+    result = {
+        "summary": {"score": 100, "grade": "A"},
+        "metrics": check.metrics(raw),
+        "details": [],
+        "evidence": raw,
+    }
+    out = save_result(result, url, check_name, run_id)
+    logging.debug(f"Output from get_{check_name}: {out}")
+    return out
+
+
+def _page_check(check_name, url, page, run_id):
+    check = CHECKS[check_name]
+    cache = get_result_cache()
+    raw = MISS
+    if cache is not None:
+        raw = cache.get(page.content_hash, check_name, check.version)
+    if raw is MISS:
+        if ENGINE == "stream":
+            raw = page.extract([check_name])[check_name]
+        else:
+            raw = check.run(url, page=page)
+        if cache is not None:
+            cache.put(page.content_hash, check_name, check.version, raw)
+    return _compose_result(check_name, url, raw, run_id)
+
+
+def _page_tools(tools, page=None):
+    """Page-based checks among ``tools``; given ``page``, only those without a memoized result."""
+    names = [t for t in tools if t in CHECKS and CHECKS[t].uses_page]
+    cache = get_result_cache()
+    if page is None or cache is None:
+        return names
+    return [t for t in names if not cache.contains(page.content_hash, t, CHECKS[t].version)]
+
+
+def _head_only(tools):
+    """Whether every page check among ``tools`` reads only the document head."""
+    names = _page_tools(tools)
+    return HEAD_FETCH and bool(names) and all(CHECKS[t].head_only for t in names)
+
+
+def _fetch(url, tools, parser=None):
+    # The planner: download just the head when nothing needs the body.
+    return (fetch_head if _head_only(tools) else fetch_page)(url, parser=parser)
+
+
+async def _fetch_async(url, tools, parser=None):
+    return await (fetch_head_async if _head_only(tools) else fetch_page_async)(url, parser=parser)
+
+
+def _save_page(run_id, url, page):
+    get_result_store().add_page(run_id, url, page.status_code, page.content_hash)
+
+
+def run_check(check_name, url, page=None, run_id=None):
+    """Run one registered check, compose the standard result and save it.
+
+    ``page`` is a :class:`PageSnapshot` shared across checks of one analysis;
+    when omitted the page is fetched for this check alone. The result is
+    stored under ``run_id``, or under a run of its own when omitted.
+    """
+    check = CHECKS[check_name]
+    log_request(check_name, url)
+    logging.debug(f"Input to get_{check_name}: url={url}")
+    own_run = run_id is None
+    if own_run:
+        run_id = get_result_store().start_run("check", url, [check_name])
+    try:
+        with resilience.deadline(ANALYZE_DEADLINE):
+            if not check.uses_page:
+                return _compose_result(check_name, url, check.run(url), run_id)
+            if page is None:
+                page = _fetch(url, [check_name])
+                _save_page(run_id, url, page)
+            return _page_check(check_name, url, page, run_id)
+    except Exception as e:
+        logging.exception(f"Error in get_{check_name}: {e}")
+        raise
+    finally:
+        if own_run:
+            get_result_store().finish_run(run_id)
+
+
+async def run_check_async(check_name, url, page=None, run_id=None):
+    """:func:`run_check` for the event loop.
+
+    Fetches are awaited; parsing, extraction and saving run in a worker
+    thread so they never stall other requests on the loop.
+    """
+    check = CHECKS[check_name]
+    log_request(check_name, url)
+    logging.debug(f"Input to get_{check_name}: url={url}")
+    own_run = run_id is None
+    if own_run:
+        run_id = await asyncio.to_thread(get_result_store().start_run, "check", url, [check_name])
+    try:
+        if not check.uses_page:
+            if check.run_async is not None:
+                raw = await check.run_async(url)
+            else:
+                raw = await asyncio.to_thread(check.run, url)
+            return await asyncio.to_thread(_compose_result, check_name, url, raw, run_id)
+        if page is None:
+            page = await _fetch_async(url, [check_name])
+            await asyncio.to_thread(_save_page, run_id, url, page)
+        return await asyncio.to_thread(_page_check, check_name, url, page, run_id)
+    except Exception as e:
+        logging.exception(f"Error in get_{check_name}: {e}")
+        raise
+    finally:
+        if own_run:
+            await asyncio.to_thread(get_result_store().finish_run, run_id)
+
+
+def _elapsed_ms(start):
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def _timeout_entry(tool, start):
+    return {"tool": tool, "error": "deadline exceeded", "status": "timeout", "duration_ms": _elapsed_ms(start)}
+
+
+def _page_entry(entry, page):
+    entry["fetch"] = page.fetch_stats
+    if page.fetch_stats.get("truncated") == "deadline":
+        # Ran on the part of the page that arrived in time.
+        entry["status"] = "partial"
+    return entry
+
+
+def analysis_status(results):
+    """``"partial"`` when any entry timed out or ran on a cut-short page, else ``"complete"``."""
+    return "partial" if any(r.get("status") in ("timeout", "partial") for r in results) else "complete"
+
+
+async def _before_deadline(awaitable):
+    left = resilience.remaining()
+    if left is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, max(left, 0))
+    except asyncio.TimeoutError:
+        raise resilience.DeadlineExceeded("deadline exceeded") from None
+
+
+def run_analysis(url, tools, parser=None, run_id=None, deadline=None):
+    """Run ``tools`` against ``url``, fetching and parsing the page only once.
+
+    ``parser`` names the HTML parser backend for this analysis (see
+    ``backend.seo_tools.parsers``); the deployment default is used when omitted.
+    Results are stored under ``run_id``, or a new run when omitted.
+
+    A failed fetch is reported as the error of every page-based tool, the same
+    way each tool reported its own failed fetch before the page was shared.
+    Each entry carries the tool's wall time in ``duration_ms``.
+
+    Everything runs within ``deadline`` seconds (default ``ANALYZE_DEADLINE``).
+    Tools not done by then get ``"status": "timeout"``; tools that ran on a
+    page cut short by the deadline get ``"status": "partial"``.
+    """
+    store = get_result_store()
+    own_run = run_id is None
+    if own_run:
+        run_id = store.start_run("analysis", url, tools)
+    try:
+        with resilience.deadline(deadline or ANALYZE_DEADLINE):
+            return _report_persistence(_run_tools(url, tools, parser, run_id))
+    finally:
+        if own_run:
+            store.finish_run(run_id)
+
+
+def _run_tools(url, tools, parser, run_id):
+    page = None
+    page_error = None
+    results = []
+    for tool in tools:
+        start = time.perf_counter()
+        check = CHECKS.get(tool)
+        if not check:
+            logging.warning(f"Tool not found: {tool}")
+            results.append({"tool": tool, "error": "Tool not found", "duration_ms": _elapsed_ms(start)})
+            continue
+        if resilience.expired():
+            results.append(_timeout_entry(tool, start))
+            continue
+        try:
+            if check.uses_page and page is None:
+                if page_error is not None:
+                    raise page_error
+                try:
+                    page = _fetch(url, tools, parser=parser)
+                    _save_page(run_id, url, page)
+                    if ENGINE == "stream":
+                        page.extract(_page_tools(tools, page))
+                except Exception as e:
+                    page_error = e
+                    raise
+            result = run_check(tool, url, page=page, run_id=run_id)
+            entry = {"tool": tool, "result": result, "duration_ms": _elapsed_ms(start)}
+            results.append(_page_entry(entry, page) if check.uses_page else entry)
+        except resilience.DeadlineExceeded:
+            logging.warning(f"Deadline exceeded running tool {tool} on {url}")
+            results.append(_timeout_entry(tool, start))
+        except Exception as e:
+            logging.exception(f"Error running tool {tool} on {url}: {e}")
+            results.append({"tool": tool, "error": str(e), "duration_ms": _elapsed_ms(start)})
+    return results
+
+
+async def _load_page(url, tools, parser, run_id, page=None):
+    if page is None:
+        page = await _fetch_async(url, tools, parser=parser)
+    await asyncio.to_thread(_save_page, run_id, url, page)
+    missing = await asyncio.to_thread(_page_tools, tools, page)
+    if not missing:
+        # Every result is memoized: nothing to parse.
+        return page
+    if ENGINE == "stream":
+        await asyncio.to_thread(page.extract, missing)
+    else:
+        # Build the tree once up front instead of racing to build it in every
+        # tool's worker thread.
+        await asyncio.to_thread(lambda: page.soup)
+    return page
+
+
+async def run_analysis_async(url, tools, parser=None, concurrency=None, page=None, run_id=None, deadline=None):
+    """:func:`run_analysis` for the event loop, with the same results and errors.
+
+    Up to ``concurrency`` tools (default ``ANALYZE_CONCURRENCY``) run at once;
+    results keep the order of ``tools``. Page-based tools share one download
+    and parse, started by the first of them, or the already fetched ``page``;
+    nothing CPU-bound runs on the loop itself.
+    """
+    store = get_result_store()
+    own_run = run_id is None
+    if own_run:
+        run_id = await asyncio.to_thread(store.start_run, "analysis", url, tools)
+    try:
+        with resilience.deadline(deadline or ANALYZE_DEADLINE):
+            results = await _run_tools_async(url, tools, parser, concurrency, page, run_id)
+        return _report_persistence(results)
+    finally:
+        if own_run:
+            await asyncio.to_thread(store.finish_run, run_id)
+
+
+async def _run_tools_async(url, tools, parser, concurrency, page, run_id):
+    slots = asyncio.Semaphore(concurrency or ANALYZE_CONCURRENCY)
+    page_task = None
+
+    def shared_page():
+        nonlocal page_task
+        if page_task is None:
+            page_task = asyncio.ensure_future(_load_page(url, tools, parser, run_id, page))
+        return page_task
+
+    async def run_tool(tool):
+        check = CHECKS.get(tool)
+        if not check:
+            logging.warning(f"Tool not found: {tool}")
+            return {"tool": tool, "error": "Tool not found", "duration_ms": 0.0}
+        async with slots:
+            start = time.perf_counter()
+            try:
+                shared = await _before_deadline(asyncio.shield(shared_page())) if check.uses_page else None
+                result = await _before_deadline(run_check_async(tool, url, page=shared, run_id=run_id))
+                entry = {"tool": tool, "result": result, "duration_ms": _elapsed_ms(start)}
+                return _page_entry(entry, shared) if shared is not None else entry
+            except resilience.DeadlineExceeded:
+                logging.warning(f"Deadline exceeded running tool {tool} on {url}")
+                return _timeout_entry(tool, start)
+            except Exception as e:
+                logging.exception(f"Error running tool {tool} on {url}: {e}")
+                return {"tool": tool, "error": str(e), "duration_ms": _elapsed_ms(start)}
+
+    return list(await asyncio.gather(*(run_tool(tool) for tool in tools)))
+
+
+# --- Coalesced analyses ----------------------------------------------------------
+
+# Analyses in flight, shared by the MCP tools and the HTTP API of this process.
+_analyses = singleflight.Group()
+
+
+def _analysis_key(url, tools, parser):
+    return (url, tuple(sorted(set(tools))), get_parser(parser).name)
+
+
+def _stored_analysis(url, tools, parser, deadline):
+    store = get_result_store()
+    run_id = store.start_run("analysis", url, tools)
+    try:
+        results = run_analysis(url, tools, parser=parser, run_id=run_id, deadline=deadline)
+    finally:
+        store.finish_run(run_id)
+    return {"run_id": run_id, "status": analysis_status(results), "results": results}
+
+
+async def _stored_analysis_async(url, tools, parser, deadline):
+    store = get_result_store()
+    run_id = await asyncio.to_thread(store.start_run, "analysis", url, tools)
+    try:
+        results = await run_analysis_async(url, tools, parser=parser, run_id=run_id, deadline=deadline)
+    finally:
+        await asyncio.to_thread(store.finish_run, run_id)
+    return {"run_id": run_id, "status": analysis_status(results), "results": results}
+
+
+def _own_copy(analysis, tools, coalesced):
+    # Every caller gets its own entries, in the order of its own ``tools``.
+    by_tool = {entry["tool"]: entry for entry in analysis["results"]}
+    results = copy.deepcopy([by_tool[tool] for tool in tools])
+    return {**analysis, "results": results, "coalesced": coalesced}
+
+
+def parse_deadline(value) -> Optional[float]:
+    """The optional ``deadline`` of a request, in seconds, at most ``ANALYZE_DEADLINE``.
+
+    Raises ValueError unless ``value`` is None or a number in that range.
+    """
+    if value is None:
+        return None
+    try:
+        if isinstance(value, bool):
+            raise TypeError(value)
+        seconds = float(value)
+    except (TypeError, ValueError):
+        raise ValueError("deadline must be a number of seconds") from None
+    if math.isnan(seconds) or not 0 < seconds <= ANALYZE_DEADLINE:
+        raise ValueError(f"deadline must be between 0 and {ANALYZE_DEADLINE} seconds")
+    return seconds
+
+
+def analyze_url(url, tools, parser=None, deadline=None):
+    """Run and store an analysis of ``url``, sharing it with identical ones in flight.
+
+    Calls for the same URL, set of tools and parser that overlap in time,
+    from any thread or event loop of the process, share one fetch, one
+    computation and one stored run. Returns ``{"run_id", "status", "results",
+    "coalesced"}``; ``coalesced`` is True for callers that joined an analysis
+    already running, in which case its ``deadline`` applied.
+    """
+    key = _analysis_key(url, tools, parser)
+    analysis, coalesced = _analyses.do(key, lambda: _stored_analysis(url, tools, parser, deadline))
+    return _own_copy(analysis, tools, coalesced)
+
+
+async def analyze_url_async(url, tools, parser=None, deadline=None):
+    """:func:`analyze_url` for the event loop."""
+    key = _analysis_key(url, tools, parser)
+    analysis, coalesced = await _analyses.do_async(key, lambda: _stored_analysis_async(url, tools, parser, deadline))
+    return _own_copy(analysis, tools, coalesced)
+
+
+def coalescing_stats():
+    return _analyses.stats()
+
+
+def _mcp_check(check_name, url):
+    # The per-check MCP tools share in-flight analyses with the API.
+    entry = analyze_url(url, [check_name])["results"][0]
+    if entry.get("status") == "timeout":
+        raise resilience.DeadlineExceeded(entry["error"])
+    if "error" in entry:
+        raise RuntimeError(entry["error"])
+    return entry["result"]
+
+
+def _host_pacer():
+    """Return ``pace(host, delay)``, which spaces successive calls per host ``delay`` seconds apart."""
+    next_slot: Dict[str, float] = {}
+
+    async def pace(host, delay):
+        if not delay:
+            return
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        start = max(now, next_slot.get(host, now))
+        next_slot[host] = start + min(delay, MAX_CRAWL_DELAY)
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    return pace
+
+
+async def iter_batch_async(
+    urls, tools, parser=None, concurrency=None, per_host=None, run_id=None
+) -> AsyncIterator[Dict[str, Any]]:
+    """Analyse many URLs, yielding each URL's entry as soon as it completes.
+
+    At most ``concurrency`` URLs (default ``BATCH_CONCURRENCY``) are analysed
+    at once and at most ``per_host`` (default ``BATCH_PER_HOST``) per host, so
+    one large site cannot hold every slot. A URL listed several times is
+    analysed once; ``indexes`` gives its positions in ``urls``.
+
+    Each host's robots.txt comes from the shared cache: its ``Crawl-delay``
+    spaces out that host's URLs, and whether the URL is allowed is reported
+    under ``robots`` (the URL is analysed either way, having been asked for).
+
+    Every URL's results are stored under one run, ``run_id`` or a new one.
+    """
+    store = get_result_store()
+    own_run = run_id is None
+    if own_run:
+        run_id = await asyncio.to_thread(store.start_run, "batch", None, tools)
+    positions: Dict[str, List[int]] = {}
+    for index, url in enumerate(urls):
+        positions.setdefault(url, []).append(index)
+    slots = asyncio.Semaphore(concurrency or BATCH_CONCURRENCY)
+    host_slots: Dict[str, asyncio.Semaphore] = {}
+    pace = _host_pacer()
+
+    async def run_url(url):
+        host = urlsplit(url).netloc.lower()
+        host_slot = host_slots.get(host)
+        if host_slot is None:
+            host_slot = host_slots[host] = asyncio.Semaphore(per_host or BATCH_PER_HOST)
+        # Host first: a URL waiting on its busy host, or on its Crawl-delay,
+        # does not hold a global slot.
+        async with host_slot:
+            robots = await get_robots_cache().get_async(url)
+            await pace(host, robots.crawl_delay)
+            async with slots:
+                start = time.perf_counter()
+                results = await run_analysis_async(url, tools, parser=parser, run_id=run_id)
+        return {
+            "url": url,
+            "run_id": run_id,
+            "indexes": positions[url],
+            "robots": {"allowed": robots.allowed(url), "crawl_delay": robots.crawl_delay},
+            "status": analysis_status(results),
+            "results": results,
+            "duration_ms": _elapsed_ms(start),
+        }
+
+    tasks = [asyncio.ensure_future(run_url(url)) for url in positions]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+        if own_run:
+            await asyncio.to_thread(store.finish_run, run_id)
+
+
+async def iter_crawl_async(
+    seed, tools, max_pages=100, max_depth=3, workers=None, parser=None, use_sitemap=True, run_id=None
+) -> AsyncIterator[Dict[str, Any]]:
+    """Crawl the site of ``seed``, yielding one entry per page as it completes.
+
+    Pages are discovered breadth-first from same-site links and, with
+    ``use_sitemap``, the site's sitemaps (at depth 1). Up to
+    ``max_pages`` pages no deeper than ``max_depth`` links from the seed are
+    fetched by ``workers`` concurrent workers (default ``CRAWL_WORKERS``), each
+    page running ``tools`` like :func:`run_analysis_async`. The last entry is
+    ``{"summary": ...}`` with page counts and throughput in pages/sec.
+
+    Discovered URLs disallowed by the site's robots.txt are skipped (the seed
+    is always crawled), and its ``Crawl-delay`` spaces out page fetches.
+
+    Every page's results are stored under one run, ``run_id`` or a new one.
+    """
+    seed = normalize_url(seed, seed) or seed
+    start = time.perf_counter()
+    store = get_result_store()
+    own_run = run_id is None
+    if own_run:
+        run_id = await asyncio.to_thread(store.start_run, "crawl", seed, tools)
+    # Finish the run however the crawl ends, even before its first page.
+    frontier = Frontier()
+    runner = None
+    try:
+        robots = await get_robots_cache().get_async(seed)
+        host = urlsplit(seed).netloc
+        pace = _host_pacer()
+        frontier.push(seed, 0)
+        state = {"scheduled": 0, "active": 0, "errors": 0, "disallowed": 0}
+
+        def discover(url, depth):
+            if url in frontier.seen:
+                return
+            if not robots.allowed(url):
+                frontier.seen.add(url)
+                state["disallowed"] += 1
+                return
+            frontier.push(url, depth)
+
+        if use_sitemap and max_depth >= 1:
+            # Queue no more sitemap URLs than the crawl can visit.
+            async with aclosing(aiter_site_urls(seed, robots.sitemaps)) as sitemap_urls:
+                async for url in sitemap_urls:
+                    if frontier.seen.count >= max_pages:
+                        break
+                    url = normalize_url(url, seed)
+                    if url and same_site(url, seed):
+                        discover(url, 1)
+
+        wake = asyncio.Condition()
+        out: asyncio.Queue = asyncio.Queue()
+
+        async def next_url():
+            async with wake:
+                while True:
+                    if state["scheduled"] >= max_pages:
+                        return None
+                    item = frontier.pop()
+                    if item is not None:
+                        state["scheduled"] += 1
+                        state["active"] += 1
+                        return item
+                    if state["active"] == 0:
+                        wake.notify_all()
+                        return None
+                    await wake.wait()
+
+        async def crawl_page(url, depth):
+            page_start = time.perf_counter()
+            entry = {"url": url, "depth": depth}
+            links = []
+            try:
+                await pace(host, robots.crawl_delay)
+                # One deadline covers the page's download and its analysis.
+                with resilience.deadline(ANALYZE_DEADLINE):
+                    page = await fetch_page_async(url, parser=parser)
+                    entry["status_code"] = page.status_code
+                    entry["results"] = await run_analysis_async(url, tools, parser=parser, page=page, run_id=run_id)
+                is_html = "html" in page.headers.get("Content-Type", "text/html")
+                if depth < max_depth and 200 <= page.status_code < 300 and is_html:
+                    hrefs = (await asyncio.to_thread(page.extract, ["links"]))["links"]
+                    links = [normalize_url(href, page.url) for href in hrefs]
+            except Exception as e:
+                logging.exception(f"Error crawling {url}: {e}")
+                state["errors"] += 1
+                entry["error"] = str(e)
+            entry["duration_ms"] = _elapsed_ms(page_start)
+            return entry, [link for link in links if link and same_site(link, seed)]
+
+        async def worker():
+            while True:
+                item = await next_url()
+                if item is None:
+                    return
+                entry, links = await crawl_page(*item)
+                async with wake:
+                    for link in links:
+                        discover(link, item[1] + 1)
+                    state["active"] -= 1
+                    wake.notify_all()
+                await out.put(entry)
+
+        async def run_workers():
+            try:
+                await asyncio.gather(*(worker() for _ in range(workers or CRAWL_WORKERS)))
+            finally:
+                await out.put(None)
+
+        runner = asyncio.ensure_future(run_workers())
+        while (entry := await out.get()) is not None:
+            yield entry
+        await runner
+        elapsed = time.perf_counter() - start
+        summary = {
+            "seed": seed,
+            "run_id": run_id,
+            "pages": state["scheduled"],
+            "errors": state["errors"],
+            "disallowed": state["disallowed"],
+            "crawl_delay": robots.crawl_delay,
+            "discovered": frontier.seen.count,
+            "pending": len(frontier),
+            "spilled": frontier.spilled,
+            "elapsed_s": round(elapsed, 3),
+            "pages_per_sec": round(state["scheduled"] / elapsed, 2) if elapsed else None,
+        }
+        logging.info(f"Crawl of {seed} finished: {summary}")
+        yield {"summary": summary}
+    finally:
+        if runner is not None:
+            runner.cancel()
+        frontier.close()
+        if own_run:
+            await asyncio.to_thread(store.finish_run, run_id)
+
+
 # Add /api/analyze endpoint
 def analyze(request):
     try:
@@ -43,248 +756,92 @@ def analyze(request):
         url = data.get("url")
         tools = data.get("tools", [])
         engines = data.get("engines", [])
-        logging.info(f"/api/analyze called: url={url}, tools={tools}, engines={engines}")
+        parser = data.get("parser")
+        logging.info(f"/api/analyze called: url={url}, tools={tools}, engines={engines}, parser={parser}")
         if not url or not tools:
             logging.warning("Missing url or tools in /api/analyze request")
             return {"error": "Missing url or tools"}, 400
-        results = []
-        for tool in tools:
-            try:
-                func = globals().get(f"get_{tool}")
-                if not func:
-                    logging.warning(f"Tool not found: {tool}")
-                    results.append({"tool": tool, "error": "Tool not found"})
-                    continue
-                result = func(url)
-                results.append({"tool": tool, "result": result})
-            except Exception as e:
-                logging.exception(f"Error running tool {tool} on {url}: {e}")
-                results.append({"tool": tool, "error": str(e)})
-        run_id = url_to_slug(url)
-        return {"run_id": run_id, "results": results}
+        try:
+            get_parser(parser)
+            deadline = parse_deadline(data.get("deadline"))
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        return analyze_url(url, tools, parser=parser, deadline=deadline)
     except Exception as e:
         logging.exception(f"/api/analyze failed: {e}")
         return {"error": str(e)}, 500
+
+
+# --- MCP tools -----------------------------------------------------------------
+
 @mcp.tool()
 def get_title_meta(url: str):
-    log_request("title_meta", url)
-    logging.debug(f"Input to get_title_meta: url={url}")
-    try:
-        raw = title_meta.get_title_meta(url)
-        logging.debug(f"Result from title_meta.get_title_meta: {raw}")
-        # Compose standard result
-        result = {
-            "summary": {"score": 100, "grade": "A"},
-            "metrics": {"title_length": len(raw.get("title", "")), "meta_count": len(raw.get("meta", {}))},
-            "details": [],
-            "evidence": raw,
-        }
-        out = save_result(result, url, "title_meta")
-        logging.debug(f"Output from get_title_meta: {out}")
-        return out
-    except Exception as e:
-        logging.exception(f"Error in get_title_meta: {e}")
-        raise
+    return _mcp_check("title_meta", url)
 
 @mcp.tool()
 def get_robots_canonical(url: str):
-    log_request("robots_canonical", url)
-    logging.debug(f"Input to get_robots_canonical: url={url}")
-    try:
-        raw = robots_canonical.get_robots_canonical(url)
-        logging.debug(f"Result from robots_canonical.get_robots_canonical: {raw}")
-        result = {
-            "summary": {"score": 100, "grade": "A"},
-            "metrics": {"robots_count": len(raw.get("robots", [])), "has_canonical": bool(raw.get("canonical"))},
-            "details": [],
-            "evidence": raw,
-        }
-        out = save_result(result, url, "robots_canonical")
-        logging.debug(f"Output from get_robots_canonical: {out}")
-        return out
-    except Exception as e:
-        logging.exception(f"Error in get_robots_canonical: {e}")
-        raise
+    return _mcp_check("robots_canonical", url)
 
 @mcp.tool()
 def get_headings(url: str):
-    log_request("headings", url)
-    logging.debug(f"Input to get_headings: url={url}")
-    try:
-        raw = headings.get_headings(url)
-        logging.debug(f"Result from headings.get_headings: {raw}")
-        result = {
-            "summary": {"score": 100, "grade": "A"},
-            "metrics": {k: len(v) for k, v in raw.items()},
-            "details": [],
-            "evidence": raw,
-        }
-        out = save_result(result, url, "headings")
-        logging.debug(f"Output from get_headings: {out}")
-        return out
-    except Exception as e:
-        logging.exception(f"Error in get_headings: {e}")
-        raise
+    return _mcp_check("headings", url)
 
 @mcp.tool()
 def get_images_alt(url: str):
-    log_request("images_alt", url)
-    logging.debug(f"Input to get_images_alt: url={url}")
-    try:
-        raw = images_alt.get_images_alt(url)
-        logging.debug(f"Result from images_alt.get_images_alt: {raw}")
-        result = {
-            "summary": {"score": 100, "grade": "A"},
-            "metrics": {"image_count": len(raw)},
-            "details": [],
-            "evidence": raw,
-        }
-        out = save_result(result, url, "images_alt")
-        logging.debug(f"Output from get_images_alt: {out}")
-        return out
-    except Exception as e:
-        logging.exception(f"Error in get_images_alt: {e}")
-        raise
+    return _mcp_check("images_alt", url)
 
 @mcp.tool()
 def get_links(url: str):
-    log_request("links", url)
-    logging.debug(f"Input to get_links: url={url}")
-    try:
-        raw = links.get_links(url)
-        logging.debug(f"Result from links.get_links: {raw}")
-        result = {
-            "summary": {"score": 100, "grade": "A"},
-            "metrics": {"link_count": len(raw)},
-            "details": [],
-            "evidence": raw,
-        }
-        out = save_result(result, url, "links")
-        logging.debug(f"Output from get_links: {out}")
-        return out
-    except Exception as e:
-        logging.exception(f"Error in get_links: {e}")
-        raise
+    return _mcp_check("links", url)
 
 @mcp.tool()
 def get_structured_data(url: str):
-    log_request("structured_data", url)
-    logging.debug(f"Input to get_structured_data: url={url}")
-    try:
-        raw = structured_data.get_structured_data(url)
-        logging.debug(f"Result from structured_data.get_structured_data: {raw}")
-        result = {
-            "summary": {"score": 100, "grade": "A"},
-            "metrics": {"structured_data_count": len(raw)},
-            "details": [],
-            "evidence": raw,
-        }
-        out = save_result(result, url, "structured_data")
-        logging.debug(f"Output from get_structured_data: {out}")
-        return out
-    except Exception as e:
-        logging.exception(f"Error in get_structured_data: {e}")
-        raise
+    return _mcp_check("structured_data", url)
 
 @mcp.tool()
 def get_open_graph_twitter(url: str):
-    log_request("open_graph_twitter", url)
-    logging.debug(f"Input to get_open_graph_twitter: url={url}")
-    try:
-        raw = open_graph_twitter.get_open_graph_twitter(url)
-        logging.debug(f"Result from open_graph_twitter.get_open_graph_twitter: {raw}")
-        result = {
-            "summary": {"score": 100, "grade": "A"},
-            "metrics": {"og_count": len(raw.get("open_graph", {})), "twitter_count": len(raw.get("twitter", {}))},
-            "details": [],
-            "evidence": raw,
-        }
-        out = save_result(result, url, "open_graph_twitter")
-        logging.debug(f"Output from get_open_graph_twitter: {out}")
-        return out
-    except Exception as e:
-        logging.exception(f"Error in get_open_graph_twitter: {e}")
-        raise
+    return _mcp_check("open_graph_twitter", url)
 
 @mcp.tool()
 def get_wordcount_keywords(url: str):
-    log_request("wordcount_keywords", url)
-    logging.debug(f"Input to get_wordcount_keywords: url={url}")
-    try:
-        raw = wordcount_keywords.get_wordcount_keywords(url)
-        logging.debug(f"Result from wordcount_keywords.get_wordcount_keywords: {raw}")
-        result = {
-            "summary": {"score": 100, "grade": "A"},
-            "metrics": {"wordcount": raw.get("wordcount", 0), "keywords_count": len(raw.get("keywords", []))},
-            "details": [],
-            "evidence": raw,
-        }
-        out = save_result(result, url, "wordcount_keywords")
-        logging.debug(f"Output from get_wordcount_keywords: {out}")
-        return out
-    except Exception as e:
-        logging.exception(f"Error in get_wordcount_keywords: {e}")
-        raise
+    return _mcp_check("wordcount_keywords", url)
 
 @mcp.tool()
 def get_favicon_apple(url: str):
-    log_request("favicon_apple", url)
-    logging.debug(f"Input to get_favicon_apple: url={url}")
-    try:
-        raw = favicon_apple.get_favicon_apple(url)
-        logging.debug(f"Result from favicon_apple.get_favicon_apple: {raw}")
-        result = {
-            "summary": {"score": 100, "grade": "A"},
-            "metrics": {"favicon_found": bool(raw.get("favicon")), "apple_icons_count": len(raw.get("apple_touch_icons", []))},
-            "details": [],
-            "evidence": raw,
-        }
-        out = save_result(result, url, "favicon_apple")
-        logging.debug(f"Output from get_favicon_apple: {out}")
-        return out
-    except Exception as e:
-        logging.exception(f"Error in get_favicon_apple: {e}")
-        raise
+    return _mcp_check("favicon_apple", url)
 
 @mcp.tool()
 def get_lang_charset(url: str):
-    log_request("lang_charset", url)
-    logging.debug(f"Input to get_lang_charset: url={url}")
-    try:
-        raw = lang_charset.get_lang_charset(url)
-        logging.debug(f"Result from lang_charset.get_lang_charset: {raw}")
-        result = {
-            "summary": {"score": 100, "grade": "A"},
-            "metrics": {"lang_found": bool(raw.get("lang")), "charset": raw.get("charset", "")},
-            "details": [],
-            "evidence": raw,
-        }
-        out = save_result(result, url, "lang_charset")
-        logging.debug(f"Output from get_lang_charset: {out}")
-        return out
-    except Exception as e:
-        logging.exception(f"Error in get_lang_charset: {e}")
-        raise
+    return _mcp_check("lang_charset", url)
 
 @mcp.tool()
 def get_sitemap_robots(url: str):
-    log_request("sitemap_robots", url)
-    logging.debug(f"Input to get_sitemap_robots: url={url}")
-    try:
-        raw = sitemap_robots.get_sitemap_robots(url)
-        logging.debug(f"Result from sitemap_robots.get_sitemap_robots: {raw}")
-        result = {
-            "summary": {"score": 100, "grade": "A"},
-            "metrics": {"has_sitemap": bool(raw.get("sitemap")), "has_robots": bool(raw.get("robots"))},
-            "details": [],
-            "evidence": raw,
-        }
-        out = save_result(result, url, "sitemap_robots")
-        logging.debug(f"Output from get_sitemap_robots: {out}")
-        return out
-    except Exception as e:
-        logging.exception(f"Error in get_sitemap_robots: {e}")
-        raise
+    return _mcp_check("sitemap_robots", url)
+
+@mcp.tool()
+async def analyze_batch(urls: List[str], tools: List[str]):
+    """Run ``tools`` against every URL; entries are listed in completion order."""
+    if len(urls) > MAX_BATCH_URLS:
+        raise ValueError(f"At most {MAX_BATCH_URLS} URLs per batch")
+    log_request("analyze_batch", f"{len(urls)} URLs", extra={"tools": tools})
+    return [entry async for entry in iter_batch_async(urls, tools)]
+
+@mcp.tool()
+async def get_sitemap_urls(url: str, offset: int = 0, limit: int = 100):
+    """Page through every URL in the sitemaps of the site of ``url``."""
+    log_request("get_sitemap_urls", url, extra={"offset": offset, "limit": limit})
+    return await sitemap_url_page(url, offset=offset, limit=limit)
+
+@mcp.tool()
+async def crawl_site(url: str, tools: List[str], max_pages: int = 50, max_depth: int = 2):
+    """Crawl the site of ``url`` through same-site links and its sitemap, running ``tools`` on every page."""
+    if max_pages > CRAWL_MAX_PAGES:
+        raise ValueError(f"At most {CRAWL_MAX_PAGES} pages per crawl")
+    if not 0 <= max_depth <= CRAWL_MAX_DEPTH:
+        raise ValueError(f"max_depth must be between 0 and {CRAWL_MAX_DEPTH}")
+    log_request("crawl_site", url, extra={"tools": tools, "max_pages": max_pages, "max_depth": max_depth})
+    entries = [entry async for entry in iter_crawl_async(url, tools, max_pages=max_pages, max_depth=max_depth)]
+    return {"pages": entries[:-1], "summary": entries[-1]["summary"]}
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,462 @@
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import httpx
+import pytest
+import requests
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from backend.mcp_server import api_server, result_store
+from backend.seo_tools import page as page_module
+from backend.seo_tools import resilience
+from backend.seo_tools.result_cache import get_result_cache
+from backend.seo_tools.robots import get_robots_cache
+
+SAMPLE_HTML = b"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Sample Page</title>
+<meta name="description" content="A sample page">
+<meta name="robots" content="index,follow">
+<meta property="og:title" content="OG Sample">
+<meta name="twitter:card" content="summary">
+<link rel="canonical" href="https://example.com/">
+<link rel="icon" href="/favicon.ico">
+<link rel="apple-touch-icon" href="/apple.png">
+<script type="application/ld+json">{"@type": "Organization", "name": "Example"}</script>
+</head>
+<body>
+<h1>Welcome</h1>
+<h2>Fences and gates</h2>
+<p>Fences keep things in. Gates let things out.</p>
+<img src="/a.png" alt="A picture">
+<img src="/b.png">
+<a href="/about">About</a>
+<a href="https://other.example/">Other</a>
+<a>No href</a>
+</body>
+</html>
+"""
+
+
+class FakeResponse:
+    def __init__(self, url, content, status_code=200, headers=None):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = requests.structures.CaseInsensitiveDict(
+            headers or {"Content-Type": "text/html; charset=utf-8"}
+        )
+        self.text = content.decode("utf-8")
+
+    def iter_content(self, chunk_size=None):
+        yield self.content
+
+    async def aiter_bytes(self, chunk_size=None):
+        yield self.content
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_fetch(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    get_robots_cache().clear()
+    get_result_cache().clear()
+    monkeypatch.setattr(result_store, "_store", result_store.ResultStore(str(tmp_path / "results.sqlite")))
+    calls = []
+
+    def fake_get(self, url, **kwargs):
+        calls.append(url)
+        if url.endswith("/sitemap.xml") or url.endswith("/robots.txt"):
+            return FakeResponse(url, b"", status_code=404)
+        return FakeResponse(url, SAMPLE_HTML)
+
+    async def fake_async_get(self, url, **kwargs):
+        return fake_get(self, url, **kwargs)
+
+    monkeypatch.setattr(requests.Session, "get", fake_get)
+    monkeypatch.setattr(httpx.AsyncClient, "get", fake_async_get)
+    monkeypatch.setattr(httpx.AsyncClient, "stream", fake_stream)
+    return calls
+
+
+@asynccontextmanager
+async def fake_stream(self, method, url, **kwargs):
+    # Looked up per call so tests that patch ``get`` again also cover streams.
+    yield await httpx.AsyncClient.get(self, url, **kwargs)
+
+
+def test_analyze_fetches_page_once(fake_fetch):
+    client = TestClient(api_server.app)
+    tools = ["title_meta", "headings", "links", "images_alt", "lang_charset"]
+    resp = client.post(
+        "/api/analyze", json={"url": "https://example.com/", "tools": tools}
+    ).json()
+    assert [r["tool"] for r in resp["results"]] == tools
+    assert fake_fetch == ["https://example.com/"]
+    by_tool = {r["tool"]: r["result"]["result"] for r in resp["results"]}
+    assert by_tool["title_meta"]["evidence"]["title"] == "Sample Page"
+    assert by_tool["links"]["evidence"] == ["/about", "https://other.example/"]
+    assert by_tool["lang_charset"]["evidence"] == {"lang": "en", "charset": "utf-8", "charset_source": "header"}
+
+
+def test_analyze_reports_fetch_error_per_tool(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    get_robots_cache().clear()
+    get_result_cache().clear()
+    monkeypatch.setattr(result_store, "_store", result_store.ResultStore(str(tmp_path / "results.sqlite")))
+    calls = []
+
+    def failing_get(self, url, **kwargs):
+        calls.append(url)
+        raise requests.ConnectionError("connection refused")
+
+    async def failing_async_get(self, url, **kwargs):
+        failing_get(self, url, **kwargs)
+
+    monkeypatch.setattr(requests.Session, "get", failing_get)
+    monkeypatch.setattr(httpx.AsyncClient, "get", failing_async_get)
+    monkeypatch.setattr(httpx.AsyncClient, "stream", fake_stream)
+    monkeypatch.setattr(resilience, "BACKOFF", 0.0)
+    client = TestClient(api_server.app)
+    resp = client.post(
+        "/api/analyze",
+        json={"url": "https://example.com/", "tools": ["title_meta", "headings", "nope"]},
+    ).json()
+    assert all(r.pop("duration_ms") >= 0 for r in resp["results"])
+    assert resp["results"] == [
+        {"tool": "title_meta", "error": "connection refused"},
+        {"tool": "headings", "error": "connection refused"},
+        {"tool": "nope", "error": "Tool not found"},
+    ]
+    # The one shared fetch, retried.
+    assert calls == ["https://example.com/"] * (1 + resilience.RETRIES)
+
+
+def test_get_functions_still_fetch_by_url(fake_fetch):
+    from backend.seo_tools import headings
+
+    assert headings.get_headings("https://example.com/")["h1"] == ["Welcome"]
+    snapshot = page_module.fetch_page("https://example.com/")
+    assert headings.get_headings("https://example.com/", page=snapshot)["h2"] == [
+        "Fences and gates"
+    ]
+
+
+def test_analyze_rejects_unknown_parser(fake_fetch):
+    client = TestClient(api_server.app)
+    resp = client.post(
+        "/api/analyze",
+        json={"url": "https://example.com/", "tools": ["title_meta"], "parser": "nope"},
+    )
+    assert resp.status_code == 400
+    assert fake_fetch == []
+
+
+def test_analyze_keeps_event_loop_free(fake_fetch, monkeypatch):
+    import asyncio
+    import threading
+
+    from backend.mcp_server import seo_astro_analyzer_server as server
+
+    loop_threads = set()
+    extract_threads = set()
+    original = page_module.PageSnapshot.extract
+
+    def recording_extract(self, checks):
+        extract_threads.add(threading.get_ident())
+        return original(self, checks)
+
+    async def probe():
+        loop_threads.add(threading.get_ident())
+        return await server.run_analysis_async(
+            "https://example.com/", ["title_meta", "headings", "sitemap_robots"]
+        )
+
+    monkeypatch.setattr(page_module.PageSnapshot, "extract", recording_extract)
+    results = asyncio.run(probe())
+    assert [r["tool"] for r in results] == ["title_meta", "headings", "sitemap_robots"]
+    assert all("result" in r for r in results)
+    assert extract_threads and not extract_threads & loop_threads
+    assert sorted(fake_fetch) == [
+        "https://example.com/",
+        "https://example.com/robots.txt",
+        "https://example.com/sitemap.xml",
+    ]
+
+
+# sitemap_robots reads robots.txt before the sitemaps it lists, so it has
+# one request in flight at a time; the page fetch adds one per extra slot.
+@pytest.mark.parametrize("concurrency, peak", [(1, 1), (2, 2)])
+def test_analysis_runs_tools_concurrently(fake_fetch, monkeypatch, concurrency, peak):
+    import asyncio
+
+    from backend.mcp_server import seo_astro_analyzer_server as server
+
+    in_flight = []
+    seen_peak = 0
+
+    async def slow_get(self, url, **kwargs):
+        nonlocal seen_peak
+        in_flight.append(url)
+        seen_peak = max(seen_peak, len(in_flight))
+        await asyncio.sleep(0.05)
+        in_flight.remove(url)
+        if url.endswith("/sitemap.xml") or url.endswith("/robots.txt"):
+            return FakeResponse(url, b"", status_code=404)
+        return FakeResponse(url, SAMPLE_HTML)
+
+    monkeypatch.setattr(httpx.AsyncClient, "get", slow_get)
+    tools = ["sitemap_robots", "title_meta", "nope", "headings"]
+    results = asyncio.run(
+        server.run_analysis_async("https://example.com/", tools, concurrency=concurrency)
+    )
+    assert [r["tool"] for r in results] == tools
+    assert [("result" in r) for r in results] == [True, True, False, True]
+    assert all(r["duration_ms"] >= 0 for r in results)
+    assert seen_peak == peak
+
+
+def test_batch_streams_each_url_once(fake_fetch):
+    import json
+
+    client = TestClient(api_server.app)
+    urls = ["https://example.com/", "https://b.example/", "https://example.com/"]
+    resp = client.post("/api/analyze/batch", json={"urls": urls, "tools": ["title_meta"]})
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    entries = {e["url"]: e for e in map(json.loads, resp.text.splitlines())}
+    assert entries["https://example.com/"]["indexes"] == [0, 2]
+    assert entries["https://b.example/"]["indexes"] == [1]
+    for entry in entries.values():
+        assert entry["results"][0]["result"]["result"]["evidence"]["title"] == "Sample Page"
+    assert entries["https://b.example/"]["robots"] == {"allowed": True, "crawl_delay": None}
+    assert sorted(fake_fetch) == [
+        "https://b.example/",
+        "https://b.example/robots.txt",
+        "https://example.com/",
+        "https://example.com/robots.txt",
+    ]
+
+
+def test_batch_limits_per_host(fake_fetch, monkeypatch):
+    import asyncio
+
+    from backend.mcp_server import seo_astro_analyzer_server as server
+
+    in_flight = {}
+    peak = {}
+
+    async def slow_get(self, url, **kwargs):
+        host = url.split("/")[2]
+        in_flight[host] = in_flight.get(host, 0) + 1
+        peak[host] = max(peak.get(host, 0), in_flight[host])
+        await asyncio.sleep(0.02)
+        in_flight[host] -= 1
+        return FakeResponse(url, SAMPLE_HTML)
+
+    async def collect():
+        urls = [f"https://a.example/{i}" for i in range(6)] + ["https://b.example/"]
+        return [
+            entry["url"]
+            async for entry in server.iter_batch_async(urls, ["headings"], concurrency=3, per_host=2)
+        ]
+
+    monkeypatch.setattr(httpx.AsyncClient, "get", slow_get)
+    done = asyncio.run(collect())
+    assert len(done) == 7
+    # b.example is not stuck behind the queue of a.example pages.
+    assert done.index("https://b.example/") < 3
+    assert peak == {"a.example": 2, "b.example": 1}
+
+
+def test_crawl_delay_does_not_hold_global_slots(fake_fetch, monkeypatch):
+    import asyncio
+
+    from backend.mcp_server import seo_astro_analyzer_server as server
+
+    async def robots_get(self, url, **kwargs):
+        if url == "https://slow.example/robots.txt":
+            return FakeResponse(url, b"User-agent: *\nCrawl-delay: 0.3\n", headers={"Content-Type": "text/plain"})
+        if url.endswith("/robots.txt"):
+            return FakeResponse(url, b"", status_code=404)
+        return FakeResponse(url, SAMPLE_HTML)
+
+    async def collect():
+        urls = [f"https://slow.example/{i}" for i in range(3)] + [f"https://fast.example/{i}" for i in range(3)]
+        return [
+            entry["url"]
+            async for entry in server.iter_batch_async(urls, ["headings"], concurrency=2, per_host=2)
+        ]
+
+    monkeypatch.setattr(httpx.AsyncClient, "get", robots_get)
+    done = asyncio.run(collect())
+    # The slow host's pages wait out their delay without a global slot, so
+    # the other host's pages all finish before the second slow page.
+    assert done.index("https://slow.example/1") > max(done.index(f"https://fast.example/{i}") for i in range(3))
+
+
+def test_batch_rejects_oversized_batch(fake_fetch, monkeypatch):
+    monkeypatch.setattr(api_server, "MAX_BATCH_URLS", 2)
+    client = TestClient(api_server.app)
+    resp = client.post(
+        "/api/analyze/batch",
+        json={"urls": ["https://a.example/", "https://b.example/", "https://c.example/"], "tools": ["headings"]},
+    )
+    assert resp.status_code == 400
+    assert fake_fetch == []
+
+
+def test_batch_rejects_urls_that_are_not_strings(fake_fetch):
+    client = TestClient(api_server.app)
+    for urls in ([123], ["https://a.example/", ""], ["https://a.example/", None], 42):
+        resp = client.post("/api/analyze/batch", json={"urls": urls, "tools": ["headings"]})
+        assert resp.status_code == 400
+    assert fake_fetch == []
+
+
+def test_unchanged_page_reuses_memoized_results(fake_fetch, monkeypatch):
+    import asyncio
+
+    from backend.mcp_server import seo_astro_analyzer_server as server
+
+    extracted = []
+    original = page_module.PageSnapshot.extract
+
+    def recording_extract(self, checks):
+        checks = list(checks)
+        extracted.extend(name for name in checks if name not in self._extracted)
+        return original(self, checks)
+
+    monkeypatch.setattr(page_module.PageSnapshot, "extract", recording_extract)
+    tools = ["title_meta", "headings"]
+    first = asyncio.run(server.run_analysis_async("https://example.com/", tools))
+    assert sorted(extracted) == ["headings", "title_meta"]
+    extracted.clear()
+    second = asyncio.run(server.run_analysis_async("https://example.com/", tools))
+    assert extracted == []
+    assert [r["result"]["result"] for r in second] == [r["result"]["result"] for r in first]
+    assert len(fake_fetch) == 2
+
+    # A version bump recomputes that check alone.
+    bumped = server.CHECKS["headings"]._replace(version=2)
+    monkeypatch.setitem(server.CHECKS, "headings", bumped)
+    server.run_analysis("https://example.com/", tools)
+    assert extracted == ["headings"]
+
+
+def test_analysis_is_stored_as_a_run(fake_fetch, tmp_path):
+    client = TestClient(api_server.app)
+    tools = ["title_meta", "headings"]
+    resp = client.post("/api/analyze", json={"url": "https://example.com/", "tools": tools}).json()
+    assert {r["result"]["persistence"] for r in resp["results"]} <= {"queued", "committed"}
+    run = client.get(f"/api/runs/{resp['run_id']}").json()
+    assert run["kind"] == "analysis"
+    assert [p["status_code"] for p in run["pages"]] == [200]
+    assert sorted(r["check"] for r in run["results"]) == sorted(tools)
+    history = client.get("/api/results", params={"url": "https://example.com/", "check": "headings"}).json()
+    assert history[0]["result"] == resp["results"][1]["result"]["result"]
+    assert client.get("/api/runs/nope").status_code == 404
+    assert not list(tmp_path.glob("seo_*.json"))
+    result_id = resp["results"][0]["result"]["result_id"]
+    assert result_store.get_result_store().persistence(result_id) == "committed"
+
+
+def test_planner_fetches_only_the_head_for_head_checks(fake_fetch):
+    import asyncio
+
+    from backend.mcp_server import seo_astro_analyzer_server as server
+
+    head_tools = ["title_meta", "lang_charset", "favicon_apple", "open_graph_twitter", "robots_canonical"]
+    head = asyncio.run(server.run_analysis_async("https://example.com/", head_tools))
+    assert {r["fetch"]["mode"] for r in head} == {"head"}
+    assert head[0]["fetch"]["stopped_early"]
+    assert head[0]["fetch"]["latency_ms"] >= 0
+
+    get_result_cache().clear()
+    full = server.run_analysis("https://example.com/", head_tools + ["headings"])
+    assert {r["fetch"]["mode"] for r in full} == {"full"}
+    evidence = lambda entries: [r["result"]["result"]["evidence"] for r in entries[: len(head_tools)]]  # noqa: E731
+    assert evidence(head) == evidence(full)
+
+
+def test_analysis_past_its_deadline_reports_timeouts(fake_fetch, monkeypatch):
+    import asyncio
+    import time
+
+    async def hanging_get(self, url, **kwargs):
+        await asyncio.sleep(5)
+
+    monkeypatch.setattr(httpx.AsyncClient, "get", hanging_get)
+    client = TestClient(api_server.app)
+    start = time.perf_counter()
+    resp = client.post(
+        "/api/analyze",
+        json={"url": "https://example.com/", "tools": ["title_meta", "headings"], "deadline": 0.2},
+    ).json()
+    assert time.perf_counter() - start < 2
+    assert resp["status"] == "partial"
+    assert [(r["tool"], r["status"], r["error"]) for r in resp["results"]] == [
+        ("title_meta", "timeout", "deadline exceeded"),
+        ("headings", "timeout", "deadline exceeded"),
+    ]
+    for deadline in (-1, [1], {"s": 1}, True, "soon", 10**6):
+        bad = client.post("/api/analyze", json={"url": "https://example.com/", "tools": ["headings"], "deadline": deadline})
+        assert bad.status_code == 400
+    nan = client.post(
+        "/api/analyze",
+        content='{"url": "https://example.com/", "tools": ["headings"], "deadline": NaN}',
+        headers={"Content-Type": "application/json"},
+    )
+    assert nan.status_code == 400
+    # The MCP server's analyze entry point validates the same way.
+    from backend.mcp_server import seo_astro_analyzer_server as server
+
+    request = type("Request", (), {"json": {"url": "https://example.com/", "tools": ["headings"], "deadline": [1]}})
+    assert server.analyze(request)[1] == 400
+
+
+def test_concurrent_analyses_from_api_and_mcp_share_one_run(fake_fetch, monkeypatch):
+    import asyncio
+
+    from backend.mcp_server import seo_astro_analyzer_server as server
+    from backend.seo_tools import singleflight
+
+    monkeypatch.setattr(server, "_analyses", singleflight.Group())
+    original_get = httpx.AsyncClient.get
+
+    async def slow_get(self, url, **kwargs):
+        await asyncio.sleep(0.2)
+        return await original_get(self, url, **kwargs)
+
+    monkeypatch.setattr(httpx.AsyncClient, "get", slow_get)
+    url = "https://example.com/"
+
+    async def main():
+        leader = asyncio.ensure_future(server.analyze_url_async(url, ["title_meta", "headings"]))
+        await asyncio.sleep(0.05)
+        return await asyncio.gather(
+            leader,
+            server.analyze_url_async(url, ["headings", "title_meta"]),
+            asyncio.to_thread(server.analyze_url, url, ["title_meta", "headings"]),
+        )
+
+    leader, reordered, from_thread = asyncio.run(main())
+    assert fake_fetch == [url]
+    assert [r["coalesced"] for r in (leader, reordered, from_thread)] == [False, True, True]
+    assert leader["run_id"] == reordered["run_id"] == from_thread["run_id"]
+    assert [r["tool"] for r in reordered["results"]] == ["headings", "title_meta"]
+    assert reordered["results"][1]["result"] == leader["results"][0]["result"]
+    assert reordered["results"][1] is not leader["results"][0]
+
+    client = TestClient(api_server.app)
+    assert client.get("/healthz/coalescing").json() == {
+        "calls": 3, "executions": 1, "coalesced": 2, "in_flight": 0, "coalescing_rate": 0.6667,
+    }
+    # The per-check MCP tools go through the same analyses.
+    assert server._mcp_check("title_meta", url)["result"]["evidence"]["title"] == "Sample Page"
@@ -0,0 +1,158 @@
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import httpx
+import pytest
+import requests
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from backend.mcp_server import api_server, result_store
+from backend.mcp_server import seo_astro_analyzer_server as server
+from backend.seo_tools.result_cache import get_result_cache
+from backend.seo_tools.robots import get_robots_cache
+
+SITE = {
+    "/": '<html><head><title>Home</title></head><body>'
+         '<a href="/a">A</a><a href="/b#frag">B</a><a href="https://elsewhere.example/">x</a></body></html>',
+    "/a": '<html><head><title>A</title></head><body><a href="/a/deep">deep</a><a href="/">home</a></body></html>',
+    "/b": '<html><head><title>B</title></head><body><a href="/a">A</a></body></html>',
+    "/a/deep": '<html><head><title>Deep</title></head><body><a href="/a/deeper">deeper</a></body></html>',
+    "/a/deeper": '<html><head><title>Deeper</title></head><body></body></html>',
+    "/only-in-sitemap": '<html><head><title>Sitemap</title></head><body></body></html>',
+}
+SITEMAP = "<urlset><url><loc>https://example.com/only-in-sitemap</loc></url></urlset>"
+
+
+class FakeResponse:
+    def __init__(self, url, text, status_code=200):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode("utf-8")
+        self.headers = requests.structures.CaseInsensitiveDict(
+            {"Content-Type": "text/html; charset=utf-8"}
+        )
+
+    def iter_content(self, chunk_size=None):
+        yield self.content
+
+    async def aiter_bytes(self, chunk_size=None):
+        yield self.content
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_site(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    get_robots_cache().clear()
+    get_result_cache().clear()
+    monkeypatch.setattr(result_store, "_store", result_store.ResultStore(str(tmp_path / "results.sqlite")))
+    calls = []
+
+    async def fake_get(self, url, **kwargs):
+        calls.append(url)
+        path = url.split("example.com", 1)[1]
+        if path == "/sitemap.xml":
+            return FakeResponse(url, SITEMAP)
+        if path in SITE:
+            return FakeResponse(url, SITE[path])
+        return FakeResponse(url, "", status_code=404)
+
+    @asynccontextmanager
+    async def fake_stream(self, method, url, **kwargs):
+        yield await fake_get(self, url, **kwargs)
+
+    monkeypatch.setattr(httpx.AsyncClient, "get", fake_get)
+    monkeypatch.setattr(httpx.AsyncClient, "stream", fake_stream)
+    return calls
+
+
+def crawl(**kwargs):
+    async def collect():
+        return [e async for e in server.iter_crawl_async("https://example.com/", ["title_meta"], **kwargs)]
+
+    entries = asyncio.run(collect())
+    return entries[:-1], entries[-1]["summary"]
+
+
+def test_crawl_follows_links_and_sitemap_within_depth(fake_site):
+    pages, summary = crawl(max_depth=2, workers=3)
+    by_url = {p["url"]: p for p in pages}
+    assert set(by_url) == {
+        "https://example.com/",
+        "https://example.com/a",
+        "https://example.com/b",
+        "https://example.com/a/deep",
+        "https://example.com/only-in-sitemap",
+    }
+    assert by_url["https://example.com/a/deep"]["depth"] == 2
+    title = by_url["https://example.com/a"]["results"][0]["result"]["result"]["evidence"]["title"]
+    assert title == "A"
+    # Every page is fetched once, the off-site link never.
+    assert sorted(fake_site) == sorted(
+        ["https://example.com/robots.txt", "https://example.com/sitemap.xml", *by_url]
+    )
+    assert summary["pages"] == 5
+    assert summary["errors"] == 0
+    assert summary["pages_per_sec"] > 0
+
+
+def test_crawl_stops_at_page_cap(fake_site):
+    pages, summary = crawl(max_pages=2, use_sitemap=False)
+    assert len(pages) == 2
+    assert pages[0]["url"] == "https://example.com/"
+    assert summary["pages"] == 2
+    assert summary["pending"] >= 1
+
+
+def test_crawl_skips_urls_disallowed_by_robots(fake_site, monkeypatch):
+    monkeypatch.setitem(SITE, "/robots.txt", "User-agent: *\nDisallow: /a\n")
+    pages, summary = crawl(max_depth=2)
+    assert {p["url"] for p in pages} == {
+        "https://example.com/",
+        "https://example.com/b",
+        "https://example.com/only-in-sitemap",
+    }
+    assert summary["disallowed"] == 1
+    assert "https://example.com/a" not in fake_site
+
+
+@pytest.mark.parametrize("failing", ["robots", "sitemap"])
+def test_crawl_finishes_its_run_when_setup_fails(fake_site, monkeypatch, failing):
+    from backend.seo_tools.resilience import DeadlineExceeded
+
+    async def no_robots(url):
+        raise DeadlineExceeded("deadline exceeded")
+
+    async def broken_sitemaps(*args, **kwargs):
+        raise ValueError("bad sitemap")
+        yield
+
+    if failing == "robots":
+        monkeypatch.setattr(get_robots_cache(), "get_async", no_robots)
+    else:
+        monkeypatch.setattr(server, "aiter_site_urls", broken_sitemaps)
+    store = result_store.get_result_store()
+    started = []
+    start_run = store.start_run
+    monkeypatch.setattr(store, "start_run", lambda *args: started.append(start_run(*args)) or started[-1])
+    with pytest.raises((DeadlineExceeded, ValueError)):
+        crawl()
+    assert store.run(started[0])["finished_at"] is not None
+
+
+@pytest.mark.parametrize(
+    "fields",
+    [{"workers": 100000}, {"workers": -1}, {"max_depth": -1}, {"max_depth": 10**6}, {"max_pages": 0}],
+)
+def test_crawl_endpoint_rejects_out_of_range_limits(fields):
+    client = TestClient(api_server.app)
+    resp = client.post("/api/crawl", json={"url": "https://example.com/", "tools": ["title_meta"], **fields})
+    assert resp.status_code == 400
+    assert next(iter(fields)) in resp.json()["error"]
@@ -9,21 +9,22 @@ from itertools import count
 import sys
 from pathlib import Path
 
-import httpx
 import pytest
 from fastapi.testclient import TestClient
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
 
-from backend.mcp_server import api_server, logs
+from backend.mcp_server import api_server, frontend_logs, logs
 
 
 @pytest.fixture(autouse=True)
-def reset_logs(monkeypatch):
+def reset_logs(monkeypatch, tmp_path):
     logs.log_buffer.clear()
-    logs.subscribers.clear()
     monkeypatch.setattr(logs, "log_id", count(1))
+    store = frontend_logs.FrontendLogStore(str(tmp_path / "frontend.db"))
+    monkeypatch.setattr(frontend_logs, "_store", store)
     yield
+    store.close()
 
 
 def test_pagination_and_after():
@@ -77,3 +78,329 @@ def test_redaction():
     meta = page["items"][0]["metadata"]
     assert meta["token"] == "***REDACTED***"
     assert meta["safe"] == "ok"
+
+
+def test_indexed_queries_match_a_full_scan_across_evictions():
+    import random
+
+    rng = random.Random(7)
+    store = logs.LogStore(maxlen=3000)
+    levels = list(logs.LogLevel)
+    for i in range(1, 10_001):
+        store.append(
+            logs.LogEntry(
+                id=i,
+                ts=datetime.utcnow(),
+                level=rng.choice(levels),
+                msg=f"event {rng.choice(['fetch', 'parse', 'save'])} {i}",
+                source=rng.choice(["api", "mcp", "crawler", None]),
+            )
+        )
+    assert len(store) == 3000 and next(iter(store)).id == 7001
+
+    def scan(source=None, level=None, q=None, limit=100, after=None, before=None):
+        items = [
+            e for e in store
+            if (after is None or e.id > after)
+            and (before is None or e.id < before)
+            and (not source or e.source == source)
+            and (not level or logs.SEVERITY[e.level] >= logs.SEVERITY[level])
+            and (not q or q.lower() in e.msg.lower())
+        ]
+        return items[-limit:] if limit else items
+
+    for query in [
+        {},
+        {"limit": 0},
+        {"source": "mcp"},
+        {"level": logs.LogLevel.ERROR},
+        {"source": "api", "level": logs.LogLevel.WARNING, "limit": 7},
+        {"source": "nope"},
+        {"q": "PARSE", "after": 9000},
+        {"level": logs.LogLevel.INFO, "before": 8000, "limit": 50},
+        {"source": "crawler", "after": 7500, "before": 7600, "limit": 0},
+    ]:
+        assert store.query(**query) == scan(**query), query
+
+
+def test_paging_backwards_with_before():
+    client = TestClient(api_server.app)
+    logger = logging.getLogger("test3")
+    for i in range(5):
+        logger.info(f"line {i}")
+    page = client.get("/logs", params={"limit": 2, "source": "test3"}).json()
+    assert [e["msg"] for e in page["items"]] == ["line 3", "line 4"]
+    older = client.get("/logs", params={"limit": 2, "source": "test3", "before": page["prev"]}).json()
+    assert [e["msg"] for e in older["items"]] == ["line 1", "line 2"]
+    oldest = client.get("/logs", params={"limit": 2, "source": "test3", "before": older["prev"]}).json()
+    assert [e["msg"] for e in oldest["items"]] == ["line 0"]
+
+
+def test_search_by_word_prefix_and_phrase():
+    client = TestClient(api_server.app)
+    logger = logging.getLogger("test4")
+    for msg in ["Fetch failed: deadline exceeded", "fetched robots.txt", "deadline set", "exceeded the deadline"]:
+        logger.info(msg)
+
+    def search(q):
+        return [e["msg"] for e in client.get("/logs", params={"q": q, "source": "test4"}).json()["items"]]
+
+    assert search("FETCH") == ["Fetch failed: deadline exceeded"]
+    assert search("fetch*") == ["Fetch failed: deadline exceeded", "fetched robots.txt"]
+    assert search('"deadline exceeded"') == ["Fetch failed: deadline exceeded"]
+    assert search('deadline exceeded') == ["Fetch failed: deadline exceeded", "exceeded the deadline"]
+    assert search('"the dead"*') == ["exceeded the deadline"]
+    assert search("robots.txt") == ["fetched robots.txt"]
+    assert search("dead") == [] and search("!!") == []
+
+
+def test_word_index_follows_evictions():
+    store = logs.LogStore(maxlen=2)
+    for i, msg in enumerate(["alpha beta", "beta gamma", "gamma delta"], start=1):
+        store.append(logs.LogEntry(id=i, ts=datetime.utcnow(), level=logs.LogLevel.INFO, msg=msg))
+    assert [e.id for e in store.query(q="beta")] == [2]
+    assert store.query(q="alpha") == [] and store.query(q="al*") == []
+    assert store.stats() == {"entries": 2, "words": 3, "word_pairs": 2}
+
+
+def test_persisted_frontend_logs_are_searchable(tmp_path):
+    import sqlite3
+
+    client = TestClient(api_server.app)
+    for level, msg in [("warn", "Hydration mismatch in header"), ("error", "Chunk load failed"), ("info", "route changed")]:
+        assert client.post("/logs/ingest/frontend", json={"level": level, "msg": msg, "source": "web"}).status_code == 200
+    page = client.get("/logs/frontend", params={"q": "chunk load"}).json()
+    assert [(e["level"], e["msg"]) for e in page["items"]] == [("ERROR", "Chunk load failed")]
+    page = client.get("/logs/frontend", params={"q": "hydrat*", "level": "WARNING"}).json()
+    assert [e["msg"] for e in page["items"]] == ["Hydration mismatch in header"]
+    assert client.get("/logs/frontend", params={"q": '"load chunk"'}).json()["items"] == []
+    # The same search finds the same entry in the ring buffer.
+    assert [e["msg"] for e in client.get("/logs", params={"q": "hydrat* mismatch"}).json()["items"]] == ["Hydration mismatch in header"]
+
+    # A database written before the index existed is indexed when opened.
+    path = tmp_path / "old.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE frontend_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, ts TEXT, level TEXT, source TEXT, msg TEXT, metadata TEXT)")
+    conn.execute("INSERT INTO frontend_logs (ts, level, source, msg, metadata) VALUES (?,?,?,?,?)", ("2024-01-01T00:00:00", "WARN", None, "legacy entry", "null"))
+    conn.commit()
+    conn.close()
+    store = frontend_logs.FrontendLogStore(str(path))
+    assert [(e.msg, e.level) for e in store.search(q="legacy")] == [("legacy entry", logs.LogLevel.WARNING)]
+    store.close()
+
+
+def test_window_seeks_by_time_and_pages_in_batches():
+    from datetime import timedelta
+
+    store = logs.LogStore(maxlen=2000)
+    base = datetime(2024, 1, 1)
+    for i in range(1, 5001):
+        # A few entries arrive a hair out of order, as threads do.
+        jitter = timedelta(milliseconds=-5) if i % 97 == 0 else timedelta(0)
+        store.append(logs.LogEntry(id=i, ts=base + timedelta(seconds=i) + jitter, level=logs.LogLevel.INFO, msg=f"event {i}"))
+    start, end = base + timedelta(seconds=3500), base + timedelta(seconds=3700)
+    batches = list(store.window(start, end, batch=64))
+    assert [len(b) for b in batches] == [64, 64, 64, 9]
+    assert [e.id for b in batches for e in b] == [e.id for e in store if start <= e.ts <= end]
+    # Only the evicted part of the window is missing.
+    assert next(iter(next(store.window(None, end)))).id == 3001
+    assert list(store.window(start, end, q="nothing")) == []
+
+
+def test_download_streams_gzip_and_persisted_frontend_rows():
+    import gzip
+
+    client = TestClient(api_server.app)
+    t_from = datetime.now().isoformat()
+    logging.getLogger("test5").info("backend line")
+    client.post("/logs/ingest/frontend", json={"level": "error", "msg": "Chunk load failed", "source": "web", "metadata": {"route": "/"}})
+    t_to = datetime.now().isoformat()
+    resp = client.get("/logs/download", params={"from": t_from, "to": t_to, "gzip": True})
+    assert resp.headers["content-type"] == "application/gzip"
+    lines = [json.loads(line) for line in gzip.decompress(resp.content).decode().splitlines()]
+    backend = [e for e in lines if e.get("origin") != "frontend"]
+    persisted = [e for e in lines if e.get("origin") == "frontend"]
+    # The ring buffer's copy of the frontend entry is not exported twice.
+    assert "Chunk load failed" not in [e["msg"] for e in backend]
+    assert "backend line" in [e["msg"] for e in backend]
+    assert [(e["level"], e["msg"], e["source"], e["metadata"]) for e in persisted] == [("ERROR", "Chunk load failed", "web", {"route": "/"})]
+    assert logs.LogEntry.model_validate({k: v for k, v in persisted[0].items() if k != "origin"})
+
+    resp = client.get("/logs/download", params={"from": t_from, "to": t_to, "frontend": False, "level": "ERROR"})
+    assert [json.loads(line)["source"] for line in resp.text.splitlines()] == ["frontend"]
+
+
+def _entry(i, source="app"):
+    return logs.LogEntry(id=i, ts=datetime.utcnow(), level=logs.LogLevel.INFO, msg=f"line {i}", source=source)
+
+
+def test_streams_share_serialised_events_and_wake_from_other_threads():
+    import asyncio
+    import threading
+
+    store = logs.LogStore(maxlen=100)
+    store.append(_entry(1))
+    hub = logs.Broadcaster(store)
+
+    async def client(frames, source=None):
+        async for frame in hub.stream(0, source=source, heartbeat=5):
+            if not frame.startswith(":"):
+                frames.append(frame)
+            if sum(frame.count("\n\n") for frame in frames) >= (2 if source else 4):
+                return
+
+    async def main():
+        first, second, filtered = [], [], []
+        tasks = [asyncio.create_task(client(frames, source)) for frames, source in [(first, None), (second, None), (filtered, "db")]]
+        await asyncio.sleep(0.05)
+
+        def produce():
+            for i, source in [(2, "db"), (3, "app"), (4, "db")]:
+                store.append(_entry(i, source))
+                hub.notify()
+
+        thread = threading.Thread(target=produce)
+        thread.start()
+        await asyncio.wait_for(asyncio.gather(*tasks), 5)
+        thread.join()
+        return first, second, filtered
+
+    first, second, filtered = asyncio.run(main())
+    events = "".join(first).split("\n\n")[:-1]
+    assert [e.split("\n")[0] for e in events] == ["id: 1", "id: 2", "id: 3", "id: 4"]
+    assert json.loads(events[3].split("data: ")[1])["msg"] == "line 4"
+    assert "".join(second) == "".join(first)
+    # Every stream sent the one string serialised for each entry.
+    assert all(a is b for a, b in zip(store.events_after(0, 10)[1], store.events_after(0, 10)[1]))
+    assert [e.split("\n")[0] for e in "".join(filtered).split("\n\n")[:-1]] == ["id: 2", "id: 4"]
+    assert hub.stats()["streams"] == 0
+
+
+def test_slow_stream_resumes_from_its_cursor_and_reports_evictions():
+    import asyncio
+
+    store = logs.LogStore(maxlen=5)
+    for i in range(1, 4):
+        store.append(_entry(i))
+    hub = logs.Broadcaster(store)
+
+    async def read(cursor, frames):
+        stream = hub.stream(cursor, heartbeat=5, batch=2)
+        try:
+            for _ in range(frames):
+                yield await stream.__anext__()
+        finally:
+            await stream.aclose()
+
+    async def collect(cursor, frames):
+        return [frame async for frame in read(cursor, frames)]
+
+    # Entries are read in frames of at most ``batch`` from the cursor on.
+    frames = asyncio.run(collect(0, 3))
+    assert frames[0] == ":heartbeat\n\n"
+    assert [[line for line in frame.splitlines() if line.startswith("id: ")] for frame in frames[1:]] == [["id: 1", "id: 2"], ["id: 3"]]
+    # A client that fell behind by more than the buffer learns how much it missed.
+    for i in range(4, 11):
+        store.append(_entry(i))
+    frames = asyncio.run(collect(2, 3))
+    assert frames[1] == 'event: warning\ndata: {"missed": 3}\n\n'
+    assert [line for line in frames[2].splitlines() if line.startswith("id: ")] == ["id: 6", "id: 7"]
+
+
+def test_stream_endpoint_resumes_from_last_event_id():
+    import asyncio
+
+    logger = logging.getLogger("test6")
+    for i in range(3):
+        logger.info(f"line {i}")
+    ids = [e.id for e in logs.log_buffer.query(source="test6")]
+
+    async def first_frames():
+        response = await api_server.stream_logs(after=None, source="test6", last_event_id=ids[0])
+        frames = response.body_iterator
+        try:
+            return [await frames.__anext__() for _ in range(2)]
+        finally:
+            await frames.aclose()
+
+    frames = asyncio.run(first_frames())
+    assert [line for line in frames[1].splitlines() if line.startswith("id: ")] == [f"id: {i}" for i in ids[1:]]
+
+
+def test_ingest_accepts_arrays_and_ndjson():
+    client = TestClient(api_server.app)
+    events = [{"level": "warn", "msg": f"slow paint {i}", "source": "web", "metadata": {"token": "x"}} for i in range(3)]
+    assert client.post("/logs/ingest/frontend", json=events).json() == {"status": "ok", "accepted": 3}
+    body = "\n".join(json.dumps({"level": "error", "msg": f"chunk {i} failed"}) for i in range(2)) + "\n"
+    resp = client.post("/logs/ingest/frontend", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert resp.json()["accepted"] == 2
+    assert client.post("/logs/ingest/frontend", content="{nope", headers={"Content-Type": "application/json"}).status_code == 400
+    assert client.post("/logs/ingest/frontend", json=[1, 2]).status_code == 400
+    for bad in ({"msg": {"nested": 1}}, {"msg": "ok", "source": 7}, {"level": ["warn"]}, {"metadata": [1]}):
+        assert client.post("/logs/ingest/frontend", json=[{"msg": "fine"}, bad]).status_code == 400
+
+    items = client.get("/logs/frontend").json()["items"]
+    assert [e["msg"] for e in items] == [f"slow paint {i}" for i in range(3)] + ["chunk 0 failed", "chunk 1 failed"]
+    assert items[0]["metadata"] == {"token": "***REDACTED***"}
+    # Every event also reaches the ring buffer and live streams.
+    assert len(logs.log_buffer.query(source=api_server.FRONTEND_LOGGER)) == 5
+    stats = client.get("/healthz/logs").json()["frontend"]
+    assert stats["ingested"] == stats["committed"] == stats["rows"] == 5
+    assert stats["commit_ms"]["p50"] is not None and stats["rows_per_second"] > 0
+
+
+def test_frontend_rows_are_group_committed_by_size_or_time(tmp_path):
+    store = frontend_logs.FrontendLogStore(str(tmp_path / "batched.db"), batch_size=10, flush_interval=60)
+    store.add_many([("info", f"event {i}", None, None) for i in range(25)])
+    store.flush()
+    # Two full groups, then the rest once a reader asked for them.
+    assert store.stats()["commits"] == 3 and store.stats()["committed"] == 25
+    store.close()
+
+    store = frontend_logs.FrontendLogStore(str(tmp_path / "timed.db"), batch_size=1000, flush_interval=0.05)
+    store.add("info", "lonely event")
+    deadline = time.monotonic() + 5
+    while store.stats()["committed"] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    stats = store.stats()
+    assert stats["commits"] == 1 and stats["wait_ms"]["max"] >= 40
+    store.close()
+
+
+def test_bad_row_fails_alone_instead_of_its_whole_group(tmp_path):
+    store = frontend_logs.FrontendLogStore(str(tmp_path / "bad.db"), batch_size=10, flush_interval=60)
+    store.add_many([("info", "before", None, None), ("info", {"not": "text"}, None, None), ("info", "after", None, None)])
+    store.flush()
+    stats = store.stats()
+    assert stats["committed"] == 2 and stats["failed"] == 1 and stats["rows"] == 2
+    assert [e.msg for e in store.search()] == ["before", "after"]
+    store.close()
+
+
+def test_frontend_stats_keep_a_running_count_and_do_not_wait_for_commits(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "counted.db")
+    store = frontend_logs.FrontendLogStore(path, batch_size=10, flush_interval=0)
+    store.add_many([("info", f"event {i}", None, None) for i in range(3)])
+    store.flush()
+    # Another writer holds the database, so the next commit stalls.
+    blocker = sqlite3.connect(path, isolation_level=None)
+    blocker.execute("BEGIN EXCLUSIVE")
+    store.add("info", "stalled")
+    time.sleep(0.2)
+    start = time.monotonic()
+    stats = store.stats()
+    store.add("info", "queued behind it")
+    assert time.monotonic() - start < 0.5
+    assert stats["rows"] == 3 and stats["committed"] == 3
+    blocker.execute("COMMIT")
+    blocker.close()
+    store.flush()
+    assert store.stats()["rows"] == 5
+    store.clear()
+    assert store.stats()["rows"] == 0
+    store.close()
+    reopened = frontend_logs.FrontendLogStore(path)
+    assert reopened.stats()["rows"] == 0
+    reopened.close()
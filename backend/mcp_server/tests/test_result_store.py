@@ -0,0 +1,152 @@
+import json
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from backend.mcp_server.result_store import ResultStore, main, url_to_slug
+
+
+def make_result(title):
+    return {
+        "summary": {"score": 100, "grade": "A"},
+        "metrics": {"title_length": len(title)},
+        "details": [],
+        "evidence": {"title": title, "meta": {"description": "x" * 500}},
+    }
+
+
+def test_writes_are_group_committed_behind_the_caller(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite"), batch_size=100, flush_interval=60)
+    run = store.start_run("analysis", "https://a.test/", ["title_meta"])
+    ids = [store.add_result(run, "https://a.test/", "title_meta", make_result(str(i))) for i in range(20)]
+    store.finish_run(run)
+    assert {store.persistence(result_id) for result_id in ids} == {"queued"}
+    assert store.stats()["commits"] == 0
+    store.flush()
+    assert {store.persistence(result_id) for result_id in ids} == {"committed"}
+    stats = store.stats()
+    assert (stats["commits"], stats["committed"], stats["uncommitted_results"]) == (1, 20, 0)
+    assert store.run(run)["finished_at"] is not None
+
+
+def test_full_queue_applies_backpressure(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite"), batch_size=1, queue_size=2)
+    release = threading.Event()
+    write = store._writer.write
+
+    def slow_write(conn, items):
+        release.wait()
+        write(conn, items)
+
+    store._writer.write = slow_write
+    run = store.start_run("crawl", "https://a.test/")
+    producer = threading.Thread(
+        target=lambda: [store.add_result(run, f"https://a.test/{i}", "links", make_result("x")) for i in range(5)]
+    )
+    producer.start()
+    deadline = time.monotonic() + 5
+    while not store.stats()["backpressure"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert store.stats()["backpressure"] == 1
+    assert producer.is_alive()
+    release.set()
+    producer.join(5)
+    assert len(store.results(run_id=run)) == 5
+
+
+def test_close_commits_queued_rows_and_failures_are_reported(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    store = ResultStore(path, flush_interval=60)
+    run = store.start_run("check", "https://a.test/", ["headings"])
+    result_id = store.add_result(run, "https://a.test/", "headings", make_result("x"))
+    store.close()
+    assert store.persistence(result_id) == "committed"
+    assert ResultStore(path).results(run_id=run)[0]["id"] == result_id
+
+    broken = ResultStore(str(tmp_path / "missing" / "results.sqlite"))
+
+    def fail():
+        raise sqlite3.OperationalError("disk I/O error")
+
+    broken._writer.connect = fail
+    result_id = broken.add_result(run, "https://a.test/", "headings", make_result("x"))
+    broken.flush()
+    assert broken.persistence(result_id) == "failed"
+    assert broken.stats()["failed"] == 1
+
+
+def test_queries_by_url_run_check_and_time(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite"))
+    first = store.start_run("analysis", "https://a.test/", ["title_meta"])
+    store.add_page(first, "https://a.test/", 200, "abc")
+    store.add_result(first, "https://a.test/", "title_meta", make_result("Old"))
+    store.finish_run(first)
+    cutoff = store.results(run_id=first)[0]["created_at"]
+    second = store.start_run("batch", None, ["title_meta", "headings"])
+    store.add_result(second, "https://a.test/", "title_meta", make_result("New"))
+    store.add_result(second, "https://b.test/", "headings", make_result("B"))
+    store.finish_run(second)
+
+    newest = store.results(url="https://a.test/")
+    assert [r["result"]["evidence"]["title"] for r in newest] == ["New", "Old"]
+    assert [r["url"] for r in store.results(run_id=second)] == ["https://b.test/", "https://a.test/"]
+    assert [r["url"] for r in store.results(check="headings")] == ["https://b.test/"]
+    assert [r["run_id"] for r in store.results(until=cutoff)] == [first]
+    assert "evidence" not in store.results(run_id=first, evidence=False)[0]["result"]
+    run = store.run(first)
+    assert run["kind"] == "analysis" and run["tools"] == ["title_meta"]
+    assert run["pages"][0]["content_hash"] == "abc"
+    assert run["results"][0]["result"] == make_result("Old")
+    assert store.run("missing") is None
+
+
+def test_evidence_is_compressed(tmp_path):
+    path = tmp_path / "results.sqlite"
+    store = ResultStore(str(path))
+    run = store.start_run("check", "https://a.test/", ["title_meta"])
+    store.add_result(run, "https://a.test/", "title_meta", make_result("One"))
+    store.close()
+    blob = sqlite3.connect(path).execute("SELECT evidence FROM results").fetchone()[0]
+    assert json.loads(zlib.decompress(blob)) == make_result("One")["evidence"]
+    assert len(blob) < len(json.dumps(make_result("One")["evidence"]))
+
+
+def test_export_writes_the_json_file_layout(tmp_path):
+    db = tmp_path / "results.sqlite"
+    store = ResultStore(str(db))
+    for title in ("Old", "New"):
+        run = store.start_run("analysis", "https://a.test/", ["title_meta"])
+        store.add_result(run, "https://a.test/", "title_meta", make_result(title))
+        store.finish_run(run)
+    store.close()
+    out = tmp_path / "export"
+    main(["export", str(out), "--db", str(db)])
+    exported = out / f"seo_title_meta_{url_to_slug('https://a.test/')}.json"
+    assert [p.name for p in out.iterdir()] == [exported.name]
+    assert json.loads(exported.read_text(encoding="utf-8")) == make_result("New")
+
+
+def test_producers_do_not_wait_for_a_commit_in_progress(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    store = ResultStore(path, batch_size=1, flush_interval=0)
+    store.start_run("analysis")
+    store.flush()
+    # Another writer holds the database, so the worker's next commit stalls.
+    blocker = sqlite3.connect(path, isolation_level=None)
+    blocker.execute("BEGIN EXCLUSIVE")
+    run = store.start_run("analysis", "https://a.test/", ["title_meta"])
+    time.sleep(0.2)
+    start = time.monotonic()
+    result_id = store.add_result(run, "https://a.test/", "title_meta", make_result("t"))
+    assert store.persistence(result_id) == "queued" and store.stats()["commits"] == 1
+    assert time.monotonic() - start < 0.5
+    blocker.execute("COMMIT")
+    blocker.close()
+    store.flush()
+    assert store.persistence(result_id) == "committed"
+    store.close()
@@ -0,0 +1,192 @@
+"""Write-behind writer shared by the SQLite stores.
+
+Producers :meth:`~WriteBehind.put` items on a bounded queue and return,
+blocking only while it is full. A background thread commits the queue in
+groups of up to ``batch_size`` items, gathered over at most
+``flush_interval`` seconds or until someone waits on :meth:`~WriteBehind.flush`,
+one transaction each. The thread writes on a connection of its own and
+holds no lock of the store's while it does, so producers and readers on the
+request path never wait for a commit.
+
+The store supplies ``write(conn, items)``, which runs inside the
+transaction, and ``done(items, error)``, which runs after it (``error`` is
+None when the commit succeeded) to update the store's own bookkeeping. A
+group that fails is retried one item per transaction, so a bad item fails
+only itself rather than everything committed alongside it.
+"""
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+# Commits remembered for the latency figures, and the span of the throughput.
+RECENT_COMMITS = 1000
+THROUGHPUT_WINDOW = 10.0
+
+_FLUSH = object()
+_STOP = object()
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+class WriteBehind:
+    def __init__(
+        self,
+        name: str,
+        connect: Callable[[], sqlite3.Connection],
+        write: Callable[[sqlite3.Connection, List[Any]], None],
+        done: Callable[[List[Any], Optional[Exception]], None],
+        batch_size: int,
+        flush_interval: float,
+        queue_size: int,
+    ):
+        self.name = name
+        self.connect = connect
+        self.write = write
+        self.done = done
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        # (finished at, items, seconds in the transaction, seconds the oldest item waited)
+        self._recent: deque = deque(maxlen=RECENT_COMMITS)
+        self.counters = {"commits": 0, "failed_commits": 0, "backpressure": 0}
+
+    def _enqueue(self, entry) -> threading.Thread:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            thread = self._thread
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            # Backpressure: hold the producer until the writer makes room.
+            with self._lock:
+                self.counters["backpressure"] += 1
+            self._queue.put(entry)
+        return thread
+
+    def put(self, item: Any) -> None:
+        """Queue ``item`` for the next commit."""
+        self._enqueue((item, time.monotonic()))
+
+    def flush(self) -> None:
+        """Wait until everything queued so far is committed."""
+        if self._thread is not None:
+            done = threading.Event()
+            self._enqueue((_FLUSH, done))
+            done.wait()
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            # Gather items until the batch is full, the interval is up or
+            # someone waits on a flush.
+            while batch[-1][0] is not _FLUSH and batch[-1][0] is not _STOP and len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            stop = batch[-1][0] is _STOP
+            self._commit([entry for entry in batch if entry[0] is not _FLUSH and entry[0] is not _STOP])
+            for entry in batch:
+                if entry[0] is _FLUSH:
+                    entry[1].set()
+
+    def _transaction(self, items: List[Any]) -> Optional[Exception]:
+        try:
+            if self._conn is None:
+                self._conn = self.connect()
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self.write(self._conn, items)
+        except Exception as e:
+            return e
+        return None
+
+    def _commit(self, entries) -> None:
+        if not entries:
+            return
+        items = [item for item, _ in entries]
+        start = time.monotonic()
+        error = self._transaction(items)
+        if error is None:
+            failed: List[Any] = []
+            committed = items
+        else:
+            logging.error(f"{self.name}: failed to commit {len(items)} rows: {error}")
+            failed, committed = [], []
+            if len(items) > 1:
+                for item in items:
+                    item_error = self._transaction([item])
+                    if item_error is None:
+                        committed.append(item)
+                    else:
+                        failed.append(item)
+                        error = item_error
+                logging.error(f"{self.name}: {len(failed)} of {len(items)} rows failed when committed one by one: {error}")
+            else:
+                failed = items
+        finished = time.monotonic()
+        with self._lock:
+            if committed:
+                self.counters["commits"] += 1
+                self._recent.append((finished, len(committed), finished - start, finished - entries[0][1]))
+            if failed:
+                self.counters["failed_commits"] += 1
+        if committed:
+            self.done(committed, None)
+        if failed:
+            self.done(failed, error)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and counters, with throughput and commit latency.
+
+        ``rows_per_second`` is averaged over the last ``THROUGHPUT_WINDOW``
+        seconds. ``commit_ms`` is the time spent in each transaction, and
+        ``wait_ms`` the time its oldest item waited from queueing to commit,
+        over the last ``RECENT_COMMITS`` commits.
+        """
+        with self._lock:
+            counters = dict(self.counters)
+            recent = list(self._recent)
+        since = time.monotonic() - THROUGHPUT_WINDOW
+        latency = {}
+        for name, column in (("commit_ms", 2), ("wait_ms", 3)):
+            values = [commit[column] * 1000 for commit in recent]
+            latency[name] = {
+                "p50": _percentile(values, 50) if values else None,
+                "p99": _percentile(values, 99) if values else None,
+                "max": max(values, default=None),
+            }
+        return {
+            "queued": self._queue.qsize(),
+            "queue_size": self._queue.maxsize,
+            **counters,
+            "rows_per_second": sum(commit[1] for commit in recent if commit[0] >= since) / THROUGHPUT_WINDOW,
+            **latency,
+        }
+
+    def close(self) -> None:
+        """Commit everything queued, stop the thread and close its connection."""
+        if self._thread is not None:
+            self._enqueue((_STOP, None)).join()
+        with self._lock:
+            self._thread = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
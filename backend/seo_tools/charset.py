@@ -0,0 +1,155 @@
+"""Charset detection on raw bytes, in the order browsers use.
+
+:func:`detect_charset` picks the encoding of a body without decoding it
+first. The checks run in this order:
+
+1. a byte order mark;
+2. the ``charset`` parameter of the ``Content-Type`` header;
+3. a ``<meta charset>`` or ``<meta http-equiv="Content-Type">`` in the first
+   ``CHARSET_PRESCAN_BYTES`` of the body (default 4096), following the HTML
+   prescan rules;
+4. detection on the first ``CHARSET_SAMPLE_BYTES`` (default 64 KiB). A
+   sample that is valid UTF-8 is taken as UTF-8. Anything else goes to
+   ``charset_normalizer`` when it is installed, and otherwise falls back to
+   windows-1252.
+
+The result names the encoding and the step that found it, so checks such as
+``lang_charset`` can report it without parsing the page again. Unlike
+``requests``' ``apparent_encoding``, no step reads more than the sample.
+"""
+import codecs
+import os
+import re
+from typing import Any, Dict, Mapping, NamedTuple, Optional
+
+PRESCAN_BYTES = int(os.environ.get("CHARSET_PRESCAN_BYTES", "4096"))
+SAMPLE_BYTES = int(os.environ.get("CHARSET_SAMPLE_BYTES", str(64 * 1024)))
+DEFAULT = "windows-1252"
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+)
+_CHARSET_PARAM = re.compile(rb"""charset\s*=\s*["']?\s*([^\s"';]+)""", re.I)
+_META = re.compile(rb"<meta[\s/]([^>]*)>?", re.I)
+_ATTRIBUTE = re.compile(rb"""([^\s/>=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]*)))?""")
+_SKIP = re.compile(rb"<!--.*?-->|<[!/?][^>]*>", re.S)
+
+
+class Charset(NamedTuple):
+    #: Name of the encoding, e.g. ``utf-8`` or ``windows-1252``.
+    encoding: str
+    #: Where it came from: ``bom``, ``header``, ``meta``, ``detected`` or ``default``.
+    source: str
+
+    def decode(self, content: bytes) -> str:
+        """``content`` (any bytes-like object) as text."""
+        text = str(content, self.encoding, "replace")
+        return text[1:] if self.source == "bom" and text.startswith("\ufeff") else text
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"charset": self.encoding, "charset_source": self.source}
+
+
+def normalize(label: Optional[str]) -> Optional[str]:
+    """The encoding named by ``label``, or None when Python has no such codec.
+
+    Labels are folded the way browsers fold them: ``iso-8859-1`` and
+    ``us-ascii`` mean windows-1252.
+    """
+    if not label:
+        return None
+    try:
+        name = codecs.lookup(label.strip().strip("\"'")).name
+    except LookupError:
+        return None
+    if name in ("ascii", "latin-1", "iso8859-1"):
+        return DEFAULT
+    if name.startswith("cp125"):
+        return "windows-" + name[2:]
+    if name.startswith("iso8859-"):
+        return "iso-8859-" + name[8:]
+    return name
+
+
+def from_content_type(content_type: Optional[str]) -> Optional[str]:
+    """The encoding of the ``charset`` parameter of a ``Content-Type`` value."""
+    if not content_type:
+        return None
+    match = _CHARSET_PARAM.search(content_type.encode("latin-1", errors="replace"))
+    return normalize(match.group(1).decode("ascii", errors="replace")) if match else None
+
+
+def _attributes(raw: bytes) -> Dict[bytes, bytes]:
+    attrs: Dict[bytes, bytes] = {}
+    for match in _ATTRIBUTE.finditer(raw):
+        name = match.group(1).lower()
+        if name not in attrs:
+            attrs[name] = next((v for v in match.group(2, 3, 4) if v is not None), b"")
+    return attrs
+
+
+def prescan(content: bytes, limit: Optional[int] = None) -> Optional[str]:
+    """The encoding declared by the first usable ``<meta>`` in ``content[:limit]``."""
+    head = _SKIP.sub(lambda m: b" " * len(m.group(0)), content[: PRESCAN_BYTES if limit is None else limit])
+    for match in _META.finditer(head):
+        attrs = _attributes(match.group(1))
+        if b"charset" in attrs:
+            label = attrs[b"charset"]
+        elif attrs.get(b"http-equiv", b"").lower() == b"content-type":
+            found = _CHARSET_PARAM.search(attrs.get(b"content", b""))
+            label = found.group(1) if found else None
+        else:
+            continue
+        encoding = normalize(label.decode("ascii", errors="replace")) if label else None
+        if encoding is None:
+            continue
+        # A document that could be read as ASCII cannot really be UTF-16.
+        return "utf-8" if encoding.startswith("utf-16") else encoding
+    return None
+
+
+def _valid_utf8(sample: bytes, complete: bool) -> bool:
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=complete)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _guess(sample: bytes) -> Optional[str]:
+    try:
+        from charset_normalizer import from_bytes
+    except ImportError:
+        return None
+    best = from_bytes(sample).best()
+    return normalize(best.encoding) if best is not None else None
+
+
+def detect_charset(content: bytes, content_type: Optional[str] = None) -> Charset:
+    """The encoding of ``content`` served with the ``Content-Type`` ``content_type``."""
+    for bom, encoding in _BOMS:
+        if content.startswith(bom):
+            return Charset(encoding, "bom")
+    encoding = from_content_type(content_type)
+    if encoding is not None:
+        return Charset(encoding, "header")
+    encoding = prescan(content)
+    if encoding is not None:
+        return Charset(encoding, "meta")
+    if not content:
+        return Charset("utf-8", "default")
+    sample = content[:SAMPLE_BYTES]
+    if _valid_utf8(sample, complete=len(sample) == len(content)):
+        return Charset("utf-8", "detected")
+    encoding = _guess(sample)
+    if encoding is not None:
+        return Charset(encoding, "detected")
+    return Charset(DEFAULT, "default")
+
+
+def response_charset(resp, content: bytes) -> Charset:
+    """:func:`detect_charset` for a ``requests``/``httpx`` or cached response."""
+    headers: Mapping[str, str] = getattr(resp, "headers", None) or {}
+    return detect_charset(content, headers.get("Content-Type"))
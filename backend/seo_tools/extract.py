@@ -0,0 +1,502 @@
+"""Single-pass extraction engine for the HTML checks.
+
+The per-check functions in this package each walk a BeautifulSoup tree on
+their own. The engine here instead receives the document as a stream of parse
+events and hands every start tag, end tag and string to all of the
+registered extractors as it goes, so one pass fills in the results of every
+requested check without ever building a tree.
+
+Events come from a parser backend (see :mod:`.parsers`). The ``html.parser``
+tokenizer below follows the rules BeautifulSoup's ``html.parser`` builder
+uses (void elements, end tags popping to the nearest open match, consecutive
+data merged into one string, whitespace-only strings collapsed, script/style
+text kept apart from document text), so results are identical to the
+``get_*`` functions.
+"""
+from collections import Counter
+from html.parser import HTMLParser
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from bs4.dammit import EntitySubstitution
+
+VOID_ELEMENTS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link',
+    'menuitem', 'meta', 'param', 'source', 'track', 'wbr', 'basefont', 'bgsound',
+    'command', 'frame', 'image', 'isindex', 'nextid', 'spacer',
+])
+PRESERVE_WHITESPACE = frozenset(['pre', 'textarea'])
+# Text inside these elements is not document text (BeautifulSoup gives it its
+# own string class, which get_text() skips).
+STRING_CONTAINERS = frozenset(['rt', 'rp', 'style', 'script', 'template'])
+
+# String kinds passed to Extractor.string().
+TEXT = 'text'
+CDATA = 'cdata'
+COMMENT = 'comment'
+OTHER = 'other'
+DOCUMENT_TEXT = (TEXT, CDATA)
+
+_ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+_NON_WHITESPACE = re.compile(r'\S+')
+_WORD = re.compile(r'\w+')
+_DECIMAL_REF = re.compile(r'^([0-9]+)(.*)')
+_HEX_REF = re.compile(r'^([0-9a-f]+)(.*)')
+
+
+def _numeric_reference(name):
+    """Resolve the body of ``&#...;`` the way BeautifulSoup's html.parser builder does."""
+    base, reg = 10, _DECIMAL_REF
+    if name.startswith(('x', 'X')):
+        name, base, reg = name[1:], 16, _HEX_REF
+    extra = ''
+    try:
+        number = int(name, base)
+    except ValueError:
+        match = reg.search(name)
+        if match is None:
+            return name
+        number, extra = int(match.group(1), base), match.group(2)
+    if number == 0 or number > 0x10ffff or 0xd800 <= number <= 0xdfff:
+        char = '\ufffd'
+    elif 0x80 <= number <= 0x9f:
+        # Numeric references in this range are nearly always windows-1252 bytes.
+        try:
+            char = bytes([number]).decode('cp1252')
+        except UnicodeDecodeError:
+            char = chr(number)
+    else:
+        char = chr(number)
+    return char + extra
+
+
+# --- Extractors ---------------------------------------------------------------
+
+class Extractor:
+    """Receives parse events for one check and builds its result.
+
+    ``start`` is called for every element (void elements included) with its
+    attribute dict, ``end`` when the element is closed, and ``string`` for every
+    completed string with its kind (``TEXT``, ``CDATA``, ``COMMENT``,
+    ``OTHER`` or the name of the enclosing string container, e.g. ``script``).
+    """
+
+    name = ''
+
+    def start(self, tag: str, attrs: Dict[str, str]) -> None:
+        pass
+
+    def end(self, tag: str) -> None:
+        pass
+
+    def string(self, data: str, kind: str) -> None:
+        pass
+
+    def result(self) -> Any:
+        raise NotImplementedError
+
+
+class _StringCapture:
+    """Tracks the subtree of one element to answer BeautifulSoup's ``Tag.string``."""
+
+    def __init__(self):
+        self.root: List[Any] = []
+        self.stack = [self.root]
+        self.done = False
+
+    def start(self, tag):
+        child: List[Any] = []
+        self.stack[-1].append(child)
+        self.stack.append(child)
+
+    def end(self):
+        self.stack.pop()
+        if not self.stack:
+            self.done = True
+
+    def string(self, data):
+        self.stack[-1].append(data)
+
+    def value(self) -> Optional[str]:
+        node = self.root
+        while len(node) == 1:
+            node = node[0]
+            if isinstance(node, str):
+                return node
+        return None
+
+
+class TitleMetaExtractor(Extractor):
+    name = 'title_meta'
+
+    def __init__(self):
+        self.title: Optional[_StringCapture] = None
+        self.meta: Dict[str, str] = {}
+
+    def start(self, tag, attrs):
+        if self.title is not None and not self.title.done:
+            self.title.start(tag)
+        elif tag == 'title' and self.title is None:
+            self.title = _StringCapture()
+        if tag == 'meta':
+            self.meta[attrs.get('name', attrs.get('property', ''))] = attrs.get('content', '')
+
+    def end(self, tag):
+        if self.title is not None and not self.title.done:
+            self.title.end()
+
+    def string(self, data, kind):
+        if self.title is not None and not self.title.done:
+            self.title.string(data)
+
+    def result(self):
+        title = self.title.value() if self.title is not None else ''
+        return {'title': title, 'meta': self.meta}
+
+
+class RobotsCanonicalExtractor(Extractor):
+    name = 'robots_canonical'
+
+    def __init__(self):
+        self.robots: List[str] = []
+        self.canonical: Optional[str] = None
+
+    def start(self, tag, attrs):
+        if tag == 'meta' and attrs.get('name') == 'robots':
+            self.robots.append(attrs.get('content', ''))
+        elif tag == 'link' and self.canonical is None and 'canonical' in _NON_WHITESPACE.findall(attrs.get('rel', '')):
+            self.canonical = attrs.get('href', '')
+
+    def result(self):
+        return {'robots': self.robots, 'canonical': self.canonical or ''}
+
+
+class HeadingsExtractor(Extractor):
+    name = 'headings'
+    levels = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+
+    def __init__(self):
+        self.headings: Dict[str, List[Any]] = {tag: [] for tag in self.levels}
+        self.open: List[List[str]] = []
+
+    def start(self, tag, attrs):
+        if tag in self.headings:
+            parts: List[str] = []
+            self.headings[tag].append(parts)
+            self.open.append(parts)
+
+    def end(self, tag):
+        if tag in self.headings:
+            self.open.pop()
+
+    def string(self, data, kind):
+        if self.open and kind in DOCUMENT_TEXT:
+            data = data.strip()
+            if data:
+                for parts in self.open:
+                    parts.append(data)
+
+    def result(self):
+        return {tag: [''.join(parts) for parts in found] for tag, found in self.headings.items()}
+
+
+class ImagesAltExtractor(Extractor):
+    name = 'images_alt'
+
+    def __init__(self):
+        self.images: List[Dict[str, str]] = []
+
+    def start(self, tag, attrs):
+        if tag == 'img':
+            self.images.append({'src': attrs.get('src', ''), 'alt': attrs.get('alt', '')})
+
+    def result(self):
+        return self.images
+
+
+class LinksExtractor(Extractor):
+    name = 'links'
+
+    def __init__(self):
+        self.links: List[str] = []
+
+    def start(self, tag, attrs):
+        if tag == 'a' and 'href' in attrs:
+            self.links.append(attrs['href'])
+
+    def result(self):
+        return self.links
+
+
+class StructuredDataExtractor(Extractor):
+    name = 'structured_data'
+
+    def __init__(self):
+        self.scripts: List[_StringCapture] = []
+        self.current: Optional[_StringCapture] = None
+
+    def start(self, tag, attrs):
+        if self.current is not None:
+            self.current.start(tag)
+        elif tag == 'script' and attrs.get('type') == 'application/ld+json':
+            self.current = _StringCapture()
+            self.scripts.append(self.current)
+
+    def end(self, tag):
+        if self.current is not None:
+            self.current.end()
+            if self.current.done:
+                self.current = None
+
+    def string(self, data, kind):
+        if self.current is not None:
+            self.current.string(data)
+
+    def result(self):
+        data = []
+        for script in self.scripts:
+            try:
+                data.append(json.loads(script.value()))
+            except Exception:
+                continue
+        return data
+
+
+class OpenGraphTwitterExtractor(Extractor):
+    name = 'open_graph_twitter'
+
+    def __init__(self):
+        self.og: Dict[str, str] = {}
+        self.twitter: Dict[str, str] = {}
+
+    def start(self, tag, attrs):
+        if tag == 'meta':
+            prop = attrs.get('property')
+            name = attrs.get('name')
+            content = attrs.get('content', '')
+            if prop and prop.startswith('og:'):
+                self.og[prop] = content
+            if name and name.startswith('twitter:'):
+                self.twitter[name] = content
+
+    def result(self):
+        return {'open_graph': self.og, 'twitter': self.twitter}
+
+
+class WordcountKeywordsExtractor(Extractor):
+    name = 'wordcount_keywords'
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.wordcount = 0
+
+    def string(self, data, kind):
+        if kind in DOCUMENT_TEXT:
+            words = _WORD.findall(data.lower())
+            self.wordcount += len(words)
+            self.counts.update(words)
+
+    def result(self):
+        return {'wordcount': self.wordcount, 'keywords': self.counts.most_common(10)}
+
+
+class FaviconAppleExtractor(Extractor):
+    name = 'favicon_apple'
+
+    def __init__(self):
+        self.favicon = ''
+        self.apple_icons: List[str] = []
+
+    def start(self, tag, attrs):
+        if tag == 'link' and 'rel' in attrs:
+            rel = _NON_WHITESPACE.findall(attrs['rel'])
+            if 'icon' in rel:
+                self.favicon = attrs.get('href', '')
+            if 'apple-touch-icon' in rel:
+                self.apple_icons.append(attrs.get('href', ''))
+
+    def result(self):
+        return {'favicon': self.favicon, 'apple_touch_icons': self.apple_icons}
+
+
+class LangCharsetExtractor(Extractor):
+    # Only the lang half: PageSnapshot adds the charset found while decoding.
+    name = 'lang_charset'
+
+    def __init__(self):
+        self.lang: Optional[str] = None
+
+    def start(self, tag, attrs):
+        if tag == 'html' and self.lang is None:
+            self.lang = attrs.get('lang', '')
+
+    def result(self):
+        return {'lang': self.lang or ''}
+
+
+EXTRACTORS = {
+    cls.name: cls
+    for cls in (
+        TitleMetaExtractor,
+        RobotsCanonicalExtractor,
+        HeadingsExtractor,
+        ImagesAltExtractor,
+        LinksExtractor,
+        StructuredDataExtractor,
+        OpenGraphTwitterExtractor,
+        WordcountKeywordsExtractor,
+        FaviconAppleExtractor,
+        LangCharsetExtractor,
+    )
+}
+
+
+# --- Engine -------------------------------------------------------------------
+
+class ExtractionEngine:
+    """Builds the element stack from parse events and fans them out to the extractors.
+
+    Parser backends drive it through :meth:`start`, :meth:`end`, :meth:`data`
+    and :meth:`string`; :class:`SoupHTMLParser` is the ``html.parser``
+    tokenizer that reproduces BeautifulSoup's tree rules on top of it.
+    """
+
+    def __init__(self, checks: Iterable[str]):
+        self.extractors = [EXTRACTORS[name]() for name in checks]
+        self.stack: List[str] = []
+        self.containers: List[int] = []
+        self.preserve: List[int] = []
+        self.buffer: List[str] = []
+
+    def _flush(self, kind=None):
+        if not self.buffer:
+            return
+        data = ''.join(self.buffer)
+        self.buffer = []
+        if not self.preserve and not data.strip(_ASCII_SPACES):
+            data = '\n' if '\n' in data else ' '
+        if kind is None:
+            kind = self.stack[self.containers[-1]] if self.containers else TEXT
+        for extractor in self.extractors:
+            extractor.string(data, kind)
+
+    def _pop(self):
+        index = len(self.stack) - 1
+        if self.containers and self.containers[-1] == index:
+            self.containers.pop()
+        if self.preserve and self.preserve[-1] == index:
+            self.preserve.pop()
+        tag = self.stack.pop()
+        for extractor in self.extractors:
+            extractor.end(tag)
+
+    def start(self, tag: str, attrs: Dict[str, str]) -> None:
+        """Open an element."""
+        self._flush()
+        index = len(self.stack)
+        self.stack.append(tag)
+        if tag in STRING_CONTAINERS:
+            self.containers.append(index)
+        if tag in PRESERVE_WHITESPACE:
+            self.preserve.append(index)
+        for extractor in self.extractors:
+            extractor.start(tag, attrs)
+
+    def end(self, tag: str) -> None:
+        """Close the most recently opened ``tag`` and everything inside it; ignored if none is open."""
+        self._flush()
+        for index in range(len(self.stack) - 1, -1, -1):
+            if self.stack[index] == tag:
+                break
+        else:
+            return
+        while len(self.stack) > index:
+            self._pop()
+
+    def data(self, data: str) -> None:
+        """Text; consecutive calls are merged into one string."""
+        self.buffer.append(data)
+
+    def string(self, data: str, kind: str) -> None:
+        """A complete string of its own kind, such as a comment."""
+        self._flush()
+        self.buffer.append(data)
+        self._flush(kind)
+
+    def close(self) -> None:
+        self._flush()
+        while self.stack:
+            self._pop()
+
+    def results(self) -> Dict[str, Any]:
+        return {extractor.name: extractor.result() for extractor in self.extractors}
+
+
+class SoupHTMLParser(HTMLParser):
+    """``html.parser`` tokenizer feeding an engine with BeautifulSoup's tree rules."""
+
+    def __init__(self, engine: ExtractionEngine):
+        super().__init__(convert_charrefs=False)
+        self.engine = engine
+        self.already_closed: List[str] = []
+
+    def _start(self, tag, attrs):
+        attr_dict = {}
+        for key, value in attrs:
+            attr_dict[key] = '' if value is None else value
+        self.engine.start(tag, attr_dict)
+
+    def handle_starttag(self, tag, attrs):
+        self._start(tag, attrs)
+        if tag in VOID_ELEMENTS:
+            self.engine.end(tag)
+            self.already_closed.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self._start(tag, attrs)
+        self.engine.end(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self.already_closed:
+            self.already_closed.remove(tag)
+        else:
+            self.engine.end(tag)
+
+    def handle_data(self, data):
+        self.engine.data(data)
+
+    def handle_charref(self, name):
+        self.engine.data(_numeric_reference(name))
+
+    def handle_entityref(self, name):
+        character = EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name)
+        self.engine.data(character if character is not None else '&' + name)
+
+    def handle_comment(self, data):
+        self.engine.string(data, COMMENT)
+
+    def handle_decl(self, decl):
+        self.engine.string(decl[len('DOCTYPE '):], OTHER)
+
+    def unknown_decl(self, data):
+        if data.upper().startswith('CDATA['):
+            self.engine.string(data[len('CDATA['):], CDATA)
+        else:
+            self.engine.string(data, OTHER)
+
+    def handle_pi(self, data):
+        self.engine.string(data, OTHER)
+
+    def close(self):
+        super().close()
+        self.engine.close()
+
+
+def extract(markup: str, checks: Iterable[str]) -> Dict[str, Any]:
+    """Run every check in ``checks`` over ``markup`` in a single ``html.parser`` pass."""
+    engine = ExtractionEngine(checks)
+    parser = SoupHTMLParser(engine)
+    parser.feed(markup)
+    parser.close()
+    return engine.results()
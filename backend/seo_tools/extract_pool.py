@@ -0,0 +1,174 @@
+"""Optional process pool for the parse/extract stage.
+
+Parsing and extraction are pure Python and CPU-bound, so within one process
+they are serialised by the GIL however many requests are in flight. With
+``EXTRACT_WORKERS`` set, :meth:`PageSnapshot.extract
+<backend.seo_tools.page.PageSnapshot.extract>` hands the page to a pool of
+worker processes instead. Only the fetched bytes and the detected charset go
+to a worker, and only the compact results of the single-pass engine come
+back. The worker decodes the bytes itself, and the parse tree never leaves
+it.
+
+Bodies of ``EXTRACT_SHM_BYTES`` or more (default 1 MiB) go through a shared
+memory block rather than the pool's pipe. They are copied once, and the
+worker decodes them straight from the mapping. Bodies under
+``EXTRACT_POOL_MIN_BYTES`` (default 16 KiB) are cheaper to parse than to ship
+and stay in the calling process.
+
+Workers are started with the pool and warmed up before the first page
+arrives: the forkserver preloads the extraction modules, and each worker
+runs every installed parser backend once. The ``soup`` engine
+(``ANALYZER_ENGINE=soup``) always runs in-process, since its tree cannot
+cross processes.
+
+Configuration comes from the environment:
+
+- ``EXTRACT_WORKERS`` – worker processes; 0 (the default) disables the pool
+- ``EXTRACT_POOL_MIN_BYTES`` – smallest body sent to a worker (default 16384)
+- ``EXTRACT_SHM_BYTES`` – smallest body sent through shared memory (default 1048576)
+"""
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .charset import Charset
+from .extract import EXTRACTORS
+from .parsers import PARSERS, get_parser
+
+WORKERS = int(os.environ.get("EXTRACT_WORKERS", "0"))
+MIN_BYTES = int(os.environ.get("EXTRACT_POOL_MIN_BYTES", str(16 * 1024)))
+SHM_BYTES = int(os.environ.get("EXTRACT_SHM_BYTES", str(1024 * 1024)))
+
+# Imported once by the forkserver, so every worker starts with them loaded.
+_PRELOAD = ["backend.seo_tools.extract", "backend.seo_tools.parsers", "backend.seo_tools.extract_pool"]
+_WARMUP_HTML = '<html lang="en"><head><title>t</title><meta name="description" content="d"></head><body><h1>h</h1><p>warm up</p></body></html>'
+
+# A body as shipped to a worker: the bytes, or (shared memory name, size).
+Body = Union[bytes, Tuple[str, int]]
+
+
+def _warm() -> None:
+    # Runs in each new worker: import the optional backends and fill the
+    # regex and codec caches before real pages arrive.
+    for backend in PARSERS.values():
+        if backend.available():
+            backend.extract(_WARMUP_HTML, list(EXTRACTORS))
+
+
+def _ready() -> int:
+    return os.getpid()
+
+
+def _extract(body: Body, charset: Charset, parser: str, checks: List[str]) -> Dict[str, Any]:
+    """Worker side: decode ``body`` and run the single-pass engine on it."""
+    if isinstance(body, bytes):
+        text = charset.decode(body)
+    else:
+        name, size = body
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            with shm.buf[:size] as view:
+                text = charset.decode(view)
+        finally:
+            shm.close()
+    return get_parser(parser).extract(text, checks)
+
+
+def _context():
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    # Not "fork": the server runs threads, and forking them is unsafe.
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(_PRELOAD)
+    return context
+
+
+class ExtractPool:
+    """Warm worker processes that run the extraction engine on fetched pages."""
+
+    def __init__(self, workers: Optional[int] = None, min_bytes: Optional[int] = None, shm_bytes: Optional[int] = None):
+        self.workers = WORKERS if workers is None else workers
+        self.min_bytes = MIN_BYTES if min_bytes is None else min_bytes
+        self.shm_bytes = SHM_BYTES if shm_bytes is None else shm_bytes
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.counters = {"pages": 0, "in_process": 0, "shared_memory": 0, "bytes_shipped": 0, "restarts": 0}
+        self._start()
+
+    def _start(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=_context(), initializer=_warm)
+                # Start every worker now rather than on the first pages.
+                for future in [self._executor.submit(_ready) for _ in range(self.workers)]:
+                    future.result()
+            return self._executor
+
+    def _ship(self, content: bytes) -> Tuple[Body, Optional[shared_memory.SharedMemory]]:
+        if len(content) < self.shm_bytes:
+            return content, None
+        shm = shared_memory.SharedMemory(create=True, size=len(content))
+        shm.buf[: len(content)] = content
+        return (shm.name, len(content)), shm
+
+    def extract(self, page, checks: List[str]) -> Dict[str, Any]:
+        """Results of the single-pass engine for ``checks`` on ``page``."""
+        if len(page.content) < self.min_bytes:
+            with self._lock:
+                self.counters["in_process"] += 1
+            return page.parser.extract(page.text, checks)
+        body, shm = self._ship(page.content)
+        try:
+            executor = self._start()
+            try:
+                results = executor.submit(_extract, body, page.charset, page.parser.name, checks).result()
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory): this page is parsed
+                # here, and a fresh pool is started for the next one.
+                logging.exception(f"Extraction worker pool broke on {page.url}")
+                with self._lock:
+                    self.counters["restarts"] += 1
+                    if self._executor is executor:
+                        self._executor = None
+                executor.shutdown(wait=False)
+                return page.parser.extract(page.text, checks)
+        finally:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        with self._lock:
+            self.counters["pages"] += 1
+            self.counters["shared_memory"] += shm is not None
+            self.counters["bytes_shipped"] += len(page.content)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"enabled": True, "workers": self.workers, **self.counters}
+
+    def close(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+_pool: Optional[ExtractPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_extract_pool() -> Optional[ExtractPool]:
+    """The process-wide extraction pool, or None when ``EXTRACT_WORKERS`` is 0."""
+    global _pool
+    if _pool is None and WORKERS > 0:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ExtractPool()
+                atexit.register(_pool.close)
+    return _pool
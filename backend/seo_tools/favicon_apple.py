@@ -1,9 +1,8 @@
-from bs4 import BeautifulSoup
-import requests
+from .page import fetch_page
 
-def get_favicon_apple(url):
-    resp = requests.get(url)
-    soup = BeautifulSoup(resp.text, 'html.parser')
+def get_favicon_apple(url, page=None):
+    page = page or fetch_page(url)
+    soup = page.soup
     favicon = ''
     apple_icons = []
     for link in soup.find_all('link'):
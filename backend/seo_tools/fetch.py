@@ -0,0 +1,677 @@
+"""Shared HTTP clients for every fetch made by the SEO tools.
+
+A single :class:`FetchClient` keeps connections alive and pooled per host, so
+repeated requests to the same origin (the page, its sitemap and robots.txt,
+or many pages of one site) skip the DNS lookup and TCP/TLS handshakes. It
+caps connections globally and per host, and counts pool usage so the limits
+can be sized under load. :class:`AsyncFetchClient` is the ``httpx``-based
+equivalent for code running on an event loop. Both go through the on-disk
+HTTP cache (:mod:`.http_cache`) unless a call passes ``cache=False`` or its
+own conditional headers.
+
+Configuration comes from the environment:
+
+- ``FETCH_MAX_CONNECTIONS`` – concurrent requests across all hosts (default 100)
+- ``FETCH_MAX_PER_HOST`` – concurrent requests and pooled connections per host (default 10)
+- ``FETCH_HTTP2`` – set to ``1`` to fetch through ``httpx`` with HTTP/2
+  (requires the ``h2`` package, e.g. ``pip install httpx[http2]``)
+- ``FETCH_MAX_BYTES`` – bytes read off the wire per download (default 10 MiB)
+- ``FETCH_MAX_DECODED_BYTES`` – bytes per download after undoing
+  ``Content-Encoding`` or gzip (default 50 MiB)
+
+Bodies are read through :class:`ByteBudget`, which enforces the two caps
+chunk by chunk. A download that hits a cap stops there and is reported as
+truncated; a huge or gzip-bomb response never has to fit in memory.
+
+Every request also gets connect and read timeouts, the deadline of the
+analysis it serves, retries with backoff and a per-host circuit breaker (see
+:mod:`.resilience`). A body still downloading when the deadline passes is
+cut short and reported as truncated by ``"deadline"``.
+"""
+import asyncio
+import itertools
+import os
+import sys
+import threading
+import time
+import weakref
+from contextlib import AsyncExitStack, ExitStack, asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .charset import response_charset
+from .http_cache import HttpCache, _is_conditional, get_http_cache
+from .resilience import RETRY_STATUSES, Breakers, DeadlineExceeded, RetryPolicy, check_deadline, expired, timeouts
+
+MAX_CONNECTIONS = int(os.environ.get("FETCH_MAX_CONNECTIONS", "100"))
+MAX_PER_HOST = int(os.environ.get("FETCH_MAX_PER_HOST", "10"))
+HTTP2 = os.environ.get("FETCH_HTTP2", "0") == "1"
+CHUNK_SIZE = 64 * 1024
+MAX_BYTES = int(os.environ.get("FETCH_MAX_BYTES", str(10 * 1024 * 1024)))
+MAX_DECODED_BYTES = int(os.environ.get("FETCH_MAX_DECODED_BYTES", str(50 * 1024 * 1024)))
+
+
+def _host(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+class _HostStats:
+    __slots__ = ("requests", "errors", "in_flight", "peak_in_flight")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+
+class _HostSlot:
+    """A host's semaphore (or lock) and the requests holding or waiting for it.
+
+    Its owner drops a host's slot once its last user leaves, so the map
+    holds only hosts with requests in flight rather than every host seen.
+    """
+
+    __slots__ = ("semaphore", "users")
+
+    def __init__(self, semaphore):
+        self.semaphore = semaphore
+        self.users = 0
+
+
+class _PoolUsage:
+    """Thread-safe request counters, overall and per host."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hosts: Dict[str, _HostStats] = {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.wait_seconds = 0.0
+        self.retries = 0
+
+    def acquired(self, host: str, waited: float) -> None:
+        with self.lock:
+            stats = self.hosts.get(host)
+            if stats is None:
+                stats = self.hosts[host] = _HostStats()
+            self.wait_seconds += waited
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            stats.requests += 1
+            stats.in_flight += 1
+            stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+
+    def released(self, host: str, failed: bool) -> None:
+        with self.lock:
+            stats = self.hosts[host]
+            self.in_flight -= 1
+            stats.in_flight -= 1
+            if failed:
+                stats.errors += 1
+
+    def retried(self) -> None:
+        with self.lock:
+            self.retries += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            hosts = {
+                host: {
+                    "requests": s.requests,
+                    "errors": s.errors,
+                    "in_flight": s.in_flight,
+                    "peak_in_flight": s.peak_in_flight,
+                }
+                for host, s in self.hosts.items()
+            }
+            return {
+                "requests": sum(h["requests"] for h in hosts.values()),
+                "errors": sum(h["errors"] for h in hosts.values()),
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "wait_seconds": round(self.wait_seconds, 6),
+                "retries": self.retries,
+                "hosts": hosts,
+            }
+
+
+def _resolve_cache(cache: Union[HttpCache, bool, None]) -> Optional[HttpCache]:
+    if cache is True:
+        return get_http_cache()
+    return cache or None
+
+
+def _with_headers(kwargs: Dict[str, Any], extra: Dict[str, str]) -> Dict[str, Any]:
+    if not extra:
+        return kwargs
+    return {**kwargs, "headers": {**(kwargs.get("headers") or {}), **extra}}
+
+
+def _httpx_limits(max_connections: int):
+    import httpx
+
+    return httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+
+
+def _with_timeout(kwargs: Dict[str, Any], httpx_style: bool) -> Dict[str, Any]:
+    if "timeout" in kwargs:
+        check_deadline()
+        return kwargs
+    connect, read = timeouts()
+    if httpx_style:
+        import httpx
+
+        return {**kwargs, "timeout": httpx.Timeout(read, connect=connect)}
+    return {**kwargs, "timeout": (connect, read)}
+
+
+def _transient(error: BaseException) -> bool:
+    """Whether ``error`` is a network failure that another attempt might not hit."""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, (requests.RequestException, DeadlineExceeded)):
+        return False
+    httpx = sys.modules.get("httpx")
+    if httpx is not None and isinstance(
+        error, (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError, httpx.ProxyError)
+    ):
+        return True
+    return isinstance(error, OSError)
+
+
+def _timed_out(error: BaseException) -> bool:
+    httpx = sys.modules.get("httpx")
+    return isinstance(error, (requests.Timeout, TimeoutError)) or (
+        httpx is not None and isinstance(error, httpx.TimeoutException)
+    )
+
+
+_breakers = Breakers()
+
+
+def _settle(client, host: str, attempt: int, resp, error: Optional[BaseException]) -> Optional[float]:
+    """Report one attempt to the host's breaker; seconds to wait before retrying, or None."""
+    if error is not None and _timed_out(error) and expired():
+        raise DeadlineExceeded("deadline exceeded") from error
+    status = getattr(resp, "status_code", None)
+    transient = error is not None and _transient(error)
+    if error is None or transient:
+        # A malformed URL or similar says nothing about the host's health.
+        client.breakers.record(host, transient or status >= 500)
+    if not transient and status not in RETRY_STATUSES:
+        return None
+    delay = client.retry.delay(attempt)
+    if delay is not None:
+        client.usage.retried()
+    return delay
+
+
+def wire_bytes(resp, decoded: int) -> int:
+    """Bytes of ``resp`` taken off the socket so far, before any Content-Encoding is undone."""
+    downloaded = getattr(resp, "num_bytes_downloaded", None)
+    if isinstance(downloaded, int):
+        return downloaded
+    raw = getattr(resp, "raw", None)
+    try:
+        return int(raw.tell())
+    except (AttributeError, TypeError, ValueError):
+        return decoded
+
+
+class ByteBudget:
+    """Raw and decoded byte caps for one streamed body, applied chunk by chunk.
+
+    :meth:`take` returns the part of a chunk that fits. Once a cap is hit,
+    ``truncated`` names it (``"max_bytes"``, ``"max_decoded_bytes"``, or
+    ``"deadline"`` when the current deadline passed) and the caller stops
+    reading.
+    """
+
+    def __init__(self, resp, max_bytes: Optional[int] = None, max_decoded_bytes: Optional[int] = None):
+        self.resp = resp
+        self.max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+        self.max_decoded_bytes = MAX_DECODED_BYTES if max_decoded_bytes is None else max_decoded_bytes
+        self.decoded_bytes = 0
+        self.truncated: Optional[str] = None
+        # Without a Content-Encoding the wire bytes are the body bytes, so the
+        # raw cap can cut a chunk exactly.
+        self._identity = (resp.headers.get("Content-Encoding") or "identity").lower() == "identity"
+
+    @property
+    def raw_bytes(self) -> int:
+        return wire_bytes(self.resp, self.decoded_bytes)
+
+    def take(self, chunk: bytes) -> bytes:
+        if self.truncated:
+            return b""
+        room = self.max_decoded_bytes - self.decoded_bytes
+        if len(chunk) > room:
+            chunk, self.truncated = chunk[:max(room, 0)], "max_decoded_bytes"
+        if self._identity:
+            room = self.max_bytes - self.decoded_bytes
+            if len(chunk) > room:
+                chunk, self.truncated = chunk[:max(room, 0)], "max_bytes"
+        self.decoded_bytes += len(chunk)
+        if not self.truncated and not self._identity and self.raw_bytes > self.max_bytes:
+            self.truncated = "max_bytes"
+        if not self.truncated and expired():
+            self.truncated = "deadline"
+        return chunk
+
+    def stats(self) -> Dict[str, Any]:
+        return {"bytes_read": self.raw_bytes, "decoded_bytes": self.decoded_bytes, "truncated": self.truncated}
+
+
+def iter_bounded(chunks, budget: ByteBudget) -> Iterator[bytes]:
+    """``chunks`` cut off at the caps of ``budget``; closes ``chunks`` when done."""
+    try:
+        for chunk in chunks:
+            chunk = budget.take(chunk)
+            if chunk:
+                yield chunk
+            if budget.truncated:
+                return
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+async def aiter_bounded(chunks, budget: ByteBudget) -> AsyncIterator[bytes]:
+    """Async :func:`iter_bounded`."""
+    try:
+        async for chunk in chunks:
+            chunk = budget.take(chunk)
+            if chunk:
+                yield chunk
+            if budget.truncated:
+                return
+    finally:
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+def read_body(resp, chunks, max_bytes: Optional[int] = None, max_decoded_bytes: Optional[int] = None) -> Tuple[bytes, ByteBudget]:
+    """Read a streamed body up to the caps; returns the bytes and the budget that reports truncation."""
+    budget = ByteBudget(resp, max_bytes, max_decoded_bytes)
+    return b"".join(iter_bounded(chunks, budget)), budget
+
+
+async def aread_body(
+    resp, chunks, max_bytes: Optional[int] = None, max_decoded_bytes: Optional[int] = None
+) -> Tuple[bytes, ByteBudget]:
+    budget = ByteBudget(resp, max_bytes, max_decoded_bytes)
+    return b"".join([chunk async for chunk in aiter_bounded(chunks, budget)]), budget
+
+
+def decode_body(resp, content: bytes) -> str:
+    """``content`` decoded with the charset found by :func:`.charset.response_charset`."""
+    return response_charset(resp, content).decode(content)
+
+
+class FetchClient:
+    """Pooled keep-alive HTTP client with global and per-host connection caps."""
+
+    def __init__(
+        self,
+        max_connections: int = MAX_CONNECTIONS,
+        max_per_host: int = MAX_PER_HOST,
+        http2: bool = HTTP2,
+        cache: Union[HttpCache, bool, None] = True,
+        retry: Optional[RetryPolicy] = None,
+        breakers: Optional[Breakers] = None,
+    ):
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.http2 = http2
+        self.cache = _resolve_cache(cache)
+        self.retry = retry or RetryPolicy()
+        # Shared by default, so a failing host fails fast for every client.
+        self.breakers = breakers or _breakers
+        self.usage = _PoolUsage()
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._host_slots: Dict[str, _HostSlot] = {}
+        self._lock = threading.Lock()
+        if http2:
+            import httpx
+
+            self._httpx = httpx.Client(
+                http2=True, follow_redirects=True, timeout=None, limits=_httpx_limits(max_connections)
+            )
+            self._session = None
+        else:
+            self._httpx = None
+            self._session = requests.Session()
+            # One pool per host, each holding up to max_per_host keep-alive
+            # connections; the per-host semaphore keeps us within that.
+            self._adapter = HTTPAdapter(pool_connections=max_connections, pool_maxsize=max_per_host)
+            self._session.mount("http://", self._adapter)
+            self._session.mount("https://", self._adapter)
+
+    @contextmanager
+    def _slot(self, host: str):
+        with self._lock:
+            host_slot = self._host_slots.get(host)
+            if host_slot is None:
+                host_slot = self._host_slots[host] = _HostSlot(threading.BoundedSemaphore(self.max_per_host))
+            host_slot.users += 1
+        try:
+            waited = time.perf_counter()
+            with host_slot.semaphore, self._slots:
+                self.usage.acquired(host, time.perf_counter() - waited)
+                failed = True
+                try:
+                    yield
+                    failed = False
+                finally:
+                    self.usage.released(host, failed)
+        finally:
+            with self._lock:
+                host_slot.users -= 1
+                if not host_slot.users:
+                    del self._host_slots[host]
+
+    def _request_headers(self, kwargs: Dict[str, Any]) -> Dict[str, str]:
+        defaults = self._httpx.headers if self._httpx is not None else self._session.headers
+        return {**defaults, **(kwargs.get("headers") or {})}
+
+    def _cached(self, cache: bool, kwargs: Dict[str, Any]) -> bool:
+        return cache and self.cache is not None and not _is_conditional(kwargs.get("headers"))
+
+    def get(self, url: str, cache: bool = True, **kwargs: Any):
+        """GET ``url`` over a pooled connection, through the HTTP cache.
+
+        Returns a ``requests.Response``, an ``httpx.Response`` with HTTP/2
+        enabled, or a cached response; all expose ``url``, ``status_code``,
+        ``headers``, ``content`` and ``text``.
+        """
+        if not self._cached(cache, kwargs):
+            return self._get(url, **kwargs)
+        return self.cache.fetch(
+            url, self._request_headers(kwargs), lambda extra: self._get(url, **_with_headers(kwargs, extra))
+        )
+
+    def _get(self, url: str, **kwargs: Any):
+        host = _host(url)
+        for attempt in itertools.count(1):
+            timed = _with_timeout(kwargs, self._httpx is not None)
+            self.breakers.check(host)
+            resp = error = None
+            try:
+                with self._slot(host):
+                    if self._httpx is not None:
+                        resp = self._httpx.get(url, **timed)
+                    else:
+                        resp = self._session.get(url, **timed)
+            except Exception as e:
+                error = e
+            delay = _settle(self, host, attempt, resp, error)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return resp
+            if resp is not None:
+                resp.close()
+            time.sleep(delay)
+
+    @contextmanager
+    def stream(self, url: str, chunk_size: int = CHUNK_SIZE, cache: bool = True, **kwargs: Any):
+        """GET ``url`` without reading the body; yields ``(response, chunks)``.
+
+        ``chunks`` iterates over the decoded body in pieces of about
+        ``chunk_size`` bytes. The connection is held until the block exits.
+        """
+        if not self._cached(cache, kwargs):
+            with self._stream(url, chunk_size, **kwargs) as streamed:
+                yield streamed
+            return
+        opener = lambda extra: self._stream(url, chunk_size, **_with_headers(kwargs, extra))  # noqa: E731
+        with self.cache.stream(url, self._request_headers(kwargs), opener, chunk_size) as streamed:
+            yield streamed
+
+    @contextmanager
+    def _stream(self, url: str, chunk_size: int, **kwargs: Any):
+        # Only opening the response is retried; a body once handed out is not.
+        host = _host(url)
+        for attempt in itertools.count(1):
+            timed = _with_timeout(kwargs, self._httpx is not None)
+            self.breakers.check(host)
+            stack = ExitStack()
+            resp = error = None
+            try:
+                stack.enter_context(self._slot(host))
+                resp, chunks = stack.enter_context(self._open(url, chunk_size, **timed))
+            except Exception as e:
+                error = e
+                stack.__exit__(type(e), e, e.__traceback__)
+            delay = _settle(self, host, attempt, resp, error)
+            if delay is None:
+                if error is not None:
+                    raise error
+                with stack:
+                    yield resp, chunks
+                return
+            stack.close()
+            time.sleep(delay)
+
+    @contextmanager
+    def _open(self, url: str, chunk_size: int, **kwargs: Any):
+        if self._httpx is not None:
+            with self._httpx.stream("GET", url, **kwargs) as resp:
+                yield resp, resp.iter_bytes(chunk_size)
+            return
+        resp = self._session.get(url, stream=True, **kwargs)
+        try:
+            yield resp, resp.iter_content(chunk_size)
+        finally:
+            resp.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool usage counters, overall and per host."""
+        out = {
+            "transport": "httpx" if self._httpx is not None else "requests",
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "max_per_host": self.max_per_host,
+            **self.usage.snapshot(),
+            "breakers": self.breakers.snapshot(),
+            "connections_opened": None,
+        }
+        if self._session is not None:
+            pools = self._adapter.poolmanager.pools
+            opened = 0
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    opened += pool.num_connections
+            out["connections_opened"] = opened
+        return out
+
+    def close(self) -> None:
+        if self._httpx is not None:
+            self._httpx.close()
+        else:
+            self._session.close()
+
+
+class AsyncFetchClient:
+    """``httpx.AsyncClient`` with the same pooling, caps and counters as :class:`FetchClient`.
+
+    An instance belongs to the event loop it was first used on.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = MAX_CONNECTIONS,
+        max_per_host: int = MAX_PER_HOST,
+        http2: bool = HTTP2,
+        cache: Union[HttpCache, bool, None] = True,
+        retry: Optional[RetryPolicy] = None,
+        breakers: Optional[Breakers] = None,
+    ):
+        import httpx
+
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.http2 = http2
+        self.cache = _resolve_cache(cache)
+        self.retry = retry or RetryPolicy()
+        self.breakers = breakers or _breakers
+        self.usage = _PoolUsage()
+        self._slots = asyncio.Semaphore(max_connections)
+        self._host_slots: Dict[str, _HostSlot] = {}
+        self._closer: Optional[asyncio.Task] = None
+        self._client = httpx.AsyncClient(
+            http2=http2, follow_redirects=True, timeout=None, limits=_httpx_limits(max_connections)
+        )
+
+    @asynccontextmanager
+    async def _slot(self, host: str):
+        host_slot = self._host_slots.get(host)
+        if host_slot is None:
+            host_slot = self._host_slots[host] = _HostSlot(asyncio.Semaphore(self.max_per_host))
+        host_slot.users += 1
+        try:
+            waited = time.perf_counter()
+            async with host_slot.semaphore, self._slots:
+                self.usage.acquired(host, time.perf_counter() - waited)
+                failed = True
+                try:
+                    yield
+                    failed = False
+                finally:
+                    self.usage.released(host, failed)
+        finally:
+            host_slot.users -= 1
+            if not host_slot.users:
+                del self._host_slots[host]
+
+    def _request_headers(self, kwargs: Dict[str, Any]) -> Dict[str, str]:
+        return {**self._client.headers, **(kwargs.get("headers") or {})}
+
+    def _cached(self, cache: bool, kwargs: Dict[str, Any]) -> bool:
+        return cache and self.cache is not None and not _is_conditional(kwargs.get("headers"))
+
+    async def get(self, url: str, cache: bool = True, **kwargs: Any):
+        """GET ``url`` over a pooled connection, through the HTTP cache."""
+        if not self._cached(cache, kwargs):
+            return await self._get(url, **kwargs)
+        return await self.cache.afetch(
+            url, self._request_headers(kwargs), lambda extra: self._get(url, **_with_headers(kwargs, extra))
+        )
+
+    async def _get(self, url: str, **kwargs: Any):
+        host = _host(url)
+        for attempt in itertools.count(1):
+            timed = _with_timeout(kwargs, True)
+            self.breakers.check(host)
+            resp = error = None
+            try:
+                async with self._slot(host):
+                    resp = await self._client.get(url, **timed)
+            except Exception as e:
+                error = e
+            delay = _settle(self, host, attempt, resp, error)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return resp
+            if resp is not None:
+                await resp.aclose()
+            await asyncio.sleep(delay)
+
+    @asynccontextmanager
+    async def stream(self, url: str, chunk_size: int = CHUNK_SIZE, cache: bool = True, **kwargs: Any):
+        """Async :meth:`FetchClient.stream`; ``chunks`` is an async iterator."""
+        if not self._cached(cache, kwargs):
+            async with self._stream(url, chunk_size, **kwargs) as streamed:
+                yield streamed
+            return
+        opener = lambda extra: self._stream(url, chunk_size, **_with_headers(kwargs, extra))  # noqa: E731
+        async with self.cache.astream(url, self._request_headers(kwargs), opener, chunk_size) as streamed:
+            yield streamed
+
+    @asynccontextmanager
+    async def _stream(self, url: str, chunk_size: int, **kwargs: Any):
+        host = _host(url)
+        for attempt in itertools.count(1):
+            timed = _with_timeout(kwargs, True)
+            self.breakers.check(host)
+            stack = AsyncExitStack()
+            resp = error = None
+            try:
+                await stack.enter_async_context(self._slot(host))
+                resp, chunks = await stack.enter_async_context(self._open(url, chunk_size, **timed))
+            except Exception as e:
+                error = e
+                await stack.__aexit__(type(e), e, e.__traceback__)
+            delay = _settle(self, host, attempt, resp, error)
+            if delay is None:
+                if error is not None:
+                    raise error
+                async with stack:
+                    yield resp, chunks
+                return
+            await stack.aclose()
+            await asyncio.sleep(delay)
+
+    @asynccontextmanager
+    async def _open(self, url: str, chunk_size: int, **kwargs: Any):
+        async with self._client.stream("GET", url, **kwargs) as resp:
+            yield resp, resp.aiter_bytes(chunk_size)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "transport": "httpx",
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "max_per_host": self.max_per_host,
+            **self.usage.snapshot(),
+            "breakers": self.breakers.snapshot(),
+        }
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+_client: Optional[FetchClient] = None
+_client_lock = threading.Lock()
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncFetchClient]" = weakref.WeakKeyDictionary()
+
+
+def get_client() -> FetchClient:
+    """The process-wide shared client, created on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = FetchClient()
+    return _client
+
+
+async def _close_with_loop(client: AsyncFetchClient) -> None:
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await client.aclose()
+
+
+def get_async_client() -> AsyncFetchClient:
+    """The shared async client of the running event loop, created on first use.
+
+    The client is closed when the loop shuts down: ``asyncio.run`` cancels
+    the task left waiting on it before closing the loop, so short-lived loops
+    do not leak their connections.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncFetchClient()
+        # The client holds the task, as the loop keeps only a weak reference.
+        client._closer = loop.create_task(_close_with_loop(client))
+    return client
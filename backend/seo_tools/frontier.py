@@ -0,0 +1,129 @@
+"""URL frontier for site crawls.
+
+:class:`Frontier` hands out URLs breadth-first, never the same URL twice, and
+keeps only a bounded number of pending URLs in memory; the rest are spilled
+to a temporary file and read back in order. URLs already queued are
+remembered in a :class:`BloomFilter`, so the seen set stays a fixed size
+however large the site is, at the price of skipping a small fraction
+(``error_rate``) of never-seen URLs.
+"""
+import hashlib
+import math
+import tempfile
+from collections import deque
+from typing import Deque, Optional, Tuple
+from urllib.parse import urldefrag, urljoin, urlsplit, urlunsplit
+
+
+class BloomFilter:
+    """Fixed-size probabilistic set of strings."""
+
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        # Double hashing: k positions from two 64-bit halves of one digest.
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str) -> bool:
+        """Add ``item``; return False if it was (probably) present already."""
+        added = False
+        for pos in self._positions(item):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def __contains__(self, item: str) -> bool:
+        for pos in self._positions(item):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                return False
+        return True
+
+
+class Frontier:
+    """FIFO of ``(url, depth)`` pairs with dedupe and on-disk spill."""
+
+    def __init__(self, max_in_memory: int = 10_000, capacity: int = 100_000, error_rate: float = 0.001):
+        self.max_in_memory = max_in_memory
+        self.seen = BloomFilter(capacity, error_rate)
+        self._memory: Deque[Tuple[str, int]] = deque()
+        self._spill = None
+        self._spill_read = 0
+        self._spill_pending = 0
+        self.spilled = 0
+
+    def __len__(self) -> int:
+        return len(self._memory) + self._spill_pending
+
+    def push(self, url: str, depth: int) -> bool:
+        """Queue ``url`` unless it was queued before; return whether it was queued."""
+        if not self.seen.add(url):
+            return False
+        if self._spill_pending or len(self._memory) >= self.max_in_memory:
+            self._write_spill(url, depth)
+        else:
+            self._memory.append((url, depth))
+        return True
+
+    def pop(self) -> Optional[Tuple[str, int]]:
+        if not self._memory and self._spill_pending:
+            self._read_spill()
+        if not self._memory:
+            return None
+        return self._memory.popleft()
+
+    def _write_spill(self, url: str, depth: int) -> None:
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile()
+        self._spill.seek(0, 2)
+        self._spill.write(f"{depth}\t{url}\n".encode("utf-8"))
+        self._spill_pending += 1
+        self.spilled += 1
+
+    def _read_spill(self) -> None:
+        self._spill.seek(self._spill_read)
+        while self._spill_pending and len(self._memory) < self.max_in_memory:
+            line = self._spill.readline()
+            self._spill_pending -= 1
+            depth, url = line.decode("utf-8").rstrip("\n").split("\t", 1)
+            self._memory.append((url, int(depth)))
+        self._spill_read = self._spill.tell()
+        if not self._spill_pending:
+            self._spill.seek(0)
+            self._spill.truncate()
+            self._spill_read = 0
+
+    def close(self) -> None:
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+
+def normalize_url(href: str, base: str) -> Optional[str]:
+    """Absolute http(s) form of ``href`` without fragment, or None if not crawlable."""
+    try:
+        url, _ = urldefrag(urljoin(base, href.strip()))
+        parts = urlsplit(url)
+    except ValueError:
+        return None
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        return None
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path or "/", parts.query, ""))
+
+
+def same_site(url: str, seed: str) -> bool:
+    return urlsplit(url).netloc.lower() == urlsplit(seed).netloc.lower()
@@ -1,9 +1,8 @@
-from bs4 import BeautifulSoup
-import requests
+from .page import fetch_page
 
-def get_headings(url):
-    resp = requests.get(url)
-    soup = BeautifulSoup(resp.text, 'html.parser')
+def get_headings(url, page=None):
+    page = page or fetch_page(url)
+    soup = page.soup
     headings = {}
     for level in range(1, 7):
         tag = f'h{level}'
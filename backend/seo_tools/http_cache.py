@@ -0,0 +1,552 @@
+"""Content-addressed on-disk HTTP cache under every fetch of the SEO tools.
+
+Responses are indexed in SQLite by URL plus the values of the request
+headers they ``Vary`` on. Bodies are stored once per SHA-256 under
+``bodies/``, so identical pages shared by several URLs or variants take disk
+space once. A fresh entry (``Cache-Control: max-age`` or ``Expires``) is
+served without touching the network. A stale one is revalidated with
+``If-None-Match`` / ``If-Modified-Since``, and a ``304`` serves the stored
+body. ``no-store`` responses, ``Vary: *`` and responses that can neither be
+kept fresh nor revalidated are never stored. A redirected response is
+stored under the requested URL, and hits report the URL it ended up at. When
+the bodies outgrow ``HTTP_CACHE_MAX_BYTES`` the least recently used entries
+are evicted. Entry, body and byte totals are kept in the index, updated by
+every store, so the budget holds across every process sharing the directory
+and neither stores nor stats rescan the tables.
+
+Configuration comes from the environment:
+
+- ``HTTP_CACHE`` – set to ``0`` to disable the cache (default on)
+- ``HTTP_CACHE_DIR`` – cache directory (default ``http_cache``)
+- ``HTTP_CACHE_MAX_BYTES`` – body storage budget (default 512 MiB)
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Mapping, NamedTuple, Optional
+
+from requests.structures import CaseInsensitiveDict
+
+from .charset import detect_charset, from_content_type
+
+HTTP_CACHE = os.environ.get("HTTP_CACHE", "1") == "1"
+HTTP_CACHE_DIR = os.environ.get("HTTP_CACHE_DIR", "http_cache")
+HTTP_CACHE_MAX_BYTES = int(os.environ.get("HTTP_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Hop-by-hop and encoding headers describe the original transfer, not the
+# decoded body we store.
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+_CHUNK_SIZE = 64 * 1024
+
+
+def parse_cache_control(value: str) -> Dict[str, Optional[str]]:
+    directives = {}
+    for part in (value or "").split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') if arg else None
+    return directives
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def freshness_lifetime(headers: Mapping[str, str]) -> float:
+    """Seconds a response stays fresh, from ``Cache-Control`` or ``Expires``."""
+    directives = parse_cache_control(headers.get("Cache-Control", ""))
+    if "no-cache" in directives:
+        return 0.0
+    if "max-age" in directives:
+        try:
+            return max(0.0, float(directives["max-age"]))
+        except (TypeError, ValueError):
+            return 0.0
+    expires = _http_date(headers.get("Expires"))
+    if expires is None:
+        return 0.0
+    date = _http_date(headers.get("Date")) or time.time()
+    return max(0.0, expires - date)
+
+
+def is_cacheable(status_code: int, headers: Mapping[str, str]) -> bool:
+    if status_code != 200:
+        return False
+    if "no-store" in parse_cache_control(headers.get("Cache-Control", "")):
+        return False
+    if headers.get("Vary", "").strip() == "*":
+        return False
+    has_validator = bool(headers.get("ETag") or headers.get("Last-Modified"))
+    return has_validator or freshness_lifetime(headers) > 0
+
+
+def _vary_names(headers: Mapping[str, str]) -> list:
+    names = {name.strip().lower() for name in headers.get("Vary", "").split(",") if name.strip()}
+    return sorted(names)
+
+
+def _is_conditional(headers: Optional[Mapping[str, str]]) -> bool:
+    if not headers:
+        return False
+    names = {name.lower() for name in headers}
+    return bool(names & {"if-none-match", "if-modified-since", "range"})
+
+
+class CacheEntry(NamedTuple):
+    key: str
+    url: str
+    status_code: int
+    headers: Dict[str, str]
+    encoding: Optional[str]
+    body: str
+    size: int
+    expires_at: float
+    # Where the request ended up after redirects, served as ``.url``.
+    final_url: Optional[str] = None
+
+
+class CachedResponse:
+    """A response served from the cache; quacks like ``requests``/``httpx`` responses."""
+
+    def __init__(self, entry: CacheEntry, content: bytes, cache_status: str):
+        self.url = entry.final_url or entry.url
+        self.status_code = entry.status_code
+        self.headers = CaseInsensitiveDict(entry.headers)
+        self.encoding = entry.encoding
+        self.content = content
+        self.cache_status = cache_status
+
+    @property
+    def text(self) -> str:
+        if self.encoding:
+            return self.content.decode(self.encoding, errors="replace")
+        return detect_charset(self.content, self.headers.get("Content-Type")).decode(self.content)
+
+    def close(self) -> None:
+        pass
+
+
+def _response_encoding(resp) -> Optional[str]:
+    # Only the declared charset is kept; without one, ``.text`` detects it
+    # from a sample of the body instead of guessing over the whole of it.
+    return from_content_type(resp.headers.get("Content-Type"))
+
+
+class HttpCache:
+    def __init__(self, directory: str = HTTP_CACHE_DIR, max_bytes: int = HTTP_CACHE_MAX_BYTES):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.counters = {"hits": 0, "misses": 0, "revalidated": 0, "stores": 0, "evictions": 0}
+
+    # --- storage -------------------------------------------------------------
+
+    def _db(self, create: bool) -> Optional[sqlite3.Connection]:
+        if self._conn is None:
+            index = os.path.join(self.directory, "index.sqlite")
+            if not create and not os.path.exists(index):
+                return None
+            os.makedirs(os.path.join(self.directory, "bodies"), exist_ok=True)
+            conn = sqlite3.connect(index, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS variants (url TEXT PRIMARY KEY, vary TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    status INTEGER NOT NULL,
+                    headers TEXT NOT NULL,
+                    encoding TEXT,
+                    body TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+                CREATE TABLE IF NOT EXISTS bodies (hash TEXT PRIMARY KEY, size INTEGER NOT NULL, refs INTEGER NOT NULL);
+                CREATE TABLE IF NOT EXISTS totals (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    entries INTEGER NOT NULL,
+                    bodies INTEGER NOT NULL,
+                    bytes INTEGER NOT NULL
+                );
+                """
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(entries)")}
+            if "final_url" not in columns:
+                # Indexes written before redirects were recorded.
+                conn.execute("ALTER TABLE entries ADD COLUMN final_url TEXT")
+            if conn.execute("SELECT 1 FROM totals").fetchone() is None:
+                # Counted once for an index written before the totals were
+                # kept; every store keeps them up to date from then on.
+                conn.execute(
+                    "INSERT OR IGNORE INTO totals VALUES (0, (SELECT COUNT(*) FROM entries), "
+                    "(SELECT COUNT(*) FROM bodies), (SELECT COALESCE(SUM(size), 0) FROM bodies))"
+                )
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _totals(conn: sqlite3.Connection) -> Dict[str, int]:
+        # Shared by every process using the directory, unlike a count in memory.
+        entries, bodies, size = conn.execute("SELECT entries, bodies, bytes FROM totals").fetchone()
+        return {"entries": entries, "bodies": bodies, "bytes": size}
+
+    def _body_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "bodies", digest[:2], digest)
+
+    def _key(self, conn: sqlite3.Connection, url: str, request_headers: Mapping[str, str]) -> str:
+        row = conn.execute("SELECT vary FROM variants WHERE url = ?", (url,)).fetchone()
+        names = json.loads(row[0]) if row else []
+        return self._make_key(url, names, request_headers)
+
+    @staticmethod
+    def _make_key(url: str, names, request_headers: Mapping[str, str]) -> str:
+        headers = CaseInsensitiveDict(request_headers or {})
+        parts = [url] + [f"{name}:{headers.get(name, '')}" for name in names]
+        return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+    def lookup(self, url: str, request_headers: Mapping[str, str]) -> Optional[CacheEntry]:
+        with self._lock:
+            conn = self._db(create=False)
+            if conn is None:
+                return None
+            key = self._key(conn, url, request_headers)
+            row = conn.execute(
+                "SELECT e.url, e.status, e.headers, e.encoding, e.body, b.size, e.expires_at, e.final_url "
+                "FROM entries e JOIN bodies b ON b.hash = e.body WHERE e.key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        return CacheEntry(key, row[0], row[1], json.loads(row[2]), row[3], row[4], row[5], row[6], row[7])
+
+    def read_body(self, entry: CacheEntry) -> bytes:
+        with open(self._body_path(entry.body), "rb") as f:
+            return f.read()
+
+    def iter_body(self, entry: CacheEntry, chunk_size: int = _CHUNK_SIZE):
+        with open(self._body_path(entry.body), "rb") as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+
+    def _put_body(
+        self, conn: sqlite3.Connection, totals: Dict[str, int], digest: str, size: int, source: Optional[str], content: Optional[bytes]
+    ) -> None:
+        """Store a body unless already stored, counting it in ``totals``."""
+        path = self._body_path(digest)
+        if conn.execute("SELECT 1 FROM bodies WHERE hash = ?", (digest,)).fetchone() is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if source is not None:
+                os.replace(source, path)
+            else:
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+                with os.fdopen(fd, "wb") as f:
+                    f.write(content)
+                os.replace(tmp, path)
+            conn.execute("INSERT INTO bodies (hash, size, refs) VALUES (?, ?, 0)", (digest, size))
+            totals["bodies"] += 1
+            totals["bytes"] += size
+            return
+        if source is not None:
+            os.unlink(source)
+
+    def _release_body(self, conn: sqlite3.Connection, totals: Dict[str, int], digest: str) -> None:
+        """Drop one reference to a body, deleting it (and uncounting it) at zero."""
+        conn.execute("UPDATE bodies SET refs = refs - 1 WHERE hash = ?", (digest,))
+        refs, size = conn.execute("SELECT refs, size FROM bodies WHERE hash = ?", (digest,)).fetchone()
+        if refs > 0:
+            return
+        conn.execute("DELETE FROM bodies WHERE hash = ?", (digest,))
+        totals["bodies"] -= 1
+        totals["bytes"] -= size
+        try:
+            os.unlink(self._body_path(digest))
+        except FileNotFoundError:
+            pass
+
+    def store(
+        self,
+        url: str,
+        request_headers: Mapping[str, str],
+        status_code: int,
+        headers: Mapping[str, str],
+        encoding: Optional[str],
+        content: Optional[bytes] = None,
+        source: Optional[str] = None,
+        digest: Optional[str] = None,
+        size: Optional[int] = None,
+        final_url: Optional[str] = None,
+    ) -> None:
+        """Store a response body given as ``content`` or as a finished temp file ``source``.
+
+        ``final_url`` is where the request for ``url`` ended up after
+        redirects; hits report it as their ``url``.
+        """
+        if content is not None:
+            digest, size = hashlib.sha256(content).hexdigest(), len(content)
+        stored_headers = {k: v for k, v in headers.items() if k.lower() not in _DROP_HEADERS}
+        names = _vary_names(headers)
+        key = self._make_key(url, names, request_headers)
+        now = time.time()
+        with self._lock:
+            conn = self._db(create=True)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                totals = self._totals(conn)
+                conn.execute("INSERT OR REPLACE INTO variants (url, vary) VALUES (?, ?)", (url, json.dumps(names)))
+                self._put_body(conn, totals, digest, size, source, content)
+                old = conn.execute("SELECT body FROM entries WHERE key = ?", (key,)).fetchone()
+                conn.execute("UPDATE bodies SET refs = refs + 1 WHERE hash = ?", (digest,))
+                if old is not None:
+                    self._release_body(conn, totals, old[0])
+                else:
+                    totals["entries"] += 1
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, url, status, headers, encoding, body, expires_at, last_access, final_url) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, url, status_code, json.dumps(stored_headers), encoding, digest,
+                     now + freshness_lifetime(headers), now, final_url if final_url != url else None),
+                )
+                self._evict(conn, totals)
+                conn.execute(
+                    "UPDATE totals SET entries = ?, bodies = ?, bytes = ?",
+                    (totals["entries"], totals["bodies"], totals["bytes"]),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self.counters["stores"] += 1
+
+    def refresh(self, entry: CacheEntry, headers: Mapping[str, str]) -> CacheEntry:
+        """Apply the headers of a ``304`` to ``entry`` and restart its freshness."""
+        merged = CaseInsensitiveDict(entry.headers)
+        for name, value in headers.items():
+            if name.lower() not in _DROP_HEADERS:
+                merged[name] = value
+        expires_at = time.time() + freshness_lifetime(merged)
+        with self._lock:
+            self._db(create=True).execute(
+                "UPDATE entries SET headers = ?, expires_at = ? WHERE key = ?",
+                (json.dumps(dict(merged)), expires_at, entry.key),
+            )
+        return entry._replace(headers=dict(merged), expires_at=expires_at)
+
+    def _evict(self, conn: sqlite3.Connection, totals: Dict[str, int]) -> None:
+        """Evict least recently used entries until the bodies fit in ``max_bytes``."""
+        while totals["bytes"] > self.max_bytes:
+            row = conn.execute("SELECT key, body FROM entries ORDER BY last_access LIMIT 1").fetchone()
+            if row is None:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (row[0],))
+            totals["entries"] -= 1
+            self._release_body(conn, totals, row[1])
+            self.counters["evictions"] += 1
+
+    # --- request flow --------------------------------------------------------
+
+    def _conditional_headers(self, entry: Optional[CacheEntry]) -> Dict[str, str]:
+        if entry is None:
+            return {}
+        headers = CaseInsensitiveDict(entry.headers)
+        extra = {}
+        if headers.get("ETag"):
+            extra["If-None-Match"] = headers["ETag"]
+        if headers.get("Last-Modified"):
+            extra["If-Modified-Since"] = headers["Last-Modified"]
+        return extra
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def fetch(self, url: str, request_headers: Mapping[str, str], send: Callable[[Dict[str, str]], Any]):
+        """Serve ``url`` from the cache or through ``send(extra_headers)``, storing what it returns."""
+        entry = self.lookup(url, request_headers)
+        if entry is not None and entry.expires_at > time.time():
+            content = self._read_or_none(entry)
+            if content is not None:
+                self._count("hits")
+                return CachedResponse(entry, content, "hit")
+        resp = send(self._conditional_headers(entry))
+        handled = self._handle(url, request_headers, entry, resp)
+        if handled is None:
+            handled = self._handle(url, request_headers, None, send({}))
+        return handled
+
+    async def afetch(self, url: str, request_headers: Mapping[str, str], send):
+        """:meth:`fetch` for the event loop; ``send`` is a coroutine function."""
+        entry = await asyncio.to_thread(self.lookup, url, request_headers)
+        if entry is not None and entry.expires_at > time.time():
+            content = await asyncio.to_thread(self._read_or_none, entry)
+            if content is not None:
+                self._count("hits")
+                return CachedResponse(entry, content, "hit")
+        resp = await send(self._conditional_headers(entry))
+        handled = await asyncio.to_thread(self._handle, url, request_headers, entry, resp)
+        if handled is None:
+            handled = await asyncio.to_thread(self._handle, url, request_headers, None, await send({}))
+        return handled
+
+    def _read_or_none(self, entry: CacheEntry) -> Optional[bytes]:
+        # The body may have been evicted by another thread since the lookup.
+        try:
+            return self.read_body(entry)
+        except OSError:
+            return None
+
+    def _handle(self, url, request_headers, entry, resp):
+        """Count and store ``resp``; None if a ``304`` refers to a body evicted meanwhile."""
+        if entry is not None and resp.status_code == 304:
+            entry = self.refresh(entry, resp.headers)
+            content = self._read_or_none(entry)
+            if content is None:
+                return None
+            self._count("revalidated")
+            return CachedResponse(entry, content, "revalidated")
+        self._count("misses")
+        if is_cacheable(resp.status_code, resp.headers):
+            self.store(url, request_headers, resp.status_code, resp.headers, _response_encoding(resp), resp.content,
+                       final_url=str(resp.url))
+        return resp
+
+    @contextmanager
+    def stream(self, url: str, request_headers: Mapping[str, str], open_stream, chunk_size: int = _CHUNK_SIZE):
+        """:meth:`fetch` for streamed bodies; ``open_stream(extra_headers)`` yields ``(response, chunks)``.
+
+        A body streamed to the end is stored as it goes by.
+        """
+        entry = self.lookup(url, request_headers)
+        if entry is not None and entry.expires_at > time.time():
+            self._count("hits")
+            yield CachedResponse(entry, b"", "hit"), self.iter_body(entry, chunk_size)
+            return
+        with open_stream(self._conditional_headers(entry)) as (resp, chunks):
+            if entry is not None and resp.status_code == 304:
+                self._count("revalidated")
+                entry = self.refresh(entry, resp.headers)
+                yield CachedResponse(entry, b"", "revalidated"), self.iter_body(entry, chunk_size)
+                return
+            self._count("misses")
+            if not is_cacheable(resp.status_code, resp.headers):
+                yield resp, chunks
+                return
+            yield resp, self._tee(url, request_headers, resp, chunks)
+
+    def _tee(self, url, request_headers, resp, chunks):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        digest, size = hashlib.sha256(), 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+                    yield chunk
+            self.store(url, request_headers, resp.status_code, resp.headers, _response_encoding(resp),
+                       source=tmp, digest=digest.hexdigest(), size=size, final_url=str(resp.url))
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+
+    @asynccontextmanager
+    async def astream(self, url: str, request_headers: Mapping[str, str], open_stream, chunk_size: int = _CHUNK_SIZE):
+        """:meth:`stream` for the event loop; ``open_stream`` is an async context manager factory."""
+        entry = await asyncio.to_thread(self.lookup, url, request_headers)
+        if entry is not None and entry.expires_at > time.time():
+            self._count("hits")
+            yield CachedResponse(entry, b"", "hit"), self._aiter_body(entry, chunk_size)
+            return
+        async with open_stream(self._conditional_headers(entry)) as (resp, chunks):
+            if entry is not None and resp.status_code == 304:
+                self._count("revalidated")
+                entry = await asyncio.to_thread(self.refresh, entry, resp.headers)
+                yield CachedResponse(entry, b"", "revalidated"), self._aiter_body(entry, chunk_size)
+                return
+            self._count("misses")
+            if not is_cacheable(resp.status_code, resp.headers):
+                yield resp, chunks
+                return
+            yield resp, self._atee(url, request_headers, resp, chunks)
+
+    async def _aiter_body(self, entry: CacheEntry, chunk_size: int):
+        # File reads run in a thread, like every other disk access of the cache.
+        f = await asyncio.to_thread(open, self._body_path(entry.body), "rb")
+        try:
+            while chunk := await asyncio.to_thread(f.read, chunk_size):
+                yield chunk
+        finally:
+            f.close()
+
+    def _part_file(self):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        return os.fdopen(fd, "wb"), tmp
+
+    async def _atee(self, url, request_headers, resp, chunks):
+        f, tmp = await asyncio.to_thread(self._part_file)
+        digest, size = hashlib.sha256(), 0
+        try:
+            with f:
+                async for chunk in chunks:
+                    await asyncio.to_thread(f.write, chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+                    yield chunk
+            await asyncio.to_thread(
+                self.store, url, request_headers, resp.status_code, resp.headers, _response_encoding(resp),
+                source=tmp, digest=digest.hexdigest(), size=size, final_url=str(resp.url),
+            )
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out = {"enabled": True, "directory": self.directory, "max_bytes": self.max_bytes, **self.counters}
+            conn = self._db(create=False)
+            if conn is None:
+                out.update(entries=0, bodies=0, bytes=0)
+            else:
+                out.update(self._totals(conn))
+            lookups = out["hits"] + out["misses"] + out["revalidated"]
+            out["hit_ratio"] = round((out["hits"] + out["revalidated"]) / lookups, 4) if lookups else None
+            return out
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_cache: Optional[HttpCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_http_cache() -> Optional[HttpCache]:
+    """The process-wide cache, or None when ``HTTP_CACHE=0``."""
+    global _cache
+    if not HTTP_CACHE:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = HttpCache()
+    return _cache
@@ -1,9 +1,8 @@
-from bs4 import BeautifulSoup
-import requests
+from .page import fetch_page
 
-def get_images_alt(url):
-    resp = requests.get(url)
-    soup = BeautifulSoup(resp.text, 'html.parser')
+def get_images_alt(url, page=None):
+    page = page or fetch_page(url)
+    soup = page.soup
     images = []
     for img in soup.find_all('img'):
         images.append({
@@ -1,16 +1,8 @@
-from bs4 import BeautifulSoup
-import requests
+from .page import fetch_page
 
-def get_lang_charset(url):
-    resp = requests.get(url)
-    soup = BeautifulSoup(resp.text, 'html.parser')
+def get_lang_charset(url, page=None):
+    page = page or fetch_page(url)
+    soup = page.soup
     lang = soup.html.get('lang', '') if soup.html else ''
-    charset = ''
-    meta = soup.find('meta', charset=True)
-    if meta:
-        charset = meta.get('charset', '')
-    else:
-        meta = soup.find('meta', attrs={'http-equiv': 'Content-Type'})
-        if meta and 'charset=' in meta.get('content', ''):
-            charset = meta.get('content', '').split('charset=')[-1]
-    return {'lang': lang, 'charset': charset}
+    # The charset was found while decoding the page; no need to search the tree.
+    return {'lang': lang, **page.charset.as_dict()}
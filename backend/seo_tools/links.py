@@ -1,9 +1,8 @@
-from bs4 import BeautifulSoup
-import requests
+from .page import fetch_page
 
-def get_links(url):
-    resp = requests.get(url)
-    soup = BeautifulSoup(resp.text, 'html.parser')
+def get_links(url, page=None):
+    page = page or fetch_page(url)
+    soup = page.soup
     links = []
     for a in soup.find_all('a', href=True):
         links.append(a['href'])
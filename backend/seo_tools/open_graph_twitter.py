@@ -1,9 +1,8 @@
-from bs4 import BeautifulSoup
-import requests
+from .page import fetch_page
 
-def get_open_graph_twitter(url):
-    resp = requests.get(url)
-    soup = BeautifulSoup(resp.text, 'html.parser')
+def get_open_graph_twitter(url, page=None):
+    page = page or fetch_page(url)
+    soup = page.soup
     og = {}
     twitter = {}
     for tag in soup.find_all('meta'):
@@ -0,0 +1,222 @@
+import threading
+import time
+from contextlib import aclosing, closing
+from functools import cached_property
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+from bs4 import BeautifulSoup
+
+from .fetch import (
+    ByteBudget,
+    aiter_bounded,
+    aread_body,
+    get_async_client,
+    get_client,
+    iter_bounded,
+    read_body,
+)
+from .charset import Charset, detect_charset, response_charset
+from .extract_pool import get_extract_pool
+from .parsers import get_parser
+from .result_cache import content_hash
+
+
+class PageSnapshot:
+    """A fetched page: raw bytes, headers, decoded text and a lazily parsed tree.
+
+    One snapshot is built per analysis and handed to every tool, so a page is
+    downloaded and parsed once no matter how many checks run against it.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        status_code: int,
+        headers: Mapping[str, str],
+        content: bytes,
+        text: str,
+        parser: Optional[str] = None,
+    ):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.text = text
+        self.parser = get_parser(parser)
+        self._extracted: Dict[str, Any] = {}
+        #: How the page was downloaded: mode, bytes read and saved, latency.
+        self.fetch_stats: Dict[str, Any] = {}
+
+    @classmethod
+    def from_response(cls, resp, parser: Optional[str] = None) -> "PageSnapshot":
+        return _snapshot(resp, resp.content, parser)
+
+    @cached_property
+    def charset(self) -> Charset:
+        """The encoding of :attr:`content` and how it was found."""
+        return detect_charset(self.content, self.headers.get("Content-Type"))
+
+    @cached_property
+    def content_hash(self) -> str:
+        """Identifies the page content for memoized check results."""
+        return content_hash(self.content, self.headers)
+
+    @cached_property
+    def soup(self) -> BeautifulSoup:
+        return self.parser.soup(self.text)
+
+    def extract(self, checks: Iterable[str]) -> Dict[str, Any]:
+        """Results of the single-pass engine for ``checks``.
+
+        Checks not extracted yet are run together in one pass and cached, so
+        asking for every check up front costs a single walk of the document.
+        The pass runs in a worker process when ``EXTRACT_WORKERS`` is set.
+        """
+        checks = list(dict.fromkeys(checks))
+        missing = [name for name in checks if name not in self._extracted]
+        if missing:
+            pool = get_extract_pool()
+            if pool is not None:
+                results = pool.extract(self, missing)
+            else:
+                results = self.parser.extract(self.text, missing)
+            if "lang_charset" in results:
+                results["lang_charset"].update(self.charset.as_dict())
+            self._extracted.update(results)
+        return {name: self._extracted[name] for name in checks}
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def _snapshot(resp, content: bytes, parser: Optional[str]) -> PageSnapshot:
+    charset = response_charset(resp, content)
+    page = PageSnapshot(str(resp.url), resp.status_code, resp.headers, content, charset.decode(content), parser)
+    page.charset = charset
+    return page
+
+
+def _budget_snapshot(resp, content: bytes, budget: ByteBudget, parser: Optional[str], start: float, mode: str) -> PageSnapshot:
+    page = _snapshot(resp, content, parser)
+    page.fetch_stats = {"mode": mode, **budget.stats(), "latency_ms": _elapsed_ms(start)}
+    return page
+
+
+def fetch_page(url: str, parser: Optional[str] = None) -> PageSnapshot:
+    """Fetch ``url`` into a snapshot parsed with ``parser`` (default: ``SEO_PARSER``).
+
+    The body is read up to the download caps of :mod:`.fetch`; a page cut
+    short reports it under ``fetch_stats["truncated"]``.
+    """
+    start = time.perf_counter()
+    with get_client().stream(url) as (resp, chunks):
+        content, budget = read_body(resp, chunks)
+    return _budget_snapshot(resp, content, budget, parser, start, "full")
+
+
+async def fetch_page_async(url: str, parser: Optional[str] = None) -> PageSnapshot:
+    """:func:`fetch_page` for code running on an event loop.
+
+    Only the download is asynchronous; parsing is CPU-bound and left to the
+    caller to run off the loop (e.g. with :func:`asyncio.to_thread`).
+    """
+    start = time.perf_counter()
+    async with get_async_client().stream(url) as (resp, chunks):
+        content, budget = await aread_body(resp, chunks)
+    return _budget_snapshot(resp, content, budget, parser, start, "full")
+
+
+# --- Head-only fetch ----------------------------------------------------------
+
+_HEAD_MARKERS = (b"</head", b"<body")
+_head_lock = threading.Lock()
+_head_totals = {"fetches": 0, "stopped_early": 0, "bytes_read": 0, "bytes_saved": 0}
+
+
+class HeadScanner:
+    """Collects a body chunk by chunk until the end of its ``<head>`` is seen.
+
+    The document is cut after ``</head>``, or before ``<body`` when the head
+    is not closed explicitly, so nothing after the head is ever parsed.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.end: Optional[int] = None
+        self._scanned = 0
+
+    def feed(self, chunk: bytes) -> bool:
+        """Add ``chunk``; return True once the head is complete."""
+        self.buffer += chunk
+        # Re-check the tail of the previous chunk for a marker split across chunks.
+        offset = max(0, self._scanned - len(_HEAD_MARKERS[0]) + 1)
+        window = bytes(self.buffer[offset:]).lower()
+        found = [i for i in (window.find(marker) for marker in _HEAD_MARKERS) if i >= 0]
+        self._scanned = len(self.buffer)
+        if not found:
+            return False
+        index = offset + min(found)
+        if self.buffer.startswith(b"</", index):
+            close = self.buffer.find(b">", index)
+            index = close + 1 if close >= 0 else index
+        self.end = index
+        return True
+
+    @property
+    def content(self) -> bytes:
+        return bytes(self.buffer if self.end is None else self.buffer[: self.end])
+
+
+def _head_snapshot(resp, scanner: HeadScanner, budget: ByteBudget, parser: Optional[str], start: float) -> PageSnapshot:
+    page = _budget_snapshot(resp, scanner.content, budget, parser, start, "head")
+    try:
+        length = int(resp.headers.get("Content-Length"))
+    except (TypeError, ValueError):
+        length = None
+    bytes_read = page.fetch_stats["bytes_read"]
+    stopped = scanner.end is not None
+    saved = max(0, length - bytes_read) if length is not None and stopped else None
+    page.fetch_stats.update(stopped_early=stopped, content_length=length, bytes_saved=saved)
+    with _head_lock:
+        _head_totals["fetches"] += 1
+        _head_totals["stopped_early"] += stopped
+        _head_totals["bytes_read"] += bytes_read
+        _head_totals["bytes_saved"] += saved or 0
+    return page
+
+
+def fetch_head(url: str, parser: Optional[str] = None) -> PageSnapshot:
+    """Fetch only the ``<head>`` of ``url`` (plus the ``<html>`` tag).
+
+    The body is streamed and the connection dropped as soon as the head is
+    complete, so checks that read nothing else skip the rest of the download.
+    """
+    start = time.perf_counter()
+    scanner = HeadScanner()
+    with get_client().stream(url) as (resp, chunks):
+        budget = ByteBudget(resp)
+        with closing(iter_bounded(chunks, budget)) as body:
+            for chunk in body:
+                if scanner.feed(chunk):
+                    break
+        return _head_snapshot(resp, scanner, budget, parser, start)
+
+
+async def fetch_head_async(url: str, parser: Optional[str] = None) -> PageSnapshot:
+    """:func:`fetch_head` for code running on an event loop."""
+    start = time.perf_counter()
+    scanner = HeadScanner()
+    async with get_async_client().stream(url) as (resp, chunks):
+        budget = ByteBudget(resp)
+        async with aclosing(aiter_bounded(chunks, budget)) as body:
+            async for chunk in body:
+                if scanner.feed(chunk):
+                    break
+        return _head_snapshot(resp, scanner, budget, parser, start)
+
+
+def head_fetch_stats() -> Dict[str, int]:
+    """Totals over every head-only fetch of this process."""
+    with _head_lock:
+        return dict(_head_totals)
@@ -0,0 +1,171 @@
+"""Selectable HTML parser backends.
+
+Every backend can drive the single-pass :class:`~.extract.ExtractionEngine`;
+backends backed by a BeautifulSoup tree builder also build ``page.soup`` for
+the per-check functions. Engine-only backends build it with ``html.parser``,
+so ``ANALYZER_ENGINE=soup`` works whatever the backend.
+
+==============  =====================  ======================================
+name            requires               notes
+==============  =====================  ======================================
+``html.parser`` standard library       reference behaviour, slowest
+``lxml``        ``lxml``               libxml2, streams events through a
+                                       parser target
+``selectolax``  ``selectolax``         lexbor HTML5 parser, engine only
+==============  =====================  ======================================
+
+The default backend is taken from ``SEO_PARSER`` and can be overridden per
+page (see :func:`~.page.fetch_page`). On well-formed documents every backend
+returns identical results; on broken markup the HTML5 and libxml2 tree
+builders may repair the document differently from ``html.parser``.
+"""
+import os
+from typing import Any, Dict, Iterable, Optional
+
+from bs4 import BeautifulSoup
+
+from .extract import COMMENT, ExtractionEngine, SoupHTMLParser
+
+DEFAULT_PARSER = os.environ.get("SEO_PARSER", "html.parser")
+
+
+class ParserBackend:
+    name = ''
+    #: BeautifulSoup ``features`` string, or None if the backend cannot build a
+    #: soup and ``page.soup`` falls back to ``html.parser``.
+    features: Optional[str] = None
+
+    def available(self) -> bool:
+        return True
+
+    def parser(self, engine: ExtractionEngine):
+        """Return an object with ``feed(text)`` and ``close()`` that drives ``engine``."""
+        raise NotImplementedError
+
+    def extract(self, markup: str, checks: Iterable[str]) -> Dict[str, Any]:
+        engine = ExtractionEngine(checks)
+        parser = self.parser(engine)
+        parser.feed(markup)
+        parser.close()
+        return engine.results()
+
+    def soup(self, markup: str) -> BeautifulSoup:
+        return BeautifulSoup(markup, self.features or HtmlParserBackend.features)
+
+
+class HtmlParserBackend(ParserBackend):
+    name = 'html.parser'
+    features = 'html.parser'
+
+    def parser(self, engine):
+        return SoupHTMLParser(engine)
+
+
+class _LxmlTarget:
+    """lxml parser target forwarding SAX-style events to the engine."""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def start(self, tag, attrib):
+        self.engine.start(tag, dict(attrib))
+
+    def end(self, tag):
+        self.engine.end(tag)
+
+    def data(self, data):
+        self.engine.data(data)
+
+    def comment(self, text):
+        self.engine.string(text, COMMENT)
+
+    def close(self):
+        self.engine.close()
+
+
+class LxmlBackend(ParserBackend):
+    name = 'lxml'
+    features = 'lxml'
+
+    def available(self):
+        try:
+            import lxml.etree  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def parser(self, engine):
+        from lxml import etree
+
+        return etree.HTMLParser(target=_LxmlTarget(engine))
+
+
+class _SelectolaxParser:
+    """Buffers the document, parses it with lexbor and walks the tree into the engine."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.chunks = []
+
+    def feed(self, data):
+        self.chunks.append(data)
+
+    def close(self):
+        from selectolax.lexbor import LexborHTMLParser
+
+        tree = LexborHTMLParser(''.join(self.chunks))
+        if tree.root is not None:
+            self._walk(tree.root)
+        self.engine.close()
+
+    def _walk(self, root):
+        # Iterative so deeply nested documents cannot hit the recursion limit.
+        engine = self.engine
+        stack = [(None, iter([root]))]
+        while stack:
+            tag, children = stack[-1]
+            node = next(children, None)
+            if node is None:
+                stack.pop()
+                if tag is not None:
+                    engine.end(tag)
+                continue
+            if node.tag == '-text':
+                engine.data(node.text_content)
+            elif node.tag == '-comment':
+                engine.string(node.comment_content or '', COMMENT)
+            elif not node.tag.startswith('-'):
+                attrs = {key: '' if value is None else value for key, value in node.attributes.items()}
+                engine.start(node.tag, attrs)
+                stack.append((node.tag, node.iter(include_text=True)))
+
+
+class SelectolaxBackend(ParserBackend):
+    name = 'selectolax'
+
+    def available(self):
+        try:
+            import selectolax.lexbor  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def parser(self, engine):
+        return _SelectolaxParser(engine)
+
+
+PARSERS: Dict[str, ParserBackend] = {
+    backend.name: backend
+    for backend in (HtmlParserBackend(), LxmlBackend(), SelectolaxBackend())
+}
+
+
+def get_parser(name: Optional[str] = None) -> ParserBackend:
+    """Look up a parser backend by name, defaulting to ``SEO_PARSER``."""
+    name = name or DEFAULT_PARSER
+    backend = PARSERS.get(name)
+    if backend is None:
+        raise ValueError(f"unknown parser backend {name!r}; choose from {', '.join(PARSERS)}")
+    if not backend.available():
+        raise ValueError(f"parser backend {name!r} is not installed")
+    return backend
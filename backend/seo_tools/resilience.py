@@ -0,0 +1,202 @@
+"""Deadlines, timeouts, retries and circuit breakers for fetches.
+
+An analysis runs under a deadline (:func:`deadline`). It is kept in a
+context variable, so it reaches every fetch made on its behalf, including
+fetches in worker threads started with :func:`asyncio.to_thread` and in tasks
+spawned by the analysis. Each request gets connect and read timeouts, and
+both are cut down to the time left before the deadline. Once the deadline
+has passed, new requests fail with :class:`DeadlineExceeded`, and bodies
+being read stop where they are.
+
+Failed requests (network errors, timeouts and 429/502/503/504 responses) are
+retried with full-jitter exponential backoff, unless the deadline would pass
+first. Every host has a :class:`CircuitBreaker`. After repeated failures
+the breaker opens, and requests to that host fail at once with
+:class:`CircuitOpen` until a cooldown has passed. A single probe request then
+decides whether the breaker closes again.
+
+Configuration comes from the environment:
+
+- ``FETCH_CONNECT_TIMEOUT`` – seconds to establish a connection (default 5)
+- ``FETCH_READ_TIMEOUT`` – seconds to wait for each read (default 15)
+- ``FETCH_RETRIES`` – retries after the first attempt (default 2)
+- ``FETCH_BACKOFF`` / ``FETCH_BACKOFF_MAX`` – first and largest backoff
+  ceiling, in seconds (default 0.25 and 4)
+- ``BREAKER_FAILURES`` – consecutive failures that open a breaker (default 5)
+- ``BREAKER_COOLDOWN`` – seconds an open breaker rejects requests (default 30)
+"""
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+CONNECT_TIMEOUT = float(os.environ.get("FETCH_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.environ.get("FETCH_READ_TIMEOUT", "15"))
+RETRIES = int(os.environ.get("FETCH_RETRIES", "2"))
+BACKOFF = float(os.environ.get("FETCH_BACKOFF", "0.25"))
+BACKOFF_MAX = float(os.environ.get("FETCH_BACKOFF_MAX", "4"))
+BREAKER_FAILURES = int(os.environ.get("BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.environ.get("BREAKER_COOLDOWN", "30"))
+
+#: Responses worth another attempt.
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+
+class DeadlineExceeded(TimeoutError):
+    """The deadline of the current request passed."""
+
+
+class CircuitOpen(ConnectionError):
+    """A request refused without being sent: its host has been failing."""
+
+
+_deadline: ContextVar[Optional[float]] = ContextVar("fetch_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[None]:
+    """Run the block under a deadline ``seconds`` from now (None: no deadline).
+
+    A nested deadline can shorten an enclosing one but never extends it.
+    """
+    if seconds is None:
+        yield
+        return
+    at = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(at if outer is None else min(outer, at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def own_deadline(seconds: Optional[float]) -> Iterator[None]:
+    """Like :func:`deadline`, but replacing any enclosing deadline.
+
+    For work shared by several callers, which must not end when the caller
+    that happened to start it runs out of time.
+    """
+    token = _deadline.set(None if seconds is None else time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None without one."""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check_deadline() -> None:
+    if expired():
+        raise DeadlineExceeded("deadline exceeded")
+
+
+def timeouts() -> Tuple[float, float]:
+    """``(connect, read)`` timeouts for a request made now."""
+    check_deadline()
+    left = remaining()
+    if left is None:
+        return CONNECT_TIMEOUT, READ_TIMEOUT
+    return min(CONNECT_TIMEOUT, left), min(READ_TIMEOUT, left)
+
+
+class RetryPolicy:
+    """How many times, and after how long, a failed request is tried again."""
+
+    def __init__(self, retries: Optional[int] = None, backoff: Optional[float] = None, backoff_max: Optional[float] = None):
+        self.retries = RETRIES if retries is None else retries
+        self.backoff = BACKOFF if backoff is None else backoff
+        self.backoff_max = BACKOFF_MAX if backoff_max is None else backoff_max
+
+    def delay(self, attempt: int) -> Optional[float]:
+        """Seconds to wait after failed attempt ``attempt`` (from 1), or None to give up."""
+        if attempt > self.retries:
+            return None
+        # Full jitter: spreads out clients that failed at the same moment.
+        delay = random.uniform(0, min(self.backoff_max, self.backoff * 2 ** (attempt - 1)))
+        left = remaining()
+        if left is not None and delay >= left:
+            return None
+        return delay
+
+
+class CircuitBreaker:
+    """Closed, open after ``failures`` failures in a row, half-open once ``cooldown`` has passed."""
+
+    __slots__ = ("failures", "cooldown", "state", "consecutive", "changed_at", "trips")
+
+    def __init__(self, failures: int, cooldown: float):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.consecutive = 0
+        self.changed_at = 0.0
+        self.trips = 0
+
+    def allow(self, now: float) -> bool:
+        if self.state == "closed":
+            return True
+        if now - self.changed_at < self.cooldown:
+            return False
+        # Let one probe through; should it never report back, another one
+        # goes after the next cooldown.
+        self.state, self.changed_at = "half_open", now
+        return True
+
+    def record(self, failed: bool, now: float) -> None:
+        if not failed:
+            self.state, self.consecutive = "closed", 0
+            return
+        self.consecutive += 1
+        if self.state == "half_open" or self.consecutive >= self.failures:
+            if self.state != "open":
+                self.trips += 1
+            self.state, self.changed_at = "open", now
+
+
+class Breakers:
+    """Thread-safe circuit breakers, one per host."""
+
+    def __init__(self, failures: Optional[int] = None, cooldown: Optional[float] = None):
+        self.failures = BREAKER_FAILURES if failures is None else failures
+        self.cooldown = BREAKER_COOLDOWN if cooldown is None else cooldown
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, CircuitBreaker] = {}
+        self.rejected = 0
+
+    def check(self, host: str) -> None:
+        """Raise :class:`CircuitOpen` unless a request to ``host`` may go out."""
+        with self._lock:
+            breaker = self._hosts.get(host)
+            if breaker is None:
+                breaker = self._hosts[host] = CircuitBreaker(self.failures, self.cooldown)
+            if breaker.allow(time.monotonic()):
+                return
+            self.rejected += 1
+            wait = breaker.cooldown - (time.monotonic() - breaker.changed_at)
+        raise CircuitOpen(f"circuit open for {host}, retry in {max(wait, 0):.1f}s")
+
+    def record(self, host: str, failed: bool) -> None:
+        with self._lock:
+            self._hosts[host].record(failed, time.monotonic())
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rejected": self.rejected,
+                "trips": sum(b.trips for b in self._hosts.values()),
+                "not_closed": {host: b.state for host, b in self._hosts.items() if b.state != "closed"},
+            }
@@ -0,0 +1,238 @@
+"""Memoized check results, keyed by page content, check name and check version.
+
+A check's output depends only on the page it reads. When a page's bytes are
+unchanged, its earlier result can be returned without parsing the page again.
+Results are kept in two tiers:
+
+- a per-process LRU of the most recently used ``RESULT_CACHE_MEMORY`` results;
+- a SQLite table shared by every process, capped at ``RESULT_CACHE_MAX_ENTRIES``
+  rows. The least recently used rows are evicted first.
+
+Every check carries a version. Storing a result under a new version deletes
+that check's results under older versions, and leaves other checks alone.
+Results are held as JSON, so each hit hands out a fresh copy.
+
+Configuration comes from the environment:
+
+- ``RESULT_CACHE`` – set to ``0`` to disable memoization (default on)
+- ``RESULT_CACHE_PATH`` – SQLite file (default ``result_cache.sqlite``)
+- ``RESULT_CACHE_MEMORY`` – results kept in memory (default 2048)
+- ``RESULT_CACHE_MAX_ENTRIES`` – results kept on disk (default 100000)
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+RESULT_CACHE = os.environ.get("RESULT_CACHE", "1") == "1"
+RESULT_CACHE_PATH = os.environ.get("RESULT_CACHE_PATH", "result_cache.sqlite")
+RESULT_CACHE_MEMORY = int(os.environ.get("RESULT_CACHE_MEMORY", "2048"))
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get("RESULT_CACHE_MAX_ENTRIES", "100000"))
+
+#: Returned by :meth:`ResultCache.get` when nothing is stored.
+MISS = object()
+
+Key = Tuple[str, str, int]
+
+
+def content_hash(content: bytes, headers: Optional[Mapping[str, str]] = None) -> str:
+    """SHA-256 of a page body and the ``Content-Type`` it is decoded with."""
+    digest = hashlib.sha256(content)
+    content_type = (headers or {}).get("Content-Type", "")
+    digest.update(b"\0" + content_type.encode("latin-1", errors="replace"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    def __init__(
+        self,
+        path: str = RESULT_CACHE_PATH,
+        memory_entries: int = RESULT_CACHE_MEMORY,
+        max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+    ):
+        self.path = os.path.abspath(path)
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[Key, str]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # Latest version stored per check; older versions are purged once.
+        self._versions: Dict[str, int] = {}
+        # Rows on disk, counted once on opening and kept up to date by
+        # stores, invalidations and evictions.
+        self._rows = 0
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0, "invalidated": 0}
+
+    def _db(self, create: bool) -> Optional[sqlite3.Connection]:
+        if self._conn is None:
+            if not create and not os.path.exists(self.path):
+                return None
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS results (
+                    hash TEXT NOT NULL,
+                    tool TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    value TEXT NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (hash, tool, version)
+                );
+                CREATE INDEX IF NOT EXISTS results_tool ON results (tool, version);
+                CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access);
+                """
+            )
+            self._rows = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def _remember(self, key: Key, value: str) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, digest: str, tool: str, version: int) -> Any:
+        """The stored result of ``tool`` at ``version`` for page ``digest``, or :data:`MISS`."""
+        key = (digest, tool, version)
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return json.loads(value)
+            conn = self._db(create=False)
+            row = None
+            if conn is not None:
+                row = conn.execute(
+                    "SELECT value FROM results WHERE hash = ? AND tool = ? AND version = ?", key
+                ).fetchone()
+            if row is None:
+                self.counters["misses"] += 1
+                return MISS
+            conn.execute(
+                "UPDATE results SET last_access = ? WHERE hash = ? AND tool = ? AND version = ?",
+                (time.time(), *key),
+            )
+            self._remember(key, row[0])
+            self.counters["disk_hits"] += 1
+            return json.loads(row[0])
+
+    def contains(self, digest: str, tool: str, version: int) -> bool:
+        """Whether a result is stored, without counting a lookup."""
+        key = (digest, tool, version)
+        with self._lock:
+            if key in self._memory:
+                return True
+            conn = self._db(create=False)
+            if conn is None:
+                return False
+            query = "SELECT 1 FROM results WHERE hash = ? AND tool = ? AND version = ?"
+            return conn.execute(query, key).fetchone() is not None
+
+    def put(self, digest: str, tool: str, version: int, value: Any) -> None:
+        """Store ``value``; it must be JSON-serialisable."""
+        key = (digest, tool, version)
+        encoded = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            conn = self._db(create=True)
+            if self._versions.get(tool) != version:
+                self._invalidate(conn, tool, version)
+            now = time.time()
+            added = conn.execute(
+                "INSERT OR IGNORE INTO results (hash, tool, version, value, last_access) VALUES (?, ?, ?, ?, ?)",
+                (*key, encoded, now),
+            ).rowcount
+            if added:
+                self._rows += 1
+            else:
+                conn.execute(
+                    "UPDATE results SET value = ?, last_access = ? WHERE hash = ? AND tool = ? AND version = ?",
+                    (encoded, now, *key),
+                )
+            self._remember(key, encoded)
+            self.counters["stores"] += 1
+            self._evict(conn)
+
+    def _invalidate(self, conn: sqlite3.Connection, tool: str, version: int) -> None:
+        removed = conn.execute("DELETE FROM results WHERE tool = ? AND version != ?", (tool, version)).rowcount
+        for key in [key for key in self._memory if key[1] == tool and key[2] != version]:
+            del self._memory[key]
+        self._versions[tool] = version
+        self._rows -= removed
+        self.counters["invalidated"] += removed
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        if self._rows <= self.max_entries:
+            return
+        # Over the cap by this process's count: count once to take in what
+        # other processes stored or evicted since.
+        self._rows = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        excess = self._rows - self.max_entries
+        if excess <= 0:
+            return
+        # Evict a tenth of the budget at once so a full cache does not
+        # delete on every store.
+        excess = max(excess, self.max_entries // 10)
+        removed = conn.execute(
+            "DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY last_access LIMIT ?)",
+            (excess,),
+        ).rowcount
+        self._rows -= removed
+        self.counters["evictions"] += removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out = {
+                "enabled": True,
+                "path": self.path,
+                "memory_entries": len(self._memory),
+                "max_entries": self.max_entries,
+                **self.counters,
+            }
+            conn = self._db(create=False)
+            out["disk_entries"] = self._rows if conn else 0
+            hits = out["memory_hits"] + out["disk_hits"]
+            lookups = hits + out["misses"]
+            out["hit_ratio"] = round(hits / lookups, 4) if lookups else None
+            return out
+
+    def clear(self) -> None:
+        """Drop every stored result and reset the counters."""
+        with self._lock:
+            self._memory.clear()
+            self._versions.clear()
+            conn = self._db(create=False)
+            if conn is not None:
+                conn.execute("DELETE FROM results")
+                self._rows = 0
+            for name in self.counters:
+                self.counters[name] = 0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """The process-wide result cache, or None when ``RESULT_CACHE=0``."""
+    global _cache
+    if not RESULT_CACHE:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache()
+    return _cache
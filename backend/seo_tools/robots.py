@@ -0,0 +1,319 @@
+"""Parsed, cached robots.txt.
+
+:class:`RobotsRules` compiles a robots.txt (RFC 9309, with the ``*`` / ``$``
+wildcards and ``Crawl-delay`` extension) into a matcher for one user agent.
+Its rules are sorted so the longest match wins, and on a tie ``Allow`` beats
+``Disallow``. Plain prefixes are looked up in a dict, one probe per distinct
+rule length, and only wildcard rules use a regex, so checking a path takes
+microseconds.
+
+:class:`RobotsCache` keeps one entry per scheme and host for ``ROBOTS_TTL``
+seconds. It revalidates an expired entry with ``If-None-Match`` /
+``If-Modified-Since``. Concurrent lookups for the same host share a single
+fetch. A missing robots.txt (4xx) allows everything. So does an unreachable
+one (5xx or a network error), but that is cached only for
+``ROBOTS_ERROR_TTL`` seconds. A shared async fetch runs under its own
+``ROBOTS_TIMEOUT`` rather than the deadline of the caller that started it;
+each caller waits for it only until its own deadline. Only the first ``ROBOTS_MAX_BYTES`` of a
+robots.txt are read (RFC 9309 asks parsers to handle at least 500 KiB); a
+longer file is parsed up to its last complete line and marked truncated.
+"""
+import asyncio
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .fetch import _HostSlot, aread_body, decode_body, get_async_client, get_client, read_body
+from .resilience import DeadlineExceeded, own_deadline, remaining
+
+ROBOTS_TTL = float(os.environ.get("ROBOTS_TTL", "3600"))
+ROBOTS_ERROR_TTL = float(os.environ.get("ROBOTS_ERROR_TTL", "300"))
+ROBOTS_CACHE_SIZE = int(os.environ.get("ROBOTS_CACHE_SIZE", "1000"))
+ROBOTS_MAX_BYTES = int(os.environ.get("ROBOTS_MAX_BYTES", str(500 * 1024)))
+# Seconds a shared robots.txt fetch may take, whatever its callers' deadlines.
+ROBOTS_TIMEOUT = float(os.environ.get("ROBOTS_TIMEOUT", "10"))
+# Product token matched against User-agent lines; "*" groups apply otherwise.
+USER_AGENT = os.environ.get("ROBOTS_USER_AGENT", "SEOAstroAnalyzer")
+
+
+def _compile(pattern: str):
+    if "*" not in pattern and not pattern.endswith("$"):
+        return pattern
+    anchored = pattern.endswith("$")
+    body = pattern[:-1] if anchored else pattern
+    regex = ".*".join(re.escape(part) for part in body.split("*"))
+    return re.compile(regex + ("$" if anchored else ""))
+
+
+class RobotsRules:
+    """Allow/disallow rules and crawl-delay of one robots.txt for one user agent."""
+
+    def __init__(self, text: str = "", user_agent: str = USER_AGENT):
+        self.sitemaps: List[str] = []
+        self.crawl_delay: Optional[float] = None
+        groups: Dict[str, List[Tuple[str, str]]] = {}
+        agents: List[str] = []
+        in_rules = False
+        for line in text.splitlines():
+            line = line.split("#", 1)[0]
+            if ":" not in line:
+                continue
+            key, value = (part.strip() for part in line.split(":", 1))
+            key = key.lower()
+            if key == "sitemap":
+                if value:
+                    self.sitemaps.append(value)
+            elif key == "user-agent":
+                if in_rules:
+                    agents, in_rules = [], False
+                agents.append(value.split("/", 1)[0].strip().lower())
+            elif key in ("allow", "disallow", "crawl-delay") and agents:
+                in_rules = True
+                for agent in agents:
+                    groups.setdefault(agent, []).append((key, value))
+        lines = groups.get(user_agent.lower())
+        if lines is None:
+            lines = groups.get("*", [])
+        # Plain prefixes map to whether they allow (Allow wins a duplicate) and
+        # are probed by length; wildcard rules are tried longest first.
+        self._prefixes: Dict[str, bool] = {}
+        self._wildcards = []
+        for key, value in lines:
+            if key == "crawl-delay":
+                try:
+                    self.crawl_delay = float(value)
+                except ValueError:
+                    pass
+            elif value:
+                allow = key == "allow"
+                matcher = _compile(value)
+                if isinstance(matcher, str):
+                    self._prefixes[value] = self._prefixes.get(value, False) or allow
+                else:
+                    self._wildcards.append((len(value), allow, matcher))
+        self._lengths = sorted({len(prefix) for prefix in self._prefixes}, reverse=True)
+        self._wildcards.sort(key=lambda rule: (-rule[0], not rule[1]))
+
+    def allowed(self, url: str) -> bool:
+        """Whether ``url`` (absolute, or a path with optional query) may be fetched."""
+        if "://" in url:
+            parts = urlsplit(url)
+            path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        else:
+            path = url or "/"
+        if path == "/robots.txt":
+            return True
+        best, allowed = -1, True
+        for length in self._lengths:
+            if length <= len(path):
+                allow = self._prefixes.get(path[:length])
+                if allow is not None:
+                    best, allowed = length, allow
+                    break
+        for length, allow, regex in self._wildcards:
+            # Sorted, so once a rule cannot beat the best match none can.
+            if length < best or (length == best and (allowed or not allow)):
+                break
+            if regex.match(path):
+                best, allowed = length, allow
+                break
+        return allowed
+
+
+class RobotsEntry:
+    __slots__ = ("rules", "text", "status", "etag", "last_modified", "fetched_at", "expires", "truncated")
+
+    def __init__(self, rules, text, status, etag=None, last_modified=None, fetched_at=0.0, expires=0.0, truncated=None):
+        self.rules = rules
+        self.text = text
+        self.status = status
+        #: The download cap that cut the file short, if any.
+        self.truncated = truncated
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+        self.expires = expires
+
+    def allowed(self, url: str) -> bool:
+        return self.rules.allowed(url)
+
+    @property
+    def sitemaps(self) -> List[str]:
+        return self.rules.sitemaps
+
+    @property
+    def crawl_delay(self) -> Optional[float]:
+        return self.rules.crawl_delay
+
+
+def robots_key(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc.lower()}"
+
+
+class RobotsCache:
+    """Per-host robots.txt cache shared by the analyzer, batch and crawler paths."""
+
+    def __init__(self, ttl: float = ROBOTS_TTL, error_ttl: float = ROBOTS_ERROR_TTL, max_hosts: int = ROBOTS_CACHE_SIZE):
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.max_hosts = max_hosts
+        self._entries: "OrderedDict[str, RobotsEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Locks of the hosts being fetched, dropped once nobody waits on them.
+        self._host_locks: Dict[str, _HostSlot] = {}
+        self._inflight: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Future] = {}
+        self.counters = {"hits": 0, "fetches": 0, "revalidated": 0, "errors": 0}
+
+    def _fresh(self, key: str) -> Tuple[Optional[RobotsEntry], bool]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, False
+            self._entries.move_to_end(key)
+            if entry.expires > time.monotonic():
+                self.counters["hits"] += 1
+                return entry, True
+            return entry, False
+
+    def _conditional_headers(self, entry: Optional[RobotsEntry]) -> Dict[str, str]:
+        headers = {}
+        if entry is not None and entry.status == 200:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def _store(
+        self,
+        key: str,
+        old: Optional[RobotsEntry],
+        resp=None,
+        body: bytes = b"",
+        truncated: Optional[str] = None,
+        error: Optional[Exception] = None,
+    ) -> RobotsEntry:
+        now = time.monotonic()
+        if error is not None or resp.status_code >= 500:
+            entry = RobotsEntry(RobotsRules(), "", None if error else resp.status_code, fetched_at=now, expires=now + self.error_ttl)
+            counter = "errors"
+        elif resp.status_code == 304 and old is not None:
+            entry = old
+            entry.fetched_at, entry.expires = now, now + self.ttl
+            counter = "revalidated"
+        elif resp.status_code == 200:
+            text = decode_body(resp, body)
+            if truncated:
+                # Drop the line the cap cut in half.
+                text = text.rpartition("\n")[0]
+            entry = RobotsEntry(
+                RobotsRules(text),
+                text,
+                200,
+                resp.headers.get("ETag"),
+                resp.headers.get("Last-Modified"),
+                now,
+                now + self.ttl,
+                truncated,
+            )
+            counter = "fetches"
+        else:
+            entry = RobotsEntry(RobotsRules(), "", resp.status_code, fetched_at=now, expires=now + self.ttl)
+            counter = "fetches"
+        with self._lock:
+            self.counters[counter] += 1
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_hosts:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get(self, url: str) -> RobotsEntry:
+        """The robots entry for the host of ``url``, fetching or revalidating it if needed."""
+        key = robots_key(url)
+        entry, fresh = self._fresh(key)
+        if fresh:
+            return entry
+        with self._lock:
+            host_lock = self._host_locks.get(key)
+            if host_lock is None:
+                host_lock = self._host_locks[key] = _HostSlot(threading.Lock())
+            host_lock.users += 1
+        try:
+            with host_lock.semaphore:
+                return self._fetch(key)
+        finally:
+            with self._lock:
+                host_lock.users -= 1
+                if not host_lock.users:
+                    del self._host_locks[key]
+
+    def _fetch(self, key: str) -> RobotsEntry:
+        entry, fresh = self._fresh(key)
+        if fresh:
+            return entry
+        try:
+            headers = self._conditional_headers(entry)
+            with get_client().stream(key + "/robots.txt", cache=False, headers=headers) as (resp, chunks):
+                body, budget = read_body(resp, chunks, max_decoded_bytes=ROBOTS_MAX_BYTES)
+            if budget.truncated == "deadline":
+                raise DeadlineExceeded("deadline exceeded")
+        except DeadlineExceeded:
+            # Our own deadline says nothing about the host: cache nothing.
+            raise
+        except Exception as e:
+            return self._store(key, entry, error=e)
+        return self._store(key, entry, resp, body, budget.truncated)
+
+    async def get_async(self, url: str) -> RobotsEntry:
+        """:meth:`get` for the event loop; concurrent callers share one fetch per host."""
+        key = robots_key(url)
+        entry, fresh = self._fresh(key)
+        if fresh:
+            return entry
+        flight = (asyncio.get_running_loop(), key)
+        future = self._inflight.get(flight)
+        if future is None:
+            # The task copies the context, taking this deadline instead of ours.
+            with own_deadline(ROBOTS_TIMEOUT):
+                future = self._inflight[flight] = asyncio.ensure_future(self._fetch_async(key, entry))
+            future.add_done_callback(lambda _: self._inflight.pop(flight, None))
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), remaining())
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded("deadline exceeded") from None
+
+    async def _fetch_async(self, key: str, entry: Optional[RobotsEntry]) -> RobotsEntry:
+        try:
+            headers = self._conditional_headers(entry)
+            async with get_async_client().stream(key + "/robots.txt", cache=False, headers=headers) as (resp, chunks):
+                body, budget = await aread_body(resp, chunks, max_decoded_bytes=ROBOTS_MAX_BYTES)
+            if budget.truncated == "deadline":
+                raise DeadlineExceeded("deadline exceeded")
+        except Exception as e:
+            # Running out of ROBOTS_TIMEOUT, unlike a caller's deadline, is
+            # the host's doing: treat it as unreachable.
+            return self._store(key, entry, error=e)
+        return self._store(key, entry, resp, body, budget.truncated)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"hosts": len(self._entries), "ttl": self.ttl, **self.counters}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            for name in self.counters:
+                self.counters[name] = 0
+
+
+_cache = RobotsCache()
+
+
+def get_robots_cache() -> RobotsCache:
+    return _cache
@@ -1,10 +1,9 @@
 # Example: SEO Robots/Canonical Extraction
-from bs4 import BeautifulSoup
-import requests
+from .page import fetch_page
 
-def get_robots_canonical(url):
-    resp = requests.get(url)
-    soup = BeautifulSoup(resp.text, 'html.parser')
+def get_robots_canonical(url, page=None):
+    page = page or fetch_page(url)
+    soup = page.soup
     robots = [tag.get('content', '') for tag in soup.find_all('meta', attrs={'name': 'robots'})]
     canonical = ''
     link = soup.find('link', rel='canonical')
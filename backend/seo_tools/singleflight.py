@@ -0,0 +1,139 @@
+"""In-flight deduplication of identical work ("singleflight").
+
+While a call for a key is running, later calls for the same key wait for
+it and get its result (or its exception) instead of repeating the work. A
+:class:`Group` is shared by threads and event loops alike: a call from a
+worker thread (e.g. a FastMCP tool) can wait on work led from an event loop
+(e.g. a FastAPI request) and the other way round. Once the work finishes,
+the key is free again, so nothing is cached beyond the calls that overlapped.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class _Flight:
+    __slots__ = ("done", "value", "error", "loop", "_waiters", "_lock")
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop]):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        #: Event loop the leading call runs on; None for a thread.
+        self.loop = loop
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._lock = threading.Lock()
+
+    def finish(self, value: Any = None, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self.value, self.error = value, error
+            self.done.set()
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(self._resolve, future)
+
+    def _resolve(self, future: asyncio.Future) -> None:
+        if future.done():
+            return
+        if self.error is not None:
+            future.set_exception(self.error)
+        else:
+            future.set_result(self.value)
+
+    def future(self) -> asyncio.Future:
+        """A future of the running loop, resolved when the flight lands."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if not self.done.is_set():
+                self._waiters.append((loop, future))
+                return future
+        self._resolve(future)
+        return future
+
+    def result(self) -> Any:
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class Group:
+    """Runs one call per key at a time and shares its outcome with every overlapping caller."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.counters = {"calls": 0, "executions": 0, "coalesced": 0}
+
+    def _join(self, key: Hashable, loop: Optional[asyncio.AbstractEventLoop]) -> Tuple[_Flight, bool]:
+        with self._lock:
+            self.counters["calls"] += 1
+            flight = self._flights.get(key)
+            # A thread already running this loop cannot block on work led from it.
+            if flight is not None and not (loop is None and flight.loop is not None and flight.loop is _running_loop()):
+                self.counters["coalesced"] += 1
+                return flight, False
+            flight = _Flight(loop)
+            self._flights.setdefault(key, flight)
+            self.counters["executions"] += 1
+            return flight, True
+
+    def _land(self, key: Hashable, flight: _Flight) -> None:
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """``fn()``, or the outcome of the call already running for ``key``.
+
+        Returns the value and whether it came from another caller's call.
+        """
+        flight, leader = self._join(key, None)
+        if not leader:
+            return flight.result(), True
+        try:
+            value = fn()
+        except BaseException as e:
+            flight.finish(error=e)
+            raise
+        finally:
+            self._land(key, flight)
+        flight.finish(value)
+        return value, False
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """:meth:`do` for the event loop; ``fn`` returns an awaitable."""
+        loop = asyncio.get_running_loop()
+        flight, leader = self._join(key, loop)
+        if not leader:
+            return await flight.future(), True
+        # The work runs in a task of its own, so a leader that gives up (a
+        # client that disconnects) does not cancel it for the others.
+        task = asyncio.ensure_future(fn())
+
+        def land(task: asyncio.Future) -> None:
+            self._land(key, flight)
+            if task.cancelled():
+                flight.finish(error=asyncio.CancelledError())
+            else:
+                flight.finish(task.result() if task.exception() is None else None, task.exception())
+
+        task.add_done_callback(land)
+        return await asyncio.shield(task), False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = self.counters["calls"]
+            return {
+                **self.counters,
+                "in_flight": len(self._flights),
+                "coalescing_rate": round(self.counters["coalesced"] / calls, 4) if calls else None,
+            }
@@ -1,23 +1,19 @@
-import requests
+from .robots import get_robots_cache
+from .sitemaps import read_sitemaps, read_sitemaps_async
+
+def _result(url, robots, sitemap):
+    return {
+        'sitemap': sitemap,
+        'robots': robots.text,
+        'robots_truncated': robots.truncated,
+        'robots_allowed': robots.allowed(url),
+        'crawl_delay': robots.crawl_delay,
+    }
 
 def get_sitemap_robots(url):
-    from urllib.parse import urlparse, urljoin
-    parsed = urlparse(url)
-    base = f"{parsed.scheme}://{parsed.netloc}"
-    sitemap_url = urljoin(base, '/sitemap.xml')
-    robots_url = urljoin(base, '/robots.txt')
-    sitemap = ''
-    robots = ''
-    try:
-        sitemap_resp = requests.get(sitemap_url)
-        if sitemap_resp.status_code == 200:
-            sitemap = sitemap_resp.text
-    except Exception:
-        pass
-    try:
-        robots_resp = requests.get(robots_url)
-        if robots_resp.status_code == 200:
-            robots = robots_resp.text
-    except Exception:
-        pass
-    return {'sitemap': sitemap, 'robots': robots}
+    robots = get_robots_cache().get(url)
+    return _result(url, robots, read_sitemaps(url, robots.sitemaps))
+
+async def get_sitemap_robots_async(url):
+    robots = await get_robots_cache().get_async(url)
+    return _result(url, robots, await read_sitemaps_async(url, robots.sitemaps))
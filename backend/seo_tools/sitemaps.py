@@ -0,0 +1,378 @@
+"""Streaming sitemap reader.
+
+Sitemaps are parsed chunk by chunk as they download. Each ``<url>`` is
+handed on, and its element freed, as soon as it is complete, so memory stays
+flat however many URLs a file lists. Gzipped files (``.xml.gz``) are
+recognised by their magic bytes and inflated on the fly. Sitemap indexes are
+followed breadth-first, and every file is read at most once, up to
+``SITEMAP_MAX_FILES`` files. The starting points are the ``Sitemap:`` lines of
+robots.txt, or ``/sitemap.xml`` when robots.txt lists none.
+
+Each file is read within the download caps of :mod:`.fetch`, and its
+inflated XML within ``FETCH_MAX_DECODED_BYTES``, so a gzip bomb costs no
+more than the cap. The URLs before the cut are kept and the file is listed
+under ``truncated_sitemaps``.
+
+On the event loop, inflating and parsing run in a worker thread, a batch of
+at least ``PARSE_BATCH`` downloaded bytes at a time, so a multi-megabyte
+sitemap does not hold up other requests.
+
+Callers get either :class:`SitemapStats` (counts, lastmod distribution,
+errors and a sample of URLs) or an iterator over every URL, never the raw
+documents.
+"""
+import asyncio
+import os
+import re
+import zlib
+from collections import Counter, deque
+from contextlib import aclosing, closing
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional
+from urllib.parse import urljoin, urlsplit
+from xml.etree.ElementTree import XMLPullParser
+
+from .fetch import MAX_DECODED_BYTES, ByteBudget, aiter_bounded, get_async_client, get_client, iter_bounded
+from .resilience import DeadlineExceeded
+from .robots import get_robots_cache
+
+MAX_SITEMAPS = int(os.environ.get("SITEMAP_MAX_FILES", "50"))
+SAMPLE_URLS = 50
+PARSE_BATCH = 256 * 1024
+MAX_ERRORS = 20
+
+_LASTMOD_MONTH = re.compile(r"^\d{4}-\d{2}")
+
+
+class SitemapEntry(NamedTuple):
+    loc: str
+    lastmod: Optional[str]
+    #: True for the ``<sitemap>`` entries of a sitemap index.
+    is_sitemap: bool = False
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+class SitemapParser:
+    """Incremental parser for one sitemap or sitemap index, plain or gzipped."""
+
+    def __init__(self, max_decoded_bytes: Optional[int] = None):
+        self._xml = XMLPullParser(events=("start", "end"))
+        self.max_decoded_bytes = MAX_DECODED_BYTES if max_decoded_bytes is None else max_decoded_bytes
+        self.decoded_bytes = 0
+        #: Set to ``"max_decoded_bytes"`` once the XML outgrows the cap.
+        self.truncated: Optional[str] = None
+        self._head = b""
+        self._gunzip = None
+        self._sniffed = False
+        self._depth = 0
+        self._root = None
+        self.kind: Optional[str] = None
+
+    def feed(self, chunk: bytes) -> List[SitemapEntry]:
+        if self.truncated:
+            return []
+        if not self._sniffed:
+            self._head += chunk
+            if len(self._head) < 2:
+                return []
+            chunk, self._head, self._sniffed = self._head, b"", True
+            if chunk[:2] == b"\x1f\x8b":
+                self._gunzip = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        room = self.max_decoded_bytes - self.decoded_bytes
+        if self._gunzip is not None:
+            # Inflate at most one byte past the cap, whatever the ratio.
+            chunk = self._gunzip.decompress(chunk, room + 1)
+        if len(chunk) > room:
+            chunk, self.truncated = chunk[:room], "max_decoded_bytes"
+        self.decoded_bytes += len(chunk)
+        self._xml.feed(chunk)
+        return self._entries()
+
+    def close(self) -> List[SitemapEntry]:
+        """Finish the document; raises on malformed XML or a non-sitemap root."""
+        if not self._sniffed and self._head:
+            self._xml.feed(self._head)
+        if self._gunzip is not None:
+            self._xml.feed(self._gunzip.flush())
+        self._xml.close()
+        entries = self._entries()
+        if self.kind not in ("urlset", "sitemapindex"):
+            raise ValueError(f"not a sitemap: root element <{self.kind}>")
+        return entries
+
+    def _entries(self) -> List[SitemapEntry]:
+        entries = []
+        for event, elem in self._xml.read_events():
+            if event == "start":
+                self._depth += 1
+                if self._depth == 1:
+                    self._root = elem
+                    self.kind = _local(elem.tag)
+                continue
+            self._depth -= 1
+            if self._depth != 1:
+                continue
+            name = _local(elem.tag)
+            if name in ("url", "sitemap"):
+                loc = lastmod = None
+                for child in elem:
+                    field = _local(child.tag)
+                    if field == "loc":
+                        loc = (child.text or "").strip()
+                    elif field == "lastmod":
+                        lastmod = (child.text or "").strip() or None
+                if loc:
+                    entries.append(SitemapEntry(loc, lastmod, name == "sitemap"))
+            # Drop finished entries so the tree never grows past one <url>.
+            self._root.clear()
+        return entries
+
+
+class SitemapStats:
+    """Running summary of the URLs read from a site's sitemaps."""
+
+    def __init__(self, sample: int = SAMPLE_URLS):
+        self.sample = sample
+        self.sitemaps: List[str] = []
+        self.url_count = 0
+        self.lastmod: Counter = Counter()
+        self.missing_lastmod = 0
+        self.skipped_sitemaps = 0
+        self.truncated: List[Dict[str, str]] = []
+        self.timed_out = False
+        self.error_count = 0
+        self.errors: List[Dict[str, str]] = []
+        self.urls: List[str] = []
+
+    def add(self, entry: SitemapEntry) -> None:
+        self.url_count += 1
+        if len(self.urls) < self.sample:
+            self.urls.append(entry.loc)
+        if entry.lastmod is None:
+            self.missing_lastmod += 1
+        elif _LASTMOD_MONTH.match(entry.lastmod):
+            self.lastmod[entry.lastmod[:7]] += 1
+        else:
+            self.lastmod["invalid"] += 1
+
+    def error(self, sitemap: str, exc: Exception) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({"sitemap": sitemap, "error": str(exc) or type(exc).__name__})
+
+    def truncate(self, sitemap: str, limit: str) -> None:
+        if len(self.truncated) < MAX_ERRORS:
+            self.truncated.append({"sitemap": sitemap, "limit": limit})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "sitemaps": self.sitemaps,
+            "url_count": self.url_count,
+            "lastmod": dict(sorted(self.lastmod.items())),
+            "missing_lastmod": self.missing_lastmod,
+            "skipped_sitemaps": self.skipped_sitemaps,
+            "truncated_sitemaps": self.truncated,
+            "timed_out": self.timed_out,
+            "error_count": self.error_count,
+            "errors": self.errors,
+            "urls": self.urls,
+            "urls_truncated": self.url_count > len(self.urls),
+        }
+
+
+class SitemapWalk:
+    """Breadth-first walk over sitemap files; a driver downloads each file and feeds it in.
+
+    ``next()`` names the next file to download, ``feed()``/``finish()`` return
+    the page URLs parsed from it, and ``fail()`` records a file that could not
+    be read. ``truncated`` tells the driver to stop feeding the current file.
+    """
+
+    def __init__(self, roots: Iterable[str], max_sitemaps: int = MAX_SITEMAPS, stats: Optional[SitemapStats] = None):
+        self.max_sitemaps = max_sitemaps
+        self.stats = stats or SitemapStats()
+        self._pending: Deque[str] = deque()
+        self._seen = set()
+        self._current = None
+        self._parser = None
+        for root in roots:
+            self._queue(root)
+
+    def _queue(self, url: str) -> None:
+        if url in self._seen:
+            return
+        if len(self._seen) >= self.max_sitemaps:
+            self.stats.skipped_sitemaps += 1
+            return
+        self._seen.add(url)
+        self._pending.append(url)
+
+    def next(self) -> Optional[str]:
+        if not self._pending:
+            return None
+        self._current = self._pending.popleft()
+        self._parser = SitemapParser()
+        return self._current
+
+    def feed(self, chunk: bytes) -> List[SitemapEntry]:
+        return self._collect(self._parser.feed(chunk))
+
+    @property
+    def truncated(self) -> Optional[str]:
+        return self._parser.truncated
+
+    def finish(self, truncated: Optional[str] = None) -> List[SitemapEntry]:
+        """End the current file; ``truncated`` names the download cap that cut it short."""
+        truncated = truncated or self._parser.truncated
+        if truncated:
+            # The document is incomplete: keep what was parsed, skip the XML checks.
+            self.stats.truncate(self._current, truncated)
+            pages = []
+        else:
+            pages = self._collect(self._parser.close())
+        self.stats.sitemaps.append(self._current)
+        return pages
+
+    def fail(self, exc: Exception) -> None:
+        self.stats.error(self._current, exc)
+
+    def _collect(self, entries: List[SitemapEntry]) -> List[SitemapEntry]:
+        pages = []
+        for entry in entries:
+            if entry.is_sitemap:
+                self._queue(urljoin(self._current, entry.loc))
+            else:
+                self.stats.add(entry)
+                pages.append(entry)
+        return pages
+
+
+def _base(url: str) -> str:
+    parsed = urlsplit(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+def sitemap_roots(url: str, sitemaps: Iterable[str] = ()) -> List[str]:
+    """The ``sitemaps`` listed in robots.txt, or the site's ``/sitemap.xml``."""
+    base = _base(url)
+    listed = [urljoin(base, loc) for loc in sitemaps]
+    return list(dict.fromkeys(listed)) or [urljoin(base, "/sitemap.xml")]
+
+
+def iter_sitemap_entries(walk: SitemapWalk) -> Iterator[SitemapEntry]:
+    client = get_client()
+    while (sitemap := walk.next()) is not None:
+        try:
+            with client.stream(sitemap) as (resp, chunks):
+                if resp.status_code != 200:
+                    raise ValueError(f"HTTP {resp.status_code}")
+                budget = ByteBudget(resp)
+                with closing(iter_bounded(chunks, budget)) as body:
+                    for chunk in body:
+                        yield from walk.feed(chunk)
+                        if walk.truncated:
+                            break
+            yield from walk.finish(budget.truncated)
+        except DeadlineExceeded as e:
+            # Out of time: keep what was read so far.
+            walk.fail(e)
+            walk.stats.timed_out = True
+            return
+        except Exception as e:
+            walk.fail(e)
+
+
+def _feed_batch(walk: SitemapWalk, chunks: List[bytes]) -> List[SitemapEntry]:
+    entries = []
+    for chunk in chunks:
+        entries.extend(walk.feed(chunk))
+        if walk.truncated:
+            break
+    return entries
+
+
+async def aiter_sitemap_entries(walk: SitemapWalk) -> AsyncIterator[SitemapEntry]:
+    client = get_async_client()
+    while (sitemap := walk.next()) is not None:
+        try:
+            async with client.stream(sitemap) as (resp, chunks):
+                if resp.status_code != 200:
+                    raise ValueError(f"HTTP {resp.status_code}")
+                budget = ByteBudget(resp)
+                batch: List[bytes] = []
+                size = 0
+                async with aclosing(aiter_bounded(chunks, budget)) as body:
+                    async for chunk in body:
+                        batch.append(chunk)
+                        size += len(chunk)
+                        if size < PARSE_BATCH:
+                            continue
+                        for entry in await asyncio.to_thread(_feed_batch, walk, batch):
+                            yield entry
+                        batch, size = [], 0
+                        if walk.truncated:
+                            break
+                if batch:
+                    for entry in await asyncio.to_thread(_feed_batch, walk, batch):
+                        yield entry
+            for entry in await asyncio.to_thread(walk.finish, budget.truncated):
+                yield entry
+        except DeadlineExceeded as e:
+            walk.fail(e)
+            walk.stats.timed_out = True
+            return
+        except Exception as e:
+            walk.fail(e)
+
+
+def read_sitemaps(url: str, sitemaps: Iterable[str] = ()) -> Dict[str, Any]:
+    """Stream every sitemap of the site of ``url`` and summarise it.
+
+    ``sitemaps`` are those robots.txt lists (:attr:`.RobotsEntry.sitemaps`).
+    """
+    walk = SitemapWalk(sitemap_roots(url, sitemaps))
+    for _ in iter_sitemap_entries(walk):
+        pass
+    return walk.stats.as_dict()
+
+
+async def read_sitemaps_async(url: str, sitemaps: Iterable[str] = ()) -> Dict[str, Any]:
+    walk = SitemapWalk(sitemap_roots(url, sitemaps))
+    async for _ in aiter_sitemap_entries(walk):
+        pass
+    return walk.stats.as_dict()
+
+
+async def aiter_site_urls(url: str, sitemaps: Optional[Iterable[str]] = None) -> AsyncIterator[str]:
+    """Every page URL in the sitemaps of the site of ``url``, in document order.
+
+    ``sitemaps`` are those robots.txt lists, looked up when not given.
+    """
+    if sitemaps is None:
+        sitemaps = (await get_robots_cache().get_async(url)).sitemaps
+    async with aclosing(aiter_sitemap_entries(SitemapWalk(sitemap_roots(url, sitemaps)))) as entries:
+        async for entry in entries:
+            yield entry.loc
+
+
+async def sitemap_url_page(url: str, offset: int = 0, limit: int = 100) -> Dict[str, Any]:
+    """One page of :func:`aiter_site_urls`.
+
+    Each page streams the sitemaps again from the start, keeping memory
+    bounded by ``limit`` rather than the size of the site.
+    """
+    urls = []
+    more = False
+    index = 0
+    async with aclosing(aiter_site_urls(url)) as locs:
+        async for loc in locs:
+            if index >= offset + limit:
+                more = True
+                break
+            if index >= offset:
+                urls.append(loc)
+            index += 1
+    return {"urls": urls, "offset": offset, "next_offset": offset + limit if more else None}
+
@@ -1,10 +1,9 @@
-import requests
-from bs4 import BeautifulSoup
+from .page import fetch_page
 import json
 
-def get_structured_data(url):
-    resp = requests.get(url)
-    soup = BeautifulSoup(resp.text, 'html.parser')
+def get_structured_data(url, page=None):
+    page = page or fetch_page(url)
+    soup = page.soup
     scripts = soup.find_all('script', type='application/ld+json')
     data = []
     for script in scripts:
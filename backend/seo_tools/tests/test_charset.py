@@ -0,0 +1,56 @@
+import codecs
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from backend.seo_tools import charset
+from backend.seo_tools.charset import Charset, detect_charset, prescan
+from backend.seo_tools.page import PageSnapshot
+
+
+def test_bom_then_header_then_meta():
+    html = '<meta charset="iso-8859-2"><p>Zażółć</p>'
+    assert detect_charset(codecs.BOM_UTF8 + html.encode(), "text/html; charset=latin1") == Charset("utf-8", "bom")
+    assert detect_charset(html.encode(), 'text/html; charset="Shift_JIS"') == Charset("shift_jis", "header")
+    assert detect_charset(html.encode(), "text/html") == Charset("iso-8859-2", "meta")
+    assert detect_charset(html.encode(), "text/html; charset=bogus") == Charset("iso-8859-2", "meta")
+    assert Charset("utf-8", "bom").decode(codecs.BOM_UTF8 + b"<p>") == "<p>"
+
+
+def test_prescan_follows_the_html_rules():
+    assert prescan(b'<!-- <meta charset="koi8-r"> --><meta http-equiv=Content-Type content="text/html; charset=ISO-8859-1">') == "windows-1252"
+    assert prescan(b"<meta charset><meta charset='utf-16le'>") == "utf-8"
+    assert prescan(b'<meta name="x" content="charset=koi8-r"><meta charset=x-unknown>') is None
+    assert prescan(b" " * 5000 + b'<meta charset="koi8-r">') is None
+
+
+def test_detection_reads_only_a_sample(monkeypatch):
+    monkeypatch.setattr(charset, "SAMPLE_BYTES", 1000)
+    assert detect_charset("é".encode() * 600 + b"\xff") == Charset("utf-8", "detected")
+    # A multi-byte character cut by the end of the sample is still UTF-8.
+    assert detect_charset(b"a" * 999 + "é".encode() + b"\xff") == Charset("utf-8", "detected")
+    assert detect_charset(b"") == Charset("utf-8", "default")
+
+    monkeypatch.setattr(charset, "_guess", lambda sample: None)
+    assert detect_charset(b"caf\xe9") == Charset("windows-1252", "default")
+
+
+def test_page_and_lang_charset_reuse_the_detected_charset():
+    from backend.seo_tools.lang_charset import get_lang_charset
+
+    html = '<html lang="fr"><head><meta charset="windows-1252"></head><body>Crème brûlée</body></html>'
+    page = PageSnapshot.from_response(_Response(html.encode("cp1252"), {"Content-Type": "text/html"}))
+    assert "Crème brûlée" in page.text
+    expected = {"lang": "fr", "charset": "windows-1252", "charset_source": "meta"}
+    assert get_lang_charset(page.url, page=page) == expected
+    assert page.extract(["lang_charset"])["lang_charset"] == expected
+
+
+class _Response:
+    url = "https://example.com/"
+    status_code = 200
+
+    def __init__(self, content, headers):
+        self.content = content
+        self.headers = headers
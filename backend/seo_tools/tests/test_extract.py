@@ -0,0 +1,90 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from backend.seo_tools import (
+    favicon_apple,
+    headings,
+    images_alt,
+    lang_charset,
+    links,
+    open_graph_twitter,
+    robots_canonical,
+    structured_data,
+    title_meta,
+    wordcount_keywords,
+)
+from backend.seo_tools.extract import EXTRACTORS, ExtractionEngine, SoupHTMLParser, extract
+from backend.seo_tools.page import PageSnapshot
+
+SOUP_CHECKS = {
+    "title_meta": title_meta.get_title_meta,
+    "robots_canonical": robots_canonical.get_robots_canonical,
+    "headings": headings.get_headings,
+    "images_alt": images_alt.get_images_alt,
+    "links": links.get_links,
+    "structured_data": structured_data.get_structured_data,
+    "open_graph_twitter": open_graph_twitter.get_open_graph_twitter,
+    "wordcount_keywords": wordcount_keywords.get_wordcount_keywords,
+    "favicon_apple": favicon_apple.get_favicon_apple,
+    "lang_charset": lang_charset.get_lang_charset,
+}
+
+DOCUMENTS = [
+    "",
+    "<title>  </title><title>second</title>",
+    "<title>a<b>x</b></title><title><b>only</b></title>",
+    "<title><!--comment--></title>",
+    "<title>Fish &amp; Chips &#147;quoted&#148; &bogus</title>",
+    "<h1>outer<h2>inner</h2>tail</h1><h2>unclosed",
+    "<h1>a<script>var x = 1;</script>b<style>p {}</style></h1>",
+    "<p>one<br>two</br>three</p><template><h1>hidden</h1></template><rt>ruby</rt>",
+    "<p>word<!-- c -->word<![CDATA[cdata words]]></p><pre>  </pre>",
+    '<meta charset><meta http-equiv="Content-Type" content="text/html; charset=latin1">',
+    '<meta http-equiv="Content-Type" content="text/html; charset=latin1"><meta charset="utf-8">',
+    '<html lang="de"><html lang="fr"><meta name="robots" content="noindex"><meta name="robots">',
+    '<link rel="canonical alternate" href="/c"><link rel="canonical" href="/d">',
+    '<link rel="shortcut icon" href="/a.ico"><link rel="icon" href="/b.ico"><link rel="apple-touch-icon">',
+    '<meta property="og:title" content="t"><meta name="twitter:card" content="c"><meta name="a" name="b" content="dup">',
+    '<a href>empty</a><a>none</a><a href="/x">x</a><img src="i.png" alt><img/>',
+    '<script type="application/ld+json">{"a": 1}</script><script type="application/ld+json"></script>'
+    '<script type="application/ld+json">not json</script><script type="text/javascript">{"b": 2}</script>',
+    "<div/><span>ΣΑΣ Straße İstanbul</span><unclosed><b>deep",
+]
+
+
+@pytest.mark.parametrize("html", DOCUMENTS)
+def test_engine_matches_soup_functions(html):
+    page = PageSnapshot("https://example.com/", 200, {}, html.encode(), html)
+    expected = {name: func("https://example.com/", page=page) for name, func in SOUP_CHECKS.items()}
+    assert page.extract(list(EXTRACTORS)) == expected
+
+
+def test_incremental_feed_matches_whole_document():
+    html = "".join(DOCUMENTS)
+    engine = ExtractionEngine(EXTRACTORS)
+    parser = SoupHTMLParser(engine)
+    for i in range(0, len(html), 7):
+        parser.feed(html[i:i + 7])
+    parser.close()
+    assert engine.results() == extract(html, list(EXTRACTORS))
+
+
+def test_page_extract_runs_missing_checks_once(monkeypatch):
+    html = DOCUMENTS[5]
+    page = PageSnapshot("https://example.com/", 200, {}, html.encode(), html)
+    runs = []
+    original = page.parser.extract
+
+    def counting_extract(markup, checks):
+        runs.append(list(checks))
+        return original(markup, checks)
+
+    monkeypatch.setattr(page.parser, "extract", counting_extract)
+    page.extract(["headings", "links", "headings"])
+    page.extract(["links"])
+    page.extract(["links", "images_alt"])
+    assert runs == [["headings", "links"], ["images_alt"]]
@@ -0,0 +1,64 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from backend.seo_tools import extract_pool
+from backend.seo_tools.extract import EXTRACTORS
+from backend.seo_tools.extract_pool import ExtractPool
+from backend.seo_tools.page import PageSnapshot
+
+CORPUS = Path(__file__).parent / "corpus"
+
+
+class _Response:
+    url = "https://example.com/"
+    status_code = 200
+
+    def __init__(self, content, headers):
+        self.content = content
+        self.headers = headers
+
+
+@pytest.fixture(scope="module")
+def pool():
+    # Small thresholds so the corpus pages cover both ways of shipping a body.
+    pool = ExtractPool(workers=2, min_bytes=1024, shm_bytes=8 * 1024)
+    yield pool
+    pool.close()
+
+
+def _page(content, content_type="text/html"):
+    return PageSnapshot.from_response(_Response(content, {"Content-Type": content_type}))
+
+
+@pytest.mark.parametrize("name", sorted(p.name for p in CORPUS.glob("*.html")))
+def test_workers_return_the_in_process_results(pool, monkeypatch, name):
+    content = (CORPUS / name).read_bytes()
+    # Grown past the shared memory threshold, in a single-byte charset.
+    big = content.replace(b"</body>", "<p>Crème brûlée</p>".encode("cp1252") * 1000 + b"</body>")
+    pages = [(content, "text/html"), (big, "text/html; charset=windows-1252")]
+    expected = [_page(*page).extract(EXTRACTORS) for page in pages]
+    monkeypatch.setattr(extract_pool, "_pool", pool)
+    assert [_page(*page).extract(EXTRACTORS) for page in pages] == expected
+
+
+def test_pool_ships_small_pipe_and_shared_memory_bodies(pool, monkeypatch):
+    monkeypatch.setattr(extract_pool, "_pool", pool)
+    before = dict(pool.counters)
+    filler = "<p>Crème brûlée et tarte</p>".encode("cp1252")
+    pages = [b"<title>tiny</title>", b"<title>pipe</title>" + filler * 100, b"<title>shm</title>" + filler * 1000]
+    results = [_page(body, "text/html; charset=windows-1252").extract(["title_meta", "wordcount_keywords"]) for body in pages]
+    assert [r["title_meta"]["title"] for r in results] == ["tiny", "pipe", "shm"]
+    assert results[2]["wordcount_keywords"]["wordcount"] == 1 + 4 * 1000
+    delta = {key: pool.counters[key] - before[key] for key in before}
+    assert delta == {
+        "pages": 2,
+        "in_process": 1,
+        "shared_memory": 1,
+        "bytes_shipped": len(pages[1]) + len(pages[2]),
+        "restarts": 0,
+    }
+    assert pool.stats()["workers"] == 2
@@ -0,0 +1,266 @@
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from backend.seo_tools.fetch import AsyncFetchClient, FetchClient, get_async_client
+from backend.seo_tools.resilience import Breakers, CircuitOpen, DeadlineExceeded, RetryPolicy, deadline
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+    text = "ok"
+
+
+def test_per_host_and_global_caps(monkeypatch):
+    active = {}
+    peak = {}
+    lock = threading.Lock()
+
+    def slow_get(self, url, **kwargs):
+        host = url.split("/")[2]
+        with lock:
+            active[host] = active.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), active[host])
+        time.sleep(0.02)
+        with lock:
+            active[host] -= 1
+        return FakeResponse()
+
+    monkeypatch.setattr(requests.Session, "get", slow_get)
+    client = FetchClient(max_connections=3, max_per_host=2)
+    urls = [f"https://{host}/{i}" for host in ("a.test", "b.test") for i in range(6)]
+    threads = [threading.Thread(target=client.get, args=(url,)) for url in urls]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = client.stats()
+    assert peak["a.test"] <= 2 and peak["b.test"] <= 2
+    assert stats["peak_in_flight"] <= 3
+    assert stats["requests"] == 12
+    assert stats["in_flight"] == 0
+    assert stats["hosts"]["a.test"]["peak_in_flight"] <= 2
+
+
+def test_errors_are_counted(monkeypatch):
+    def failing_get(self, url, **kwargs):
+        raise requests.ConnectionError("down")
+
+    monkeypatch.setattr(requests.Session, "get", failing_get)
+    client = FetchClient(retry=RetryPolicy(retries=0), breakers=Breakers())
+    try:
+        client.get("https://down.test/")
+    except requests.ConnectionError:
+        pass
+    stats = client.stats()
+    assert stats["hosts"]["down.test"] == {
+        "requests": 1,
+        "errors": 1,
+        "in_flight": 0,
+        "peak_in_flight": 1,
+    }
+
+
+def test_fetch_head_stops_reading_after_the_head(monkeypatch):
+    from requests.structures import CaseInsensitiveDict
+
+    from backend.seo_tools.page import fetch_head, head_fetch_stats
+
+    body = b"<html lang='en'><head><title>T</title></HEAD>\n<body>" + b"x" * 100_000 + b"</body></html>"
+    served = []
+
+    class StreamedResponse:
+        url = "https://head.test/"
+        status_code = 200
+        encoding = "utf-8"
+        headers = CaseInsensitiveDict({"Content-Type": "text/html", "Content-Length": str(len(body))})
+
+        def iter_content(self, chunk_size=None):
+            for i in range(0, len(body), 16):
+                served.append(i)
+                yield body[i:i + 16]
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(requests.Session, "get", lambda self, url, **kwargs: StreamedResponse())
+    before = head_fetch_stats()
+    page = fetch_head("https://head.test/")
+    assert page.text == "<html lang='en'><head><title>T</title></HEAD>"
+    assert len(served) == 3
+    stats = page.fetch_stats
+    assert stats["mode"] == "head" and stats["stopped_early"]
+    assert stats["bytes_read"] == 48
+    assert stats["bytes_saved"] == len(body) - 48
+    assert head_fetch_stats()["bytes_saved"] - before["bytes_saved"] == len(body) - 48
+
+
+def test_fetch_page_reports_truncation(monkeypatch, tmp_path):
+    from requests.structures import CaseInsensitiveDict
+
+    from backend.seo_tools import fetch
+    from backend.seo_tools.page import fetch_page
+
+    body = b"<html><head><title>Big</title></head><body>" + b"x" * 10_000 + b"</body></html>"
+    served = []
+
+    class StreamedResponse:
+        url = "https://big.test/"
+        status_code = 200
+        encoding = "utf-8"
+        headers = CaseInsensitiveDict({"Content-Type": "text/html"})
+
+        def iter_content(self, chunk_size=None):
+            for i in range(0, len(body), 1000):
+                served.append(i)
+                yield body[i:i + 1000]
+
+        def close(self):
+            pass
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(fetch, "MAX_BYTES", 2500)
+    monkeypatch.setattr(requests.Session, "get", lambda self, url, **kwargs: StreamedResponse())
+    page = fetch_page("https://big.test/")
+    assert page.content == body[:2500]
+    assert len(served) == 3
+    assert page.fetch_stats["truncated"] == "max_bytes"
+    assert page.fetch_stats["decoded_bytes"] == 2500
+    assert page.extract(["title_meta"])["title_meta"]["title"] == "Big"
+
+
+def test_byte_budget_caps_decoded_bytes_of_encoded_bodies():
+    from requests.structures import CaseInsensitiveDict
+
+    from backend.seo_tools.fetch import ByteBudget, iter_bounded
+
+    class GzipResponse:
+        headers = CaseInsensitiveDict({"Content-Encoding": "gzip"})
+        num_bytes_downloaded = 0
+
+    resp = GzipResponse()
+
+    def inflated():
+        for _ in range(100):
+            resp.num_bytes_downloaded += 10
+            yield b"x" * 1000
+
+    budget = ByteBudget(resp, max_bytes=10_000, max_decoded_bytes=4500)
+    assert b"".join(iter_bounded(inflated(), budget)) == b"x" * 4500
+    assert budget.stats() == {"bytes_read": 50, "decoded_bytes": 4500, "truncated": "max_decoded_bytes"}
+
+    resp.num_bytes_downloaded = 0
+    budget = ByteBudget(resp, max_bytes=25, max_decoded_bytes=10**9)
+    assert len(b"".join(iter_bounded(inflated(), budget))) == 3000
+    assert budget.truncated == "max_bytes"
+
+
+def test_retries_with_timeouts_then_breaker_opens(monkeypatch):
+    sent = []
+
+    class Unavailable:
+        status_code = 503
+        headers = {}
+
+        def close(self):
+            pass
+
+    def flaky_get(self, url, **kwargs):
+        sent.append(kwargs["timeout"])
+        if len(sent) == 2:
+            raise requests.ConnectTimeout("slow")
+        return Unavailable()
+
+    monkeypatch.setattr(requests.Session, "get", flaky_get)
+    breakers = Breakers(failures=3, cooldown=60)
+    client = FetchClient(cache=False, retry=RetryPolicy(retries=2, backoff=0.001), breakers=breakers)
+    assert client.get("https://flaky.test/").status_code == 503
+    assert sent == [(5.0, 15.0)] * 3
+    assert client.stats()["retries"] == 2
+    # Three failures in a row: the host now fails fast without a request.
+    try:
+        client.get("https://flaky.test/")
+    except CircuitOpen:
+        pass
+    else:
+        raise AssertionError("breaker did not open")
+    assert len(sent) == 3
+    assert breakers.snapshot() == {"rejected": 1, "trips": 1, "not_closed": {"flaky.test": "open"}}
+
+
+def test_deadline_shortens_timeouts_and_cuts_slow_bodies(monkeypatch):
+    from requests.structures import CaseInsensitiveDict
+
+    from backend.seo_tools.page import fetch_page
+
+    seen = []
+
+    class Trickle:
+        url = "https://slow.test/"
+        status_code = 200
+        encoding = "utf-8"
+        headers = CaseInsensitiveDict({"Content-Type": "text/html"})
+
+        def iter_content(self, chunk_size=None):
+            yield b"<html><head><title>Slow</title></head><body>"
+            while True:
+                time.sleep(0.02)
+                yield b"<p>more</p>"
+
+        def close(self):
+            pass
+
+    def slow_get(self, url, **kwargs):
+        seen.append(kwargs["timeout"])
+        return Trickle()
+
+    monkeypatch.setattr(requests.Session, "get", slow_get)
+    monkeypatch.setattr("backend.seo_tools.page.get_client", lambda: FetchClient(cache=False, breakers=Breakers()))
+    with deadline(0.1):
+        page = fetch_page("https://slow.test/")
+        try:
+            fetch_page("https://slow.test/")
+        except DeadlineExceeded:
+            pass
+        else:
+            raise AssertionError("fetch after the deadline went out")
+    assert len(seen) == 1 and max(seen[0]) <= 0.1
+    assert page.fetch_stats["truncated"] == "deadline"
+    assert page.extract(["title_meta"])["title_meta"]["title"] == "Slow"
+
+
+def test_host_slots_are_dropped_when_idle(monkeypatch):
+    monkeypatch.setattr(requests.Session, "get", lambda self, url, **kwargs: FakeResponse())
+    client = FetchClient(cache=False)
+    for i in range(50):
+        client.get(f"https://host{i}.test/")
+    assert client._host_slots == {}
+
+    async def main():
+        client = AsyncFetchClient(cache=False)
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200)))
+        await asyncio.gather(*(client.get(f"https://host{i % 5}.test/{i}") for i in range(20)))
+        assert client._host_slots == {}
+        assert client.stats()["requests"] == 20
+        await client.aclose()
+
+    asyncio.run(main())
+
+
+def test_async_client_is_closed_with_its_loop():
+    async def main():
+        return get_async_client()
+
+    first = asyncio.run(main())
+    second = asyncio.run(main())
+    assert first is not second
+    assert first._client.is_closed and second._client.is_closed
@@ -0,0 +1,43 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from backend.seo_tools.frontier import BloomFilter, Frontier, normalize_url, same_site
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(capacity=10_000, error_rate=0.01)
+    added = sum(bloom.add(f"https://example.com/{i}") for i in range(10_000))
+    assert added > 9_900
+    assert all(f"https://example.com/{i}" in bloom for i in range(10_000))
+    assert not bloom.add("https://example.com/0")
+    false_positives = sum(f"https://other.example/{i}" in bloom for i in range(10_000))
+    assert false_positives < 300
+
+
+def test_frontier_dedupes_and_spills_in_order():
+    frontier = Frontier(max_in_memory=3)
+    urls = [f"https://example.com/{i}" for i in range(10)]
+    for i, url in enumerate(urls):
+        assert frontier.push(url, i % 3)
+    assert not frontier.push(urls[4], 0)
+    assert frontier.spilled == 7
+    assert len(frontier) == 10
+    popped = [frontier.pop() for _ in range(5)]
+    frontier.push("https://example.com/late", 9)
+    while (item := frontier.pop()) is not None:
+        popped.append(item)
+    frontier.close()
+    assert [url for url, _ in popped] == urls + ["https://example.com/late"]
+    assert popped[-1] == ("https://example.com/late", 9)
+
+
+def test_normalize_url():
+    base = "https://Example.com/a/b"
+    assert normalize_url("../c#top", base) == "https://example.com/c"
+    assert normalize_url("HTTPS://EXAMPLE.com", base) == "https://example.com/"
+    assert normalize_url("mailto:me@example.com", base) is None
+    assert normalize_url("javascript:void(0)", base) is None
+    assert same_site("https://example.com/x", base)
+    assert not same_site("https://www.example.com/x", base)
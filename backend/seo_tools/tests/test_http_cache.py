@@ -0,0 +1,259 @@
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import httpx
+import pytest
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from backend.seo_tools.fetch import AsyncFetchClient, FetchClient
+from backend.seo_tools.http_cache import HttpCache
+
+
+class FakeResponse:
+    def __init__(self, url, content=b"", status_code=200, headers=None):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = requests.structures.CaseInsensitiveDict(headers or {})
+        self.encoding = "utf-8"
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+    def iter_content(self, chunk_size=None):
+        for i in range(0, len(self.content), 4):
+            yield self.content[i:i + 4]
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def origin(monkeypatch):
+    """Serve ``pages[url] = (body, headers)``, answering conditional requests with 304."""
+    pages = {}
+    sent = []
+
+    def fake_get(self, url, headers=None, **kwargs):
+        headers = requests.structures.CaseInsensitiveDict(headers or {})
+        sent.append((url, dict(headers)))
+        body, response_headers = pages[url]
+        if callable(body):
+            body = body(headers)
+        etag = response_headers.get("ETag")
+        if etag and headers.get("If-None-Match") == etag:
+            return FakeResponse(url, status_code=304, headers=response_headers)
+        return FakeResponse(url, body, headers=response_headers)
+
+    monkeypatch.setattr(requests.Session, "get", fake_get)
+    return pages, sent
+
+
+def make_client(tmp_path, **kwargs):
+    return FetchClient(cache=HttpCache(str(tmp_path / "cache"), **kwargs))
+
+
+def test_fresh_response_is_served_from_disk(origin, tmp_path):
+    pages, sent = origin
+    pages["https://a.test/"] = (b"<p>hello</p>", {"Cache-Control": "max-age=600", "Content-Type": "text/html"})
+    client = make_client(tmp_path)
+    first = client.get("https://a.test/")
+    second = client.get("https://a.test/")
+    assert len(sent) == 1
+    assert second.cache_status == "hit"
+    assert second.text == first.text == "<p>hello</p>"
+    assert second.headers["content-type"] == "text/html"
+    assert client.cache.stats()["hits"] == 1
+    # A new process sees the same entries.
+    assert make_client(tmp_path).get("https://a.test/").cache_status == "hit"
+
+
+def test_stale_response_is_revalidated(origin, tmp_path):
+    pages, sent = origin
+    pages["https://a.test/"] = (b"body", {"ETag": '"v1"', "Cache-Control": "no-cache"})
+    client = make_client(tmp_path)
+    client.get("https://a.test/")
+    again = client.get("https://a.test/")
+    assert again.cache_status == "revalidated"
+    assert again.content == b"body"
+    assert sent[1][1]["If-None-Match"] == '"v1"'
+    stats = client.cache.stats()
+    assert (stats["misses"], stats["revalidated"], stats["hits"]) == (1, 1, 0)
+
+
+def test_vary_keys_and_uncacheable_responses(origin, tmp_path):
+    pages, sent = origin
+    pages["https://a.test/"] = (
+        lambda headers: f"lang={headers.get('Accept-Language')}".encode(),
+        {"Vary": "Accept-Language", "Cache-Control": "max-age=600"},
+    )
+    pages["https://a.test/private"] = (b"secret", {"Cache-Control": "no-store, max-age=600"})
+    pages["https://a.test/plain"] = (b"no validators", {})
+    client = make_client(tmp_path)
+    en = {"Accept-Language": "en"}
+    de = {"Accept-Language": "de"}
+    assert client.get("https://a.test/", headers=en).text == "lang=en"
+    assert client.get("https://a.test/", headers=de).text == "lang=de"
+    assert client.get("https://a.test/", headers=en).text == "lang=en"
+    assert client.get("https://a.test/", headers=de).cache_status == "hit"
+    for url in ("https://a.test/private", "https://a.test/plain"):
+        client.get(url)
+        client.get(url)
+    assert len(sent) == 6
+    assert client.cache.stats()["entries"] == 2
+
+
+def test_bodies_are_deduplicated_and_evicted_by_size(origin, tmp_path):
+    pages, _ = origin
+    for i in range(3):
+        pages[f"https://a.test/same{i}"] = (b"x" * 100, {"ETag": f'"{i}"'})
+    for i in range(5):
+        pages[f"https://a.test/big{i}"] = (bytes([65 + i]) * 400, {"ETag": f'"b{i}"'})
+    client = make_client(tmp_path, max_bytes=1000)
+    for i in range(3):
+        client.get(f"https://a.test/same{i}")
+    stats = client.cache.stats()
+    assert (stats["entries"], stats["bodies"], stats["bytes"]) == (3, 1, 100)
+    for i in range(5):
+        client.get(f"https://a.test/big{i}")
+    stats = client.cache.stats()
+    assert stats["bytes"] <= 1000
+    assert stats["evictions"] >= 3
+    assert len(list((tmp_path / "cache" / "bodies").rglob("*"))) - len(
+        list((tmp_path / "cache" / "bodies").glob("*"))
+    ) == stats["bodies"]
+
+
+def test_streamed_bodies_are_cached(origin, tmp_path):
+    pages, sent = origin
+    pages["https://a.test/sitemap.xml"] = (b"<urlset></urlset>", {"Cache-Control": "max-age=600"})
+    client = make_client(tmp_path)
+    for expected in ("miss", "hit"):
+        with client.stream("https://a.test/sitemap.xml", chunk_size=4) as (resp, chunks):
+            assert b"".join(chunks) == b"<urlset></urlset>"
+            assert getattr(resp, "cache_status", "miss") == expected
+    assert len(sent) == 1
+
+
+def test_async_client_shares_the_cache(monkeypatch, tmp_path):
+    calls = []
+
+    async def fake_get(self, url, **kwargs):
+        calls.append(url)
+        return FakeResponse(url, b"async body", headers={"Cache-Control": "max-age=600"})
+
+    monkeypatch.setattr(httpx.AsyncClient, "get", fake_get)
+    cache = HttpCache(str(tmp_path / "cache"))
+
+    async def run():
+        client = AsyncFetchClient(cache=cache)
+        first = await client.get("https://a.test/")
+        second = await client.get("https://a.test/")
+        await client.aclose()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert calls == ["https://a.test/"]
+    assert second.cache_status == "hit"
+    assert second.text == first.text == "async body"
+    assert make_client(tmp_path).get("https://a.test/").cache_status == "hit"
+
+
+def test_async_streams_do_their_file_io_off_the_event_loop(monkeypatch, tmp_path):
+    import builtins
+    import os
+    import threading
+
+    from backend.seo_tools import http_cache
+
+    body = b"streamed " * 1000
+
+    @asynccontextmanager
+    async def fake_stream(self, method, url, **kwargs):
+        resp = FakeResponse(url, body, headers={"Cache-Control": "max-age=600"})
+
+        async def chunks():
+            for i in range(0, len(body), 1000):
+                yield body[i:i + 1000]
+
+        resp.aiter_bytes = lambda chunk_size=None: chunks()
+        yield resp
+
+    io_threads = []
+
+    def spy(real):
+        def wrapper(*args, **kwargs):
+            io_threads.append(threading.current_thread())
+            return real(*args, **kwargs)
+        return wrapper
+
+    monkeypatch.setattr(httpx.AsyncClient, "stream", fake_stream)
+    monkeypatch.setattr(http_cache, "open", spy(builtins.open), raising=False)
+    monkeypatch.setattr(os, "fdopen", spy(os.fdopen))
+    cache = HttpCache(str(tmp_path / "cache"))
+
+    async def read(client):
+        async with client.stream("https://a.test/big") as (resp, chunks):
+            return getattr(resp, "cache_status", None), b"".join([chunk async for chunk in chunks])
+
+    async def run():
+        client = AsyncFetchClient(cache=cache)
+        results = [await read(client), await read(client)]
+        await client.aclose()
+        return results, threading.current_thread()
+
+    (miss, hit), loop_thread = asyncio.run(run())
+    assert miss == (None, body) and hit == ("hit", body)
+    assert io_threads and loop_thread not in io_threads
+
+
+def test_hits_report_the_url_a_redirect_ended_at(monkeypatch, tmp_path):
+    sent = []
+
+    def redirected_get(self, url, headers=None, **kwargs):
+        sent.append(url)
+        # requests follows the redirect: the response is for the new URL.
+        return FakeResponse("https://a.test/new/", b"<a href='page'>x</a>", headers={"Cache-Control": "max-age=600"})
+
+    monkeypatch.setattr(requests.Session, "get", redirected_get)
+    client = make_client(tmp_path)
+    assert client.get("https://a.test/old").url == "https://a.test/new/"
+    hit = client.get("https://a.test/old")
+    assert hit.cache_status == "hit" and hit.url == "https://a.test/new/"
+    with client.stream("https://a.test/old") as (resp, chunks):
+        assert resp.url == "https://a.test/new/"
+    # Also from a fresh process.
+    assert make_client(tmp_path).get("https://a.test/old").url == "https://a.test/new/"
+    assert sent == ["https://a.test/old"]
+
+
+def test_stored_bytes_are_tracked_without_rescanning(origin, tmp_path):
+    pages, _ = origin
+    for i in range(4):
+        pages[f"https://a.test/{i}"] = (bytes([65 + i]) * 300, {"ETag": f'"{i}"'})
+    client = make_client(tmp_path, max_bytes=700)
+    for i in range(4):
+        client.get(f"https://a.test/{i}")
+    conn = client.cache._conn
+    (on_disk,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM bodies").fetchone()
+    statements = []
+    conn.set_trace_callback(statements.append)
+    stats = client.cache.stats()
+    assert stats["bytes"] == on_disk == 600
+    assert stats["entries"] == stats["bodies"] == 2
+    assert not any("COUNT" in statement or "SUM" in statement for statement in statements)
+
+    # Another process sharing the directory sees the same totals, and the
+    # budget holds for the stores of both.
+    other = HttpCache(str(tmp_path / "cache"), max_bytes=700)
+    assert other.stats()["bytes"] == 600
+    for i in range(4, 6):
+        other.store(f"https://a.test/{i}", {}, 200, {"ETag": f'"{i}"'}, None, bytes([65 + i]) * 300)
+    assert client.cache.stats()["bytes"] == other.stats()["bytes"] == 600
+    (on_disk,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM bodies").fetchone()
+    assert on_disk == 600
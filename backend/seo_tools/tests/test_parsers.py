@@ -0,0 +1,78 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from backend.seo_tools import (
+    favicon_apple,
+    headings,
+    images_alt,
+    lang_charset,
+    links,
+    open_graph_twitter,
+    robots_canonical,
+    structured_data,
+    title_meta,
+    wordcount_keywords,
+)
+from backend.seo_tools.extract import EXTRACTORS
+from backend.seo_tools.page import PageSnapshot
+from backend.seo_tools.parsers import PARSERS, ParserBackend, get_parser
+
+CORPUS = sorted((Path(__file__).parent / "corpus").glob("*.html"))
+
+GET_FUNCTIONS = {
+    "title_meta": title_meta.get_title_meta,
+    "robots_canonical": robots_canonical.get_robots_canonical,
+    "headings": headings.get_headings,
+    "images_alt": images_alt.get_images_alt,
+    "links": links.get_links,
+    "structured_data": structured_data.get_structured_data,
+    "open_graph_twitter": open_graph_twitter.get_open_graph_twitter,
+    "wordcount_keywords": wordcount_keywords.get_wordcount_keywords,
+    "favicon_apple": favicon_apple.get_favicon_apple,
+    "lang_charset": lang_charset.get_lang_charset,
+}
+
+
+def snapshot(path, parser):
+    html = path.read_text(encoding="utf-8")
+    return PageSnapshot("https://example.com/", 200, {}, html.encode(), html, parser)
+
+
+def reference(path):
+    page = snapshot(path, "html.parser")
+    return {name: func(page.url, page=page) for name, func in GET_FUNCTIONS.items()}
+
+
+@pytest.fixture(params=list(PARSERS))
+def backend(request):
+    if not PARSERS[request.param].available():
+        pytest.skip(f"{request.param} is not installed")
+    return request.param
+
+
+@pytest.mark.parametrize("path", CORPUS, ids=lambda p: p.stem)
+def test_engine_results_identical_across_backends(path, backend):
+    assert snapshot(path, backend).extract(EXTRACTORS) == reference(path)
+
+
+@pytest.mark.parametrize("path", CORPUS, ids=lambda p: p.stem)
+def test_get_functions_identical_across_backends(path, backend):
+    page = snapshot(path, backend)
+    assert {name: func(page.url, page=page) for name, func in GET_FUNCTIONS.items()} == reference(path)
+
+
+def test_engine_only_backend_falls_back_to_html_parser_soup():
+    path = CORPUS[0]
+    page = snapshot(path, "html.parser")
+    page.parser = ParserBackend()
+    assert page.soup.builder.NAME == "html.parser"
+    assert {name: func(page.url, page=page) for name, func in GET_FUNCTIONS.items()} == reference(path)
+
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError):
+        get_parser("nope")
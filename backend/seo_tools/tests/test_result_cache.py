@@ -0,0 +1,82 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from backend.seo_tools.result_cache import MISS, ResultCache, content_hash
+
+
+def test_content_hash_covers_body_and_content_type():
+    html = {"Content-Type": "text/html; charset=utf-8"}
+    assert content_hash(b"<p>a</p>", html) == content_hash(b"<p>a</p>", dict(html))
+    assert content_hash(b"<p>a</p>", html) != content_hash(b"<p>b</p>", html)
+    assert content_hash(b"<p>a</p>", html) != content_hash(b"<p>a</p>", {"Content-Type": "text/html; charset=latin-1"})
+
+
+def test_memory_and_disk_tiers(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    cache = ResultCache(path, memory_entries=1)
+    assert cache.get("h1", "title_meta", 1) is MISS
+    cache.put("h1", "title_meta", 1, {"title": "One"})
+    cache.put("h2", "title_meta", 1, {"title": "Two"})
+    hit = cache.get("h2", "title_meta", 1)
+    assert hit == {"title": "Two"}
+    hit["title"] = "changed"
+    assert cache.get("h2", "title_meta", 1) == {"title": "Two"}
+    # Pushed out of memory by h2, still on disk.
+    assert cache.get("h1", "title_meta", 1) == {"title": "One"}
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (2, 1, 1)
+    assert stats["disk_entries"] == 2
+    # Another process reads the same file.
+    assert ResultCache(path).get("h2", "title_meta", 1) == {"title": "Two"}
+
+
+def test_version_bump_invalidates_only_that_tool(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite"))
+    for digest in ("h1", "h2"):
+        cache.put(digest, "title_meta", 1, {"title": digest})
+        cache.put(digest, "headings", 1, {"h1": [digest]})
+    cache.put("h1", "title_meta", 2, {"title": "h1", "length": 2})
+    assert cache.get("h2", "title_meta", 1) is MISS
+    assert cache.get("h2", "title_meta", 2) is MISS
+    assert cache.get("h1", "title_meta", 2) == {"title": "h1", "length": 2}
+    assert cache.get("h2", "headings", 1) == {"h1": ["h2"]}
+    assert cache.stats()["invalidated"] == 2
+    # A fresh process discards the old version on its first store too.
+    restarted = ResultCache(cache.path)
+    restarted.put("h3", "headings", 2, {})
+    assert restarted.get("h1", "headings", 1) is MISS
+    assert restarted.get("h1", "title_meta", 2) == {"title": "h1", "length": 2}
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite"), memory_entries=0, max_entries=10)
+    for i in range(10):
+        cache.put(f"h{i}", "links", 1, [i])
+    assert cache.get("h0", "links", 1) == [0]
+    cache.put("h10", "links", 1, [10])
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["disk_entries"] == 10
+    assert cache.get("h0", "links", 1) == [0]
+    assert cache.get("h1", "links", 1) is MISS
+
+
+def test_row_count_is_tracked_without_counting_on_each_store(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite"), memory_entries=0, max_entries=10)
+    for i in range(5):
+        cache.put(f"h{i}", "links", 1, [i])
+    # Replacing a row does not add one.
+    cache.put("h0", "links", 1, ["again"])
+    assert cache.stats()["disk_entries"] == 5
+    assert cache.get("h0", "links", 1) == ["again"]
+    statements = []
+    cache._conn.set_trace_callback(statements.append)
+    cache.put("h5", "links", 1, [5])
+    assert not any("COUNT" in statement for statement in statements)
+    assert cache.stats()["disk_entries"] == 6
+    cache.put("h0", "links", 2, [])
+    assert cache.stats()["disk_entries"] == 1
+    # A fresh process starts from the rows already on disk.
+    assert ResultCache(cache.path).stats()["disk_entries"] == 1
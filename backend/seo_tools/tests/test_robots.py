@@ -0,0 +1,188 @@
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import httpx
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from backend.seo_tools.resilience import DeadlineExceeded, deadline
+from backend.seo_tools.robots import RobotsCache, RobotsRules
+
+ROBOTS = """
+# comment
+User-agent: OtherBot
+Disallow: /
+
+User-agent: *
+Disallow: /private
+Allow: /private/public
+Disallow: /*.pdf$
+Disallow: /search?
+Disallow:
+Crawl-delay: 2.5
+
+User-agent: SEOAstroAnalyzer/2.0
+User-agent: seoastroanalyzer
+Disallow: /no-astro   # trailing comment
+Allow: /page
+Disallow: /page
+
+Sitemap: https://example.com/sitemap_index.xml
+"""
+
+
+def test_rules_for_default_group():
+    rules = RobotsRules(ROBOTS, user_agent="SomeCrawler")
+    assert rules.allowed("/")
+    assert not rules.allowed("/private/thing")
+    assert rules.allowed("/private/public/thing")
+    assert not rules.allowed("https://example.com/files/report.pdf")
+    assert rules.allowed("/files/report.pdf?download=1")
+    assert not rules.allowed("/search?q=fence")
+    assert rules.allowed("/search")
+    assert rules.allowed("/robots.txt")
+    assert rules.crawl_delay == 2.5
+    assert rules.sitemaps == ["https://example.com/sitemap_index.xml"]
+
+
+def test_rules_for_named_group():
+    rules = RobotsRules(ROBOTS)
+    assert not rules.allowed("/no-astro/x")
+    assert rules.allowed("/private/thing")
+    # Equal length: Allow wins.
+    assert rules.allowed("/page")
+    assert rules.crawl_delay is None
+    assert not RobotsRules(ROBOTS, user_agent="OtherBot").allowed("/anything")
+    assert RobotsRules("").allowed("/anything")
+
+
+class FakeResponse:
+    def __init__(self, status_code, text="", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.encoding = "utf-8"
+        self.headers = requests.structures.CaseInsensitiveDict(headers or {})
+
+    def iter_content(self, chunk_size=None):
+        yield self.text.encode()
+
+    async def aiter_bytes(self, chunk_size=None):
+        yield self.text.encode()
+
+    def close(self):
+        pass
+
+
+def test_cache_hits_and_revalidates(monkeypatch):
+    requests_seen = []
+    responses = [
+        FakeResponse(200, "User-agent: *\nDisallow: /x\n", {"ETag": '"v1"'}),
+        FakeResponse(304),
+        FakeResponse(404),
+    ]
+
+    def fake_get(self, url, headers=None, **kwargs):
+        requests_seen.append((url, dict(headers or {})))
+        return responses.pop(0)
+
+    monkeypatch.setattr(requests.Session, "get", fake_get)
+    cache = RobotsCache(ttl=60)
+    for path in ("/a", "/x/1", "/b"):
+        entry = cache.get(f"https://Example.com{path}")
+    assert not entry.allowed("https://example.com/x/1")
+    assert requests_seen == [("https://example.com/robots.txt", {})]
+    assert cache.stats()["hits"] == 2
+
+    entry.expires = 0
+    assert not cache.get("https://example.com/").allowed("/x")
+    assert requests_seen[1] == ("https://example.com/robots.txt", {"If-None-Match": '"v1"'})
+    assert cache.stats()["revalidated"] == 1
+
+    assert cache.get("https://other.example/").allowed("/x")
+
+
+def test_cache_treats_unreachable_robots_as_allow_all(monkeypatch):
+    def failing_get(self, url, **kwargs):
+        raise requests.ConnectionError("refused")
+
+    monkeypatch.setattr(requests.Session, "get", failing_get)
+    cache = RobotsCache(ttl=60, error_ttl=5)
+    entry = cache.get("https://down.example/page")
+    assert entry.allowed("/page") and entry.status is None
+    assert cache.stats()["errors"] == 1
+
+
+def test_host_locks_do_not_outlive_their_fetches(monkeypatch):
+    monkeypatch.setattr(
+        requests.Session, "get", lambda self, url, **kwargs: FakeResponse(200, "Sitemap: https://x.example/s.xml\n")
+    )
+    cache = RobotsCache(max_hosts=5)
+    for i in range(50):
+        entry = cache.get(f"https://host{i}.example/")
+    assert cache._host_locks == {}
+    assert cache.stats()["hosts"] == 5
+    assert entry.sitemaps == ["https://x.example/s.xml"]
+
+
+def test_concurrent_async_lookups_share_one_fetch(monkeypatch):
+    calls = []
+
+    async def slow_get(self, url, **kwargs):
+        calls.append(url)
+        await asyncio.sleep(0.01)
+        return FakeResponse(200, "User-agent: *\nCrawl-delay: 1\n")
+
+    @asynccontextmanager
+    async def slow_stream(self, method, url, **kwargs):
+        yield await slow_get(self, url, **kwargs)
+
+    monkeypatch.setattr(httpx.AsyncClient, "stream", slow_stream)
+    cache = RobotsCache()
+
+    async def lookups():
+        return await asyncio.gather(*(cache.get_async(f"https://example.com/{i}") for i in range(20)))
+
+    entries = asyncio.run(lookups())
+    assert calls == ["https://example.com/robots.txt"]
+    assert {entry.crawl_delay for entry in entries} == {1.0}
+
+
+def test_shared_async_fetch_outlives_the_deadline_of_its_leader(monkeypatch):
+    @asynccontextmanager
+    async def slow_stream(self, method, url, **kwargs):
+        await asyncio.sleep(0.05)
+        yield FakeResponse(200, "User-agent: *\nCrawl-delay: 2\n")
+
+    monkeypatch.setattr(httpx.AsyncClient, "stream", slow_stream)
+    cache = RobotsCache()
+
+    async def leader():
+        with deadline(0.01):
+            return await cache.get_async("https://example.com/a")
+
+    async def joiner():
+        await asyncio.sleep(0)
+        return await cache.get_async("https://example.com/b")
+
+    async def lookups():
+        return await asyncio.gather(leader(), joiner(), return_exceptions=True)
+
+    led, joined = asyncio.run(lookups())
+    assert isinstance(led, DeadlineExceeded)
+    assert joined.crawl_delay == 2.0
+    assert cache.stats()["fetches"] == 1
+
+
+def test_oversized_robots_is_parsed_up_to_the_cap(monkeypatch):
+    from backend.seo_tools import robots
+
+    text = "User-agent: *\nDisallow: /private\n" + "".join(f"Disallow: /junk{i}\n" for i in range(1000))
+    monkeypatch.setattr(robots, "ROBOTS_MAX_BYTES", 100)
+    monkeypatch.setattr(requests.Session, "get", lambda self, url, **kwargs: FakeResponse(200, text))
+    entry = RobotsCache().get("https://huge.example/")
+    assert entry.truncated == "max_decoded_bytes"
+    assert len(entry.text) <= 100 and entry.text.splitlines()[-1].startswith("Disallow: /junk")
+    assert not entry.allowed("/private") and not entry.allowed("/junk1")
@@ -0,0 +1,92 @@
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from backend.seo_tools.singleflight import Group
+
+
+def test_overlapping_calls_share_one_execution_and_its_error():
+    group = Group()
+    started = threading.Event()
+    release = threading.Event()
+    runs = []
+
+    def work():
+        runs.append(1)
+        started.set()
+        release.wait(5)
+        raise ValueError("boom")
+
+    outcomes = []
+
+    def call():
+        try:
+            group.do("k", work)
+        except ValueError as e:
+            outcomes.append(str(e))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=call) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    while group.stats()["coalesced"] < 3:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert runs == [1] and outcomes == ["boom"] * 4
+    assert group.stats() == {"calls": 4, "executions": 1, "coalesced": 3, "in_flight": 0, "coalescing_rate": 0.75}
+    # Once landed, the key runs again.
+    assert group.do("k", lambda: 42) == (42, False)
+
+
+def test_threads_and_event_loops_join_each_others_flights():
+    group = Group()
+    runs = []
+
+    async def work():
+        runs.append("async")
+        await asyncio.sleep(0.1)
+        return "page"
+
+    async def main():
+        leader = asyncio.ensure_future(group.do_async("k", work))
+        await asyncio.sleep(0.02)
+        from_thread = asyncio.to_thread(group.do, "k", lambda: runs.append("sync"))
+        from_loop = group.do_async("k", work)
+        # A call from the leader's own loop thread cannot wait on it without
+        # deadlocking, so it runs on its own.
+        assert group.do("k", lambda: "direct") == ("direct", False)
+        return await asyncio.gather(leader, from_thread, from_loop)
+
+    assert asyncio.run(main()) == [("page", False), ("page", True), ("page", True)]
+    assert runs == ["async"]
+
+
+def test_a_cancelled_leader_does_not_cancel_the_work():
+    group = Group()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return 1
+
+    async def main():
+        leader = asyncio.ensure_future(group.do_async("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(group.do_async("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == (1, True)
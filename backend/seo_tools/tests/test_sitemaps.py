@@ -0,0 +1,169 @@
+import asyncio
+import gzip
+import sys
+import threading
+import tracemalloc
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import httpx
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from backend.seo_tools.robots import RobotsRules
+from backend.seo_tools.sitemaps import SitemapParser, read_sitemaps, read_sitemaps_async, sitemap_roots
+
+NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+
+def urlset(*entries):
+    body = "".join(
+        f"<url><loc>{loc}</loc>{f'<lastmod>{lastmod}</lastmod>' if lastmod else ''}</url>"
+        for loc, lastmod in entries
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?><urlset {NS}>{body}</urlset>'.encode()
+
+
+def test_parser_is_incremental_and_handles_gzip():
+    doc = urlset(("https://example.com/a?x=1&amp;y=2", "2024-01-05"), ("https://example.com/b", None))
+    for data in (doc, gzip.compress(doc)):
+        parser = SitemapParser()
+        entries = []
+        for i in range(len(data)):
+            entries += parser.feed(data[i:i + 1])
+        entries += parser.close()
+        assert [(e.loc, e.lastmod, e.is_sitemap) for e in entries] == [
+            ("https://example.com/a?x=1&y=2", "2024-01-05", False),
+            ("https://example.com/b", None, False),
+        ]
+        assert parser.kind == "urlset"
+
+
+def test_parser_memory_stays_bounded():
+    entry = b"<url><loc>https://example.com/product/%d</loc><lastmod>2024-02-01</lastmod></url>"
+    parser = SitemapParser()
+    count = 0
+    tracemalloc.start()
+    count += len(parser.feed(f"<urlset {NS}>".encode()))
+    for start in range(0, 50_000, 1000):
+        chunk = b"".join(entry % i for i in range(start, start + 1000))
+        count += len(parser.feed(chunk))
+    count += len(parser.feed(b"</urlset>"))
+    count += len(parser.close())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert count == 50_000
+    assert peak < 2 * 1024 * 1024
+
+
+def test_sitemap_roots_come_from_robots():
+    robots = "User-agent: *\nDisallow: /admin\nSitemap: https://example.com/index.xml\nsitemap: /news.xml\n"
+    assert sitemap_roots("https://example.com/page", RobotsRules(robots).sitemaps) == [
+        "https://example.com/index.xml",
+        "https://example.com/news.xml",
+    ]
+    assert sitemap_roots("https://example.com/page") == ["https://example.com/sitemap.xml"]
+
+
+class FakeResponse:
+    def __init__(self, content, status_code=200):
+        self.status_code = status_code
+        self.headers = {}
+        self.content = content
+
+    def iter_content(self, chunk_size=None):
+        for i in range(0, len(self.content), 7):
+            yield self.content[i:i + 7]
+
+    def close(self):
+        pass
+
+
+def test_read_sitemaps_follows_indexes(monkeypatch):
+    files = {
+        "https://example.com/index.xml": (
+            f'<sitemapindex {NS}><sitemap><loc>/pages.xml.gz</loc></sitemap>'
+            f'<sitemap><loc>https://example.com/missing.xml</loc></sitemap>'
+            f'<sitemap><loc>https://example.com/index.xml</loc></sitemap></sitemapindex>'
+        ).encode(),
+        "https://example.com/pages.xml.gz": gzip.compress(
+            urlset(("https://example.com/1", "2023-12-31"), ("https://example.com/2", "2024-01-01T10:00:00Z"),
+                   ("https://example.com/3", "yesterday"), ("https://example.com/4", None))
+        ),
+    }
+    fetched = []
+
+    def fake_get(self, url, **kwargs):
+        fetched.append(url)
+        if url in files:
+            return FakeResponse(files[url])
+        return FakeResponse(b"", status_code=404)
+
+    monkeypatch.setattr(requests.Session, "get", fake_get)
+    stats = read_sitemaps("https://example.com/", ["https://example.com/index.xml"])
+    assert fetched == [
+        "https://example.com/index.xml",
+        "https://example.com/pages.xml.gz",
+        "https://example.com/missing.xml",
+    ]
+    assert stats["sitemaps"] == ["https://example.com/index.xml", "https://example.com/pages.xml.gz"]
+    assert stats["url_count"] == 4
+    assert stats["urls"] == [f"https://example.com/{i}" for i in range(1, 5)]
+    assert stats["lastmod"] == {"2023-12": 1, "2024-01": 1, "invalid": 1}
+    assert stats["missing_lastmod"] == 1
+    assert stats["errors"] == [{"sitemap": "https://example.com/missing.xml", "error": "HTTP 404"}]
+
+
+def test_async_reader_parses_off_the_event_loop(monkeypatch):
+    from backend.seo_tools import sitemaps
+
+    body = gzip.compress(urlset(*((f"https://example.com/{i}", "2024-01-01") for i in range(2000))))
+
+    class FakeAsyncResponse:
+        status_code = 200
+        headers = {}
+        url = "https://example.com/sitemap.xml"
+
+        async def aiter_bytes(self, chunk_size=None):
+            for i in range(0, len(body), 700):
+                yield body[i:i + 700]
+
+    @asynccontextmanager
+    async def fake_stream(self, method, url, **kwargs):
+        yield FakeAsyncResponse()
+
+    threads = []
+    feed = SitemapParser.feed
+
+    def spy_feed(self, chunk):
+        threads.append(threading.current_thread())
+        return feed(self, chunk)
+
+    monkeypatch.setattr(httpx.AsyncClient, "stream", fake_stream)
+    monkeypatch.setattr(SitemapParser, "feed", spy_feed)
+    monkeypatch.setattr(sitemaps, "PARSE_BATCH", 4096)
+
+    async def run():
+        return await read_sitemaps_async("https://example.com/"), threading.current_thread()
+
+    stats, loop_thread = asyncio.run(run())
+    assert stats["url_count"] == 2000
+    assert stats["urls"][:2] == ["https://example.com/0", "https://example.com/1"]
+    assert threads and loop_thread not in threads
+
+
+def test_gzip_bomb_is_cut_at_the_decoded_cap(monkeypatch):
+    from backend.seo_tools import sitemaps
+
+    head = urlset(("https://example.com/1", None)).replace(b"</urlset>", b"")
+    bomb = gzip.compress(head + b" " * (20 * 1024 * 1024) + b"<url><loc>https://example.com/2</loc></url></urlset>")
+
+    monkeypatch.setattr(sitemaps, "MAX_DECODED_BYTES", 64 * 1024)
+    monkeypatch.setattr(requests.Session, "get", lambda self, url, **kwargs: FakeResponse(bomb))
+    stats = read_sitemaps("https://bomb.example/")
+    assert stats["urls"] == ["https://example.com/1"]
+    assert stats["truncated_sitemaps"] == [
+        {"sitemap": "https://bomb.example/sitemap.xml", "limit": "max_decoded_bytes"}
+    ]
+    assert stats["errors"] == []
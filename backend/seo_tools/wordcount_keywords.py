@@ -1,11 +1,10 @@
-from bs4 import BeautifulSoup
-import requests
+from .page import fetch_page
 from collections import Counter
 import re
 
-def get_wordcount_keywords(url):
-    resp = requests.get(url)
-    soup = BeautifulSoup(resp.text, 'html.parser')
+def get_wordcount_keywords(url, page=None):
+    page = page or fetch_page(url)
+    soup = page.soup
     text = soup.get_text(separator=' ', strip=True)
     words = re.findall(r'\w+', text.lower())
     wordcount = len(words)